@@ -0,0 +1,37 @@
+#! python3
+"""
+Time the attribution of each member's cost variation to its ABs, as in plot_distribution's IA mode,
+for growing numbers of elements and iterations.
+
+    python benchmarks/bench_attribution.py [--max 1000000]
+"""
+
+import argparse
+import time
+import numpy as np
+from darum.columnar import ResultsColumns
+from darum.correlation import ab_attribution, attributionTable
+from synthetic import synthetic_results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", type=int, default=1_000_000, help="Largest number of elements. Default=%(default)s")
+    args = parser.parse_args()
+
+    print(f"{'elements':>10} {'iterations':>10} {'attribution':>11} {'table':>9}")
+    for iterations in [10, 100]:
+        n = 10_000
+        while n <= args.max:
+            cols = ResultsColumns(synthetic_results(n, iterations))
+            members = np.flatnonzero(cols.AB == 0)
+            t0 = time.perf_counter()
+            a = ab_attribution(cols, members, cols.all_seeds())
+            t_a = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            attributionTable(cols, members, a)
+            t_t = time.perf_counter() - t0
+            print(f"{n:>10} {iterations:>10} {t_a:10.3f}s {t_t:8.3f}s")
+            n *= 10
+
+if __name__ == "__main__":
+    main()
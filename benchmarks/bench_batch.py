@@ -0,0 +1,48 @@
+#! python3
+"""
+Time plotting a directory of synthetic logs one plot_distribution process at a time, as by hand,
+against plot_distribution --batch.
+
+    python benchmarks/bench_batch.py [--logs 8] [--members 300] [--jobs 4]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic import synthetic_log
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=8)
+    parser.add_argument("--members", type=int, default=300)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logdir = os.path.join(tmp, "logs")
+        os.makedirs(logdir)
+        for i in range(args.logs):
+            with open(os.path.join(logdir, f"run{i}.json"), "w") as f:
+                json.dump(synthetic_log(args.members, IA=(i % 2 == 0), seed=i), f)
+        logs = sorted(os.listdir(logdir))
+
+        t0 = time.perf_counter()
+        for l in logs:
+            subprocess.run([sys.executable, "-m", "darum.plot_distribution", os.path.join(logdir, l), "-o", os.path.join(tmp, "seq")],
+                           capture_output=True, check=True)
+        t_seq = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "darum.plot_distribution", "--batch", logdir, "-o", os.path.join(tmp, "batch"), "-j", str(args.jobs)],
+                       capture_output=True, check=True)
+        t_batch = time.perf_counter() - t0
+        assert sorted(os.listdir(os.path.join(tmp, "batch"))) == sorted(os.listdir(os.path.join(tmp, "seq")) + ["index.html"])
+
+    print(f"{args.logs} logs of {args.members} members: one process each {t_seq:.2f}s, --batch -j {args.jobs} {t_batch:.2f}s")
+
+if __name__ == "__main__":
+    main()
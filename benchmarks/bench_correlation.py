@@ -0,0 +1,43 @@
+#! python3
+"""
+Time darum correlate's variance decomposition and pair search for growing numbers of members, and check that they find
+the members planted as drivers: a few members that all get 10x more expensive with the same seeds.
+Those should top the variance shares, be each other's partners, and make up the top pairs.
+
+    python benchmarks/bench_correlation.py [--max 10000] [--drivers 10]
+"""
+
+import argparse
+import time
+import numpy as np
+from darum.correlation import contributions, correlated_pairs
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", type=int, default=10_000, help="Largest number of members. Default=%(default)s")
+    parser.add_argument("--drivers", type=int, default=10, help="Members that get expensive together. Default=%(default)s")
+    args = parser.parse_args()
+
+    print(f"{'members':>10} {'iterations':>10} {'shares':>9} {'pairs':>9} {'found':>9} {'partnered':>9} {'top pairs':>9}")
+    for iterations in [10, 100]:
+        m = 1_000
+        while m <= args.max:
+            rng = np.random.default_rng(0)
+            X = rng.integers(1_000, 1_000_000, size=(m, 1)) * (1 + 0.05 * rng.random((m, iterations)))
+            drivers = rng.choice(m, args.drivers, replace=False)
+            bad_seeds = rng.random(iterations) < 0.3
+            X[drivers] *= np.where(bad_seeds, 10, 1)
+            t0 = time.perf_counter()
+            c = contributions(X)
+            t_shares = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            p = correlated_pairs(X, c["var_total"], 20)
+            t_pairs = time.perf_counter() - t0
+            found = len(np.intersect1d(np.argsort(-c["var_share"])[:args.drivers], drivers))
+            partnered = np.isin(p["partner"][drivers], drivers).sum()
+            top_pairs = (np.isin(p["pair_i"], drivers) & np.isin(p["pair_j"], drivers)).sum()
+            print(f"{m:>10} {iterations:>10} {t_shares:8.3f}s {t_pairs:8.3f}s {found:>6}/{args.drivers} {partnered:>6}/{args.drivers} {top_pairs:>6}/{len(p['pair_i'])}")
+            m *= 10
+
+if __name__ == "__main__":
+    main()
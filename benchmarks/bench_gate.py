@@ -0,0 +1,35 @@
+#! python3
+"""
+Time darum gate's tests of all the elements of a synthetic candidate against a baseline,
+for growing numbers of elements and iterations.
+
+    python benchmarks/bench_gate.py [--max 100000]
+"""
+
+import argparse
+import time
+from darum.columnar import ResultsColumns
+from darum.gate import gate
+from synthetic import synthetic_results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", type=int, default=100_000, help="Largest number of elements. Default=%(default)s")
+    args = parser.parse_args()
+
+    print(f"{'elements':>10} {'iterations':>10} {'gate':>9} {'regressed':>9}")
+    for iterations in [10, 100]:
+        n = 1_000
+        while n <= args.max:
+            baseline = ResultsColumns(synthetic_results(n, iterations, seed=0))
+            candidate = ResultsColumns(synthetic_results(n, iterations, seed=0))
+            # same elements and base RCs, new noise
+            candidate.values["RC"] *= 1 + 0.01 * (candidate.values["RC"] % 7 - 3) / 3
+            t0 = time.perf_counter()
+            g = gate(baseline, candidate, 0.05, 0.1, False)
+            t = time.perf_counter() - t0
+            print(f"{n:>10} {iterations:>10} {t:8.3f}s {int(g['regression'].sum()):>9}")
+            n *= 10
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#! python3
+"""
+Time and embedded size of plot_distribution's overview heatmap for growing numbers of elements,
+against the size of plotting one glyph per sample like the spikes do.
+
+    python benchmarks/bench_heatmap.py [--max 100000] [--iterations 10]
+"""
+
+import argparse
+import json
+import time
+from bokeh.embed import json_item
+from darum.columnar import ResultsColumns
+from darum.heatmap import heatmap, heatmap_figure
+from synthetic import synthetic_results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", type=int, default=100_000, help="Largest number of elements. Default=%(default)s")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("-n", "--nbins", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'elements':>10} {'binning':>9} {'figure':>9} {'size':>9} {'per-sample':>11}")
+    n = 1_000
+    while n <= args.max:
+        cols = ResultsColumns(synthetic_results(n, args.iterations))
+        t0 = time.perf_counter()
+        fractions, edges, starts = heatmap(cols, cols.positions(cols.element), args.nbins)
+        t_bin = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        size = len(json.dumps(json_item(heatmap_figure(fractions, edges, starts, cols.element.tolist(), "bench", "table"))))
+        t_fig = time.perf_counter() - t0
+        # x and y of each sample as base64 float64 arrays
+        per_sample = len(cols.values["RC"]) * 2 * 8 * 4 // 3
+        print(f"{n:>10} {t_bin:8.3f}s {t_fig:8.3f}s {size / 1e6:7.2f}MB {per_sample / 1e6:9.2f}MB")
+        n *= 10
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#! python3
+"""
+Time the binning of all elements' RCs at once against one np.histogram per element.
+
+    python benchmarks/bench_histograms.py [--max 1000000] [--legacy-max 100000]
+"""
+
+import argparse
+import time
+import numpy as np
+from darum.columnar import ResultsColumns
+from darum.histograms import bin_spans, histograms, log_counts
+from synthetic import synthetic_results
+
+def legacy_histograms(results, bins) -> list:
+    """The per-element binning and bin span scan that histograms() replaced"""
+    out = []
+    for d in results.values():
+        counts, _ = np.histogram(d.RC, bins=bins)
+        nonempty_bins = [b for b, c in enumerate(counts) if c != 0]
+        bin_span = nonempty_bins[-1]-nonempty_bins[0] if nonempty_bins else -1
+        with np.errstate(divide='ignore'):
+            out.append((counts, bin_span, np.log10(counts)))
+    return out
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", type=int, default=1_000_000, help="Largest number of elements. Default=%(default)s")
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="Largest number of elements for the per-element binning. Default=%(default)s")
+    parser.add_argument("-n", "--nbins", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'elements':>10} {'batched':>10} {'per-element':>12}")
+    n = 1_000
+    while n <= args.max:
+        results = synthetic_results(n)
+        cols = ResultsColumns(results)
+        bins = np.linspace(cols.min("RC").min(), cols.max("RC").max(), args.nbins+1)
+        t0 = time.perf_counter()
+        counts = histograms(cols.padded("RC"), bins)
+        spans = bin_spans(counts)
+        log_counts(counts)
+        t_new = time.perf_counter() - t0
+        t_legacy = ""
+        if n <= args.legacy_max:
+            t0 = time.perf_counter()
+            legacy = legacy_histograms(results, bins)
+            t_legacy = f"{time.perf_counter() - t0:11.3f}s"
+            assert all((c == counts[i]).all() and s == spans[i] for i, (c, s, _) in enumerate(legacy))
+        print(f"{n:>10} {t_new:9.3f}s {t_legacy:>12}")
+        del results, cols
+        n *= 10
+
+if __name__ == "__main__":
+    main()
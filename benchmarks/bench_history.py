@@ -0,0 +1,70 @@
+#! python3
+"""
+Time answering "top brittle elements over the last runs" by re-reading the logs, against ingesting them once
+into the history database and querying it.
+
+    python benchmarks/bench_history.py [--logs 10] [--members 2000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic import synthetic_log
+from darum.columnar import ResultsColumns
+from darum.history import elementStats
+from darum.log_readers import readLogs
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=10)
+    parser.add_argument("--members", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logs = []
+        for i in range(args.logs):
+            j = synthetic_log(args.members, seed=i)
+            j["darum"]["timestamp"] = f"2024-09-{i+1:02}T00:00:00+00:00"
+            logs.append(os.path.join(tmp, f"run{i}.json"))
+            with open(logs[-1], "w") as f:
+                json.dump(j, f)
+        size = sum(os.path.getsize(l) for l in logs)
+
+        t0 = time.perf_counter()
+        best: dict[str, float] = {}
+        for l in logs:
+            cols = ResultsColumns(readLogs([l]))
+            for e, s in zip(cols.element.tolist(), elementStats(cols)["score"].tolist()):
+                best[e] = max(best.get(e, s), s)
+        top = sorted(best, key=best.get, reverse=True)[:20]
+        t_reparse = time.perf_counter() - t0
+
+        db = os.path.join(tmp, "history.sqlite")
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "darum.history", tmp, "-d", db], capture_output=True, check=True)
+        t_ingest = time.perf_counter() - t0
+
+        from darum import history_query
+        sys.argv = ["query", "brittle", "-d", db, "-n", "0", "-f", "json"]
+        t0 = time.perf_counter()
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            history_query.main()
+            sys.stdout = stdout
+        t_query = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, "-m", "darum.history_query", "brittle", "-d", db, "-n", "0", "-f", "json"], capture_output=True, check=True).stdout
+        t_process = time.perf_counter() - t0
+        assert [r["element"] for r in json.loads(out)] == top
+        db_size = os.path.getsize(db)
+
+    print(f"{args.logs} logs of {args.members} members ({size / 1e6:.0f} MB): re-reading {t_reparse:.2f}s, "
+          f"ingesting once {t_ingest:.2f}s ({db_size / 1e6:.0f} MB), "
+          f"query {t_query * 1000:.0f}ms ({t_process * 1000:.0f}ms as a new process)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#! python3
+"""
+Size and generation time of plot_distribution's HTML page for a synthetic log
+that carries its sources and a long Dafny output, like the ones from dafny_measure.
+
+    python benchmarks/bench_html_size.py [--members 3000] [--output-lines 30000] [--max-size MB]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic import synthetic_log
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=3000)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--output-lines", type=int, default=30000)
+    parser.add_argument("--max-size", help="Passed to plot_distribution's --max-size")
+    args = parser.parse_args()
+
+    log = synthetic_log(args.members, args.iterations, IA=False)
+    lines = {}
+    for vr in log["verificationResults"]:
+        for a in vr["vcResults"][0]["assertions"]:
+            lines[a["filename"]] = max(lines.get(a["filename"], 0), a["line"])
+    log["darum"]["files"] = {f: {"contents": "\n".join(f"  assert x{i} == y{i} + z; // seq<int>" for i in range(n + 10))}
+                             for f, n in lines.items()}
+    log["darum"]["output"] = [f"\x1b[32mVerified\x1b[0m member{i} resource count {i * 1000}\n" for i in range(args.output_lines)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logpath = os.path.join(tmp, "synthetic.json")
+        with open(logpath, "w") as f:
+            json.dump(log, f)
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "darum.plot_distribution", logpath, "-p", "-o", tmp]
+                       + (["--max-size", args.max_size] if args.max_size else []),
+                       capture_output=True, check=True)
+        t = time.perf_counter() - t0
+        size = os.path.getsize(os.path.join(tmp, "synthetic.html"))
+    print(f"{args.members} members, {sum(lines.values())} source lines, {args.output_lines} output lines: "
+          f"{size / 1e6:.2f} MB in {t:.2f}s")
+
+if __name__ == "__main__":
+    main()
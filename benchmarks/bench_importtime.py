@@ -0,0 +1,89 @@
+#! python3
+"""
+Measure with `python -X importtime` what each console script imports just to show its --help,
+and fail if it goes over its threshold or imports any of the heavy dependencies.
+The `darum` subcommands are measured too.
+
+    python benchmarks/bench_importtime.py [--repeats 5] [--scale 1.0]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import tomllib
+from pathlib import Path
+
+# Best-of total import time for --help, in ms. About twice what was measured, since machines vary.
+thresholds = {
+    "plot_distribution": 250,
+    "dafny_measure": 100,
+    "compare_distribution": 100,
+    "find_extremes": 120,
+    "darum": 20,
+    "darum measure": 100,
+    "darum plot": 250,
+    "darum compare": 100,
+    "darum find-extremes": 120,
+    "darum seeds": 100,
+    "darum reproduce": 120,
+    "darum replay": 160,
+    "darum ingest": 300,
+    "darum query": 120,
+    "darum trend": 270,
+    "darum gate": 230,
+    "darum correlate": 210,
+}
+# Only needed once a command actually runs
+heavy = ["pandas", "holoviews", "bokeh", "panel", "ansi2html", "psutil", "sh", "scipy"]
+
+importtime_line = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def console_scripts() -> dict[str, str]:
+    """script: entry point, from pyproject.toml"""
+    with open(Path(__file__).parent.parent / "pyproject.toml", "rb") as f:
+        return tomllib.load(f)["tool"]["poetry"]["scripts"]
+
+def importtime(entry_point: str, args: list[str]) -> tuple[float, set[str]]:
+    """Total import time in ms of running the entry point (module:function) like its console script does,
+    and the top-level packages it imported"""
+    module, function = entry_point.split(":")
+    code = f"import sys; from {module} import {function}; sys.argv = ['bench'] + {args!r}; sys.exit({function}())"
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if p.returncode != 0:
+        sys.exit(f"{entry_point} {' '.join(args)} failed:\n{p.stderr}")
+    total = 0
+    packages = set()
+    for line in p.stderr.splitlines():
+        m = importtime_line.match(line)
+        if m is None:
+            continue
+        if m[3] == " ": # not nested in another import
+            total += int(m[2])
+        packages.add(m[4].split(".")[0])
+    return total / 1000, packages
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the thresholds, for slower machines. Default=%(default)s")
+    args = parser.parse_args()
+
+    from darum.cli import commands
+    runs = {name: (entry_point, ["--help"]) for name, entry_point in console_scripts().items()}
+    runs |= {f"darum {c}": ("darum.cli:main", [c, "--help"]) for c in commands}
+
+    failed = False
+    for name, (entry_point, cmd_args) in runs.items():
+        measures = [importtime(entry_point, cmd_args) for _ in range(args.repeats)]
+        ms = min(t for t, _ in measures)
+        heavy_imported = sorted(set(heavy) & measures[0][1])
+        threshold = thresholds.get(name)
+        ok = not heavy_imported and (threshold is None or ms <= threshold * args.scale)
+        failed |= not ok
+        print(f"{name:22} {ms:8.1f} ms  (threshold {threshold or '-'} ms)"
+              f"{'  imports ' + ', '.join(heavy_imported) if heavy_imported else ''}{'' if ok else '  FAIL'}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
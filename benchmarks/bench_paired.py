@@ -0,0 +1,56 @@
+#! python3
+"""
+Detection power of darum gate with independent seeds against --paired, for growing iterations.
+The synthetic RCs are dominated by the seed: each (element, seed) has its own cost, and the code change only adds
+a small noise, plus a shift for some elements.
+
+    python benchmarks/bench_paired.py [--elements 500] [--shift 1.15]
+"""
+
+import argparse
+import numpy as np
+from darum.columnar import ResultsColumns
+from darum.gate import gate
+from darum.log_readers import Details, resultsType
+
+def results(seed_costs: np.ndarray, seeds: np.ndarray, factor: np.ndarray, rng, noise: float) -> resultsType:
+    RCs = (seed_costs * factor[:, None] * np.exp(noise * rng.standard_normal(seed_costs.shape))).astype(np.int64)
+    r: resultsType = {}
+    for e in range(len(RCs)):
+        d = Details()
+        d.displayName = f"member{e}"
+        d.RC = RCs[e].tolist()
+        d.RC_seeds = seeds.tolist()
+        r[d.displayName] = d
+    return r
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=500)
+    parser.add_argument("--regressed", type=float, default=0.1, help="Fraction of the elements that regress. Default=%(default)s")
+    parser.add_argument("--shift", type=float, default=1.15, help="RC factor of the regressed elements. Default=%(default)s")
+    parser.add_argument("--seed-sigma", type=float, default=0.5, help="Log-RC deviation from seed to seed. Default=%(default)s")
+    parser.add_argument("--noise", type=float, default=0.03, help="Log-RC deviation between versions for the same seed. Default=%(default)s")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    regressed = rng.random(args.elements) < args.regressed
+    factor = np.where(regressed, args.shift, 1.0)
+    base = rng.integers(10_000, 1_000_000, size=args.elements)[:, None]
+    print(f"{args.elements} elements, {regressed.sum()} regressed by x{args.shift}")
+    print(f"{'iterations':>10} {'independent':>12} {'paired':>12}   (detected / false alarms)")
+    for iterations in [5, 10, 20, 40]:
+        seed_cost = lambda: base * np.exp(args.seed_sigma * rng.standard_normal((args.elements, iterations)))
+        seeds = np.arange(iterations)
+        shared = seed_cost()
+        baseline = ResultsColumns(results(shared, seeds, np.ones(args.elements), rng, args.noise))
+        independent = ResultsColumns(results(seed_cost(), seeds + iterations, factor, rng, args.noise))
+        paired = ResultsColumns(results(shared, seeds, factor, rng, args.noise))
+        line = f"{iterations:>10}"
+        for cand, s in [(independent, None), (paired, seeds)]:
+            g = gate(baseline, cand, 0.05, 0.1, False, s)
+            line += f" {int((g['regression'] & regressed).sum()):>6} / {int((g['regression'] & ~regressed).sum()):<3}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
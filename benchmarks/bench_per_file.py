@@ -0,0 +1,50 @@
+#! python3
+"""
+Time and size of plot_distribution's single page for a multi-file synthetic log, against its --per-file pages.
+
+    python benchmarks/bench_per_file.py [--members 3000] [--files 6] [--jobs 4]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic import synthetic_log
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=3000)
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--source-lines", type=int, default=20000, help="Lines of each source file. Default=%(default)s")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        j = synthetic_log(args.members, members_per_file=-(-args.members // args.files))
+        source = "\n".join(f"    assert line{i};" for i in range(args.source_lines))
+        j["darum"]["files"] = {f"file{i}.dfy": {"contents": source, "hash": str(i)} for i in range(args.files)}
+        logpath = os.path.join(tmp, "project.json")
+        with open(logpath, "w") as f:
+            json.dump(j, f)
+
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "darum.plot_distribution", logpath, "-o", os.path.join(tmp, "one")],
+                       capture_output=True, check=True)
+        t_one = time.perf_counter() - t0
+        size_one = os.path.getsize(os.path.join(tmp, "one", "project.html"))
+
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "darum.plot_distribution", logpath, "--per-file", "-o", os.path.join(tmp, "per_file"), "-j", str(args.jobs)],
+                       capture_output=True, check=True)
+        t_per_file = time.perf_counter() - t0
+        pages = [os.path.getsize(os.path.join(tmp, "per_file", p)) for p in os.listdir(os.path.join(tmp, "per_file")) if p != "project.html"]
+        assert len(pages) == args.files
+
+    print(f"{args.members} members in {args.files} files: one page {t_one:.2f}s {size_one / 1e6:.2f}MB, "
+          f"--per-file -j {args.jobs} {t_per_file:.2f}s, largest page {max(pages) / 1e6:.2f}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#! python3
+"""
+Time darum gate's significance tests against scipy's, one element at a time, and check that both give the same
+statistics and p-values, so that a change to darum.significance can't silently break them.
+The samples are padded with NaN and rounded to produce ties, like real RCs.
+
+    python benchmarks/bench_significance.py [--elements 1000] [--iterations 30]
+"""
+
+import argparse
+import time
+import numpy as np
+from scipy import stats
+from darum.significance import benjamini_hochberg, fisher_greater, mann_whitney_greater, max_exact, sign_greater, wilcoxon_greater
+
+def padded_samples(rng: np.random.Generator, elements: int, iterations: int, shift: float) -> np.ndarray:
+    m = np.round(rng.normal(100 + shift, 10, size=(elements, iterations)))
+    m[rng.random((elements, iterations)) < 0.2] = np.nan
+    return m
+
+def timed(f, *a):
+    t0 = time.perf_counter()
+    r = f(*a)
+    return r, time.perf_counter() - t0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=1_000, help="Default=%(default)s")
+    parser.add_argument("--iterations", type=int, default=30, help="Default=%(default)s")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    n, it = args.elements, args.iterations
+
+    print(f"{'test':>14} {'darum':>9} {'scipy':>9} {'max |dp|':>9}")
+    def report(name, t, t_ref, p, p_ref):
+        print(f"{name:>14} {t:8.3f}s {t_ref:8.3f}s {np.abs(p - p_ref).max():9.2e}")
+        assert np.allclose(p, p_ref, rtol=1e-6, atol=1e-12), f"{name}: p-values differ from scipy's"
+
+    x, y = padded_samples(rng, n, it, 0), padded_samples(rng, n, it, 3)
+    (U, p), t = timed(mann_whitney_greater, x, y)
+    ref, t_ref = timed(lambda: [stats.mannwhitneyu(b[~np.isnan(b)], a[~np.isnan(a)], alternative="greater", method="asymptotic")
+                                for a, b in zip(x, y)])
+    assert np.allclose(U, [r.statistic for r in ref]), "mann_whitney_greater: U differs from scipy's"
+    report("mann-whitney", t, t_ref, p, np.array([r.pvalue for r in ref]))
+
+    total_x, total_y = rng.integers(0, it, n), rng.integers(0, it, n)
+    bad_x, bad_y = rng.integers(0, total_x + 1), rng.integers(0, total_y + 1)
+    p, t = timed(fisher_greater, bad_x, total_x, bad_y, total_y)
+    ref, t_ref = timed(lambda: [stats.fisher_exact([[by, ty - by], [bx, tx - bx]], alternative="greater").pvalue
+                                for bx, tx, by, ty in zip(bad_x, total_x, bad_y, total_y)])
+    report("fisher", t, t_ref, p, np.array(ref))
+
+    # a third of the rows without ties or zeros, to check the exact p-values too
+    d = y - x
+    exact_rows = rng.random(n) < 0.3
+    d[exact_rows] = rng.permutation(np.arange(1.0, it + 1)) * rng.choice([-1, 1], size=(exact_rows.sum(), it)) + 0.3
+    (W, p), t = timed(wilcoxon_greater, d)
+    def wilcoxon(row):
+        row = row[~np.isnan(row) & (row != 0)]
+        if len(row) == 0:
+            return np.nan, 1.0
+        exact = len(row) <= max_exact and len(np.unique(np.abs(row))) == len(row)
+        r = stats.wilcoxon(row, alternative="greater", correction=True, method="exact" if exact else "approx")
+        return r.statistic, r.pvalue
+    ref, t_ref = timed(lambda: np.array([wilcoxon(row) for row in d]))
+    has = ~np.isnan(ref[:, 0])
+    assert np.allclose(W[has], ref[has, 0]), "wilcoxon_greater: W+ differs from scipy's"
+    report("wilcoxon", t, t_ref, p, ref[:, 1])
+
+    worse, better = rng.integers(0, it, n), rng.integers(0, it, n)
+    p, t = timed(sign_greater, worse, better)
+    ref, t_ref = timed(lambda: [stats.binomtest(w, w + b, alternative="greater").pvalue if w + b > 0 else 1.0
+                                for w, b in zip(worse, better)])
+    report("sign", t, t_ref, p, np.array(ref))
+
+    q, t = timed(benjamini_hochberg, p)
+    ref, t_ref = timed(stats.false_discovery_control, p)
+    report("BH", t, t_ref, q, ref)
+
+if __name__ == "__main__":
+    main()
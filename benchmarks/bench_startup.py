@@ -0,0 +1,58 @@
+#! python3
+"""
+Time the headless reports of plot_distribution against just parsing the same log,
+and check that they don't import the plotting stack.
+
+    python benchmarks/bench_startup.py [--members 2000] [--iterations 10] [--repeats 3] [--budget 1.0]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic import synthetic_log
+
+plotting_stack = ["holoviews", "bokeh", "panel", "ansi2html"]
+
+def run(args: list[str], repeats: int) -> tuple[float, str]:
+    """Best wall time of a Python subprocess, and its -X importtime output"""
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        p = subprocess.run([sys.executable, "-X", "importtime"] + args, capture_output=True, text=True, check=True)
+        times.append(time.perf_counter() - t0)
+    return min(times), p.stderr
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=1.0, help="Max seconds over parsing for a report. Default=%(default)s")
+    parser.add_argument("--html", action="store_true", help="Also time the HTML plot, for reference")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logpath = os.path.join(tmp, "synthetic.json")
+        with open(logpath, "w") as f:
+            json.dump(synthetic_log(args.members, args.iterations), f)
+
+        t_parse, _ = run(["-c", f"from darum.log_readers import readLogs; readLogs([{logpath!r}], True)"], args.repeats)
+        print(f"{'parse only':>16} {t_parse:8.3f}s")
+        failed = False
+        runs = [["-f", f] for f in ["text", "markdown", "json"]] + ([["-o", tmp]] if args.html else [])
+        for extra in runs:
+            t, importtime = run(["-m", "darum.plot_distribution", logpath, "-p"] + extra, args.repeats)
+            imported = [m for m in plotting_stack if f" {m}\n" in importtime or f" {m}." in importtime]
+            headless = extra[0] == "-f"
+            over = t - t_parse
+            ok = not headless or (over < args.budget and not imported)
+            failed |= not ok
+            print(f"{' '.join(extra):>16} {t:8.3f}s  (+{over:.3f}s over parsing){'  imports ' + ', '.join(imported) if imported else ''}  {'' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
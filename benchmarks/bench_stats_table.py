@@ -0,0 +1,67 @@
+#! python3
+"""
+Time the construction of plot_distribution's statistics table, from 1k to 1M elements,
+against the previous row-by-row construction.
+
+    python benchmarks/bench_stats_table.py [--max 1000000] [--legacy-max 10000]
+"""
+
+import argparse
+import logging
+import time
+from math import inf
+import numpy as np
+import pandas as pd
+from darum.columnar import ResultsColumns
+from darum.plot_distribution import resultsTable
+from synthetic import synthetic_results, synthetic_sources
+
+def legacy_table(results) -> pd.DataFrame:
+    """The row-by-row construction that resultsTable replaced, without the source enrichment"""
+    df = pd.DataFrame(columns=["minRC", "maxRC", "span", "success", "OoR", "fail", "AB", "loc", "displayName", "desc"])
+    for k, v in results.items():
+        minRC_entry = min(v.RC, default=inf)
+        maxRC_entry = max(v.RC, default=-inf)
+        span = (maxRC_entry-minRC_entry)/minRC_entry
+        df.loc[k] = {
+            "success": len(v.RC),
+            "minRC": minRC_entry,
+            "maxRC": maxRC_entry,
+            "span": span,
+            "OoR": len(v.OoR),
+            "fail": len(v.failures),
+            "AB": v.AB,
+            "loc": v.loc,
+            "displayName": v.displayName,
+            "desc": v.description,
+        }
+    return df
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", type=int, default=1_000_000, help="Largest number of elements. Default=%(default)s")
+    parser.add_argument("--legacy-max", type=int, default=10_000, help="Largest number of elements for the row-by-row construction, which is quadratic. Default=%(default)s")
+    args = parser.parse_args()
+
+    log = logging.getLogger(__name__)
+    print(f"{'elements':>10} {'resultsTable':>14} {'row-by-row':>12}")
+    n = 1_000
+    while n <= args.max:
+        results = synthetic_results(n)
+        sources = synthetic_sources(results)
+        t0 = time.perf_counter()
+        df, _ = resultsTable(ResultsColumns(results), sources, None, log)
+        t_new = time.perf_counter() - t0
+        assert len(df) == n
+        t_legacy = ""
+        if n <= args.legacy_max:
+            t0 = time.perf_counter()
+            legacy = legacy_table(results)
+            t_legacy = f"{time.perf_counter() - t0:11.3f}s"
+            assert np.allclose(legacy["minRC"].astype(float), df["minRC"], equal_nan=True)
+        print(f"{n:>10} {t_new:13.3f}s {t_legacy:>12}")
+        del results, sources, df
+        n *= 10
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#! python3
+"""
+Time saving an HTML page with plot_distribution's FAIL/OoR tick formatter,
+against the previous TypeScript model that bokeh compiled with Node.js on every page.
+Each variant runs in a fresh process, since bokeh caches compiled models in-process.
+
+    python benchmarks/bench_tick_formatter.py [--repeats 3]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+page = """
+import os, sys, tempfile
+from bokeh.plotting import figure, save
+from bokeh.resources import CDN
+p = figure()
+p.scatter([1, 2, 3], [1e5, 2e6, 3e7])
+p.xaxis.formatter = formatter(2_000_000, format="0.0a")
+with tempfile.TemporaryDirectory() as tmp:
+    save(p, os.path.join(tmp, "page.html"), resources=CDN, title="bench")
+"""
+
+current = """
+from darum.plot_distribution import NumericalTickFormatterWithLimit as formatter
+"""
+
+legacy = '''
+from bokeh.models import NumeralTickFormatter
+from bokeh.util.compiler import TypeScript
+
+class NumericalTickFormatterWithLimit(NumeralTickFormatter):
+    fail_min = 0
+
+    def __init__(self, fail_min:int, **kwargs):
+        super().__init__(**kwargs)
+        NumericalTickFormatterWithLimit.fail_min = fail_min
+        NumericalTickFormatterWithLimit.__implementation__ = TypeScript("""
+import {NumeralTickFormatter} from 'models/formatters/numeral_tick_formatter'
+
+export class NumericalTickFormatterWithLimit extends NumeralTickFormatter {
+    static __name__ = '""" + __name__ + """.NumericalTickFormatterWithLimit'
+    FAIL_MIN=""" + str(int(fail_min)) + """
+
+    doFormat(ticks: number[], _opts: {loc: number}): string[] {
+        const formatted = []
+        const ticks2 = super.doFormat(ticks, _opts)
+        for (let i = 0; i < ticks.length; i++) {
+            if (ticks[i] < this.FAIL_MIN) {
+                formatted.push(ticks2[i])
+            } else {
+                formatted.push('FAIL/OoR')
+            }
+        }
+        return formatted
+    }
+}
+""")
+
+formatter = NumericalTickFormatterWithLimit
+'''
+
+def run(code: str) -> float:
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if p.returncode != 0:
+        sys.exit(p.stderr)
+    return time.perf_counter() - t0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    t_current = min(run(current + page) for _ in range(args.repeats))
+    print(f"{'CustomJS':>10} {t_current:8.3f}s")
+    try:
+        t_legacy = min(run(legacy + page) for _ in range(args.repeats))
+    except SystemExit as e:
+        print(f"{'TypeScript':>10} failed (Node.js missing?): {str(e).strip().splitlines()[-1]}")
+        return
+    print(f"{'TypeScript':>10} {t_legacy:8.3f}s  ({t_legacy - t_current:.3f}s saved per page)")
+
+if __name__ == "__main__":
+    main()
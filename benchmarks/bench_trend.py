@@ -0,0 +1,43 @@
+#! python3
+"""
+Time darum trend's alignment and shift detection over a long history, straight from a synthetic history database.
+
+    python benchmarks/bench_trend.py [--runs 50] [--elements 10000]
+"""
+
+import argparse
+import time
+import numpy as np
+from darum.history import openHistory
+from darum.trend import shifts, trendTable, versions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--elements", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    db = openHistory(":memory:")
+    base = rng.integers(1_000, 1_000_000, size=args.elements)
+    for r in range(args.runs):
+        db.execute("INSERT INTO runs (id, timestamp, IAmode) VALUES (?,?,0)", (r + 1, f"2024-{1 + r // 28:02}-{1 + r % 28:02}"))
+        # every element drifts a bit; a few jump
+        minRC = base * (1 + 0.05 * rng.random(args.elements)) * np.where(rng.random(args.elements) < 0.001, 2, 1)
+        maxRC = minRC * (1.05 + 0.02 * rng.random(args.elements))
+        db.executemany("INSERT INTO elements (run, element, AB, file_hash, success, OoR, fail, minRC, maxRC) VALUES (?,?,0,?,10,0,0,?,?)",
+                       zip([r + 1] * args.elements, [f"member{e}" for e in range(args.elements)], [f"hash{r}"] * args.elements,
+                           minRC.tolist(), maxRC.tolist()))
+    runs = list(range(1, args.runs + 1))
+
+    t0 = time.perf_counter()
+    v = versions(db, runs, False, False)
+    t_sql = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    s = shifts(v, 0.25, 0.05)
+    df = trendTable(v, s, 0.25, 0.05, False)
+    t_np = time.perf_counter() - t0
+    print(f"{args.runs} runs of {args.elements} elements: aligning {t_sql:.2f}s, shifts and table {t_np:.2f}s, {len(df)} regressed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Synthetic results for the benchmarks: members with a few ABs each, multimodal RCs, and some OoRs and failures.
+"""
+
+import numpy as np
+from darum.log_readers import Details, resultsType
+
+def synthetic_results(elements: int, iterations: int = 10, seed: int = 0) -> resultsType:
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(0, 2**31, size=iterations).tolist()
+    base = rng.integers(1_000, 1_000_000, size=elements)
+    # a tenth of the elements are brittle: some iterations cost 10x more, and some fail or run out of resources
+    brittle = rng.random(elements) < 0.1
+    noise = 1 + 0.05 * rng.random((elements, iterations))
+    slow = brittle[:, None] & (rng.random((elements, iterations)) < 0.3)
+    RCs = (base[:, None] * noise * np.where(slow, 10, 1)).astype(np.int64)
+    outcome = np.where(brittle[:, None], rng.choice(3, size=(elements, iterations), p=[0.9, 0.05, 0.05]), 0)
+    results: resultsType = {}
+    ABs_per_member = 4
+    for e in range(elements):
+        member = e // ABs_per_member
+        AB = e % ABs_per_member
+        d = Details()
+        d.displayName = f"Module{member // 100}.member{member}"
+        d.AB = AB
+        d.filename = f"file{member // 1000}.dfy"
+        line = 10 + e % (1000 * ABs_per_member) # within its file
+        d.loc = f"{line}:5" if AB > 0 else f"L{line}-{line + 10}"
+        d.description = "assertion" if AB > 0 else "*"
+        for rc, o, s in zip(RCs[e].tolist(), outcome[e].tolist(), seeds):
+            if o == 0:
+                d.RC.append(rc)
+                d.RC_seeds.append(s)
+            elif o == 1:
+                d.OoR.append(rc)
+                d.OoR_seeds.append(s)
+            else:
+                d.failures.append(rc)
+                d.failures_seeds.append(s)
+        name = d.displayName if AB == 0 else f"{d.displayName} AB{AB}"
+        results[name] = d
+    return results
+
+def synthetic_sources(results: resultsType) -> dict[str, list[str]]:
+    lines = [f"    assert line{i};" for i in range(1, 1000 * 4 + 30)]
+    return {f: lines for f in {d.filename for d in results.values()}}
+
+def synthetic_log(members: int, iterations: int = 10, IA: bool = True, seed: int = 0, members_per_file: int = 1000) -> dict:
+    """A Dafny measure-complexity JSON log with a darum context, for the benchmarks that need to read logs"""
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(0, 2**31, size=iterations).tolist()
+    ABs = 3 if IA else 1
+    base = rng.integers(1_000, 1_000_000, size=(members, ABs, 1))
+    brittle = rng.random((members, 1, 1)) < 0.1
+    slow = brittle & (rng.random((members, ABs, iterations)) < 0.3)
+    RCs = (base * (1 + 0.05 * rng.random((members, ABs, iterations))) * np.where(slow, 10, 1)).astype(np.int64)
+    OoR = brittle & (rng.random((members, ABs, iterations)) < 0.05)
+    vRs = []
+    for it, s in enumerate(seeds):
+        for m in range(members):
+            vcRs = []
+            for ab in range(ABs):
+                outcome = "OutOfResource" if OoR[m, ab, it] else "Valid"
+                vcRs.append({"vcNum": ab + 1, "outcome": outcome, "resourceCount": int(RCs[m, ab, it]), "randomSeed": s,
+                             "assertions": [{"filename": f"file{m // members_per_file}.dfy", "line": 10 + (m % members_per_file) * 5 + ab, "col": 5, "description": f"assertion {ab + 1}"}]})
+                if outcome != "Valid":
+                    break
+            outcome = "Correct" if all(v["outcome"] == "Valid" for v in vcRs) else "OutOfResource"
+            vRs.append({"name": f"Module{m // 100}.member{m} (well-formedness)", "outcome": outcome,
+                        "resourceCount": sum(v["resourceCount"] for v in vcRs), "vcResults": vcRs})
+    return {"verificationResults": vRs, "darum": {
+        "files": {}, "output": [], "dafny_cmd": ["dafny", "measure-complexity", "--iterations", str(iterations)],
+        "darum_args": {"IAmode": IA, "limitRC": None}}}
@@ -0,0 +1,186 @@
+"""
+Plot many pages at once, with a pool of processes that already imported the plotting stack:
+one page per log (--batch), or one page per source file of the logs (--per-file).
+Also writes an index page of the plotted pages, sorted by their worst score.
+"""
+
+from __future__ import annotations
+import contextlib
+import html
+import io
+import logging as log
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import copy
+from math import isnan, nan
+from quantiphy import Quantity
+from darum.log_readers import logPaths, readDarumContext, readLogs, resultsType
+
+# Imported by the forkserver before forking the workers, so that each page doesn't pay for them again
+preloaded = ["pandas", "holoviews", "panel", "bokeh.plotting", "ansi2html"]
+
+# Dafny's messages start with the file they refer to, like `file.dfy(12,5): Error: ...`
+dafny_message_file = re.compile(r'([^\s()]+\.dfy)\(\d+,\d+\)')
+
+def workerPool(jobs: int) -> ProcessPoolExecutor:
+    """forkserver: the workers fork from a process that already imported the plotting stack, and each plots many pages.
+    Unlike plain fork, it's safe with the threads that some of those libraries start."""
+    context = None
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(preloaded)
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=context)
+
+def plotOne(args, paths: list[str], name: str, **plot_kwargs) -> dict:
+    """Plot a page of the given logs with the batch's arguments, and return its summary, named `name` in the index.
+    Runs in a worker, so its output is captured instead of interleaved"""
+    from darum.plot_distribution import plot
+    args = copy(args)
+    args.paths = paths
+    args.batch = False
+    args.per_file = False
+    summary = {"name": name}
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            plot(args, summary, **plot_kwargs)
+    except (Exception, SystemExit) as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+        summary["output"] = out.getvalue()
+    return summary
+
+def plotAll(args, tasks: list[tuple[list[str], str, dict]]) -> list[dict]:
+    """plotOne for each (paths, name, plot_kwargs), in a pool of args.jobs workers, reporting progress"""
+    summaries = []
+    with workerPool(min(args.jobs, len(tasks))) as pool:
+        futures = [pool.submit(plotOne, args, paths, name, **kwargs) for paths, name, kwargs in tasks]
+        for i, f in enumerate(as_completed(futures)):
+            s = f.result()
+            summaries.append(s)
+            if "error" in s:
+                log.error(f"{s['name']}: {s['error']}\n{s['output']}")
+            print(f"[{i+1}/{len(tasks)}] {s['name']}: " + ("failed" if "error" in s else f"worst score {Quantity(s['worst_score']):.3} ({', '.join(s['worst_elements'][:1])})"))
+    return summaries
+
+def indexPage(summaries: list[dict], title: str, what: str) -> str:
+    """HTML page with a row per page (of a log or a file: `what`), linking to it, sorted by worst score. Failed ones go last."""
+    def key(s):
+        score = s.get("worst_score", nan)
+        return ("error" in s, -score if not isnan(score) else 0)
+    ok = [s for s in summaries if "error" not in s]
+    totals = {k: sum(s[k] for s in ok) for k in ["elements", "with_OoR", "with_failures", "total_RC"]}
+    # IA mode pages count ABs, standard mode pages count members
+    counts = {c: sum(s["elements"] for s in ok if s["counted"] == c) for c in ["members", "ABs"]}
+    counted = " and ".join(f"{n} {c}" for c, n in counts.items() if n) or "0 members"
+    rows = []
+    for s in sorted(summaries, key=key):
+        name = html.escape(s["name"])
+        if "error" in s:
+            rows.append(f'<tr class="error"><td>{name}</td><td colspan="7">{html.escape(s["error"])}</td></tr>')
+            continue
+        rows.append(f'<tr><td><a href="{html.escape(os.path.basename(s["page"]))}">{name}</a></td>'
+                    f'<td class="n">{Quantity(s["worst_score"]):.3}</td><td>{"<br>".join(html.escape(e) for e in s["worst_elements"])}</td>'
+                    f'<td class="n">{s["elements"]} {s["counted"]}</td><td class="n">{Quantity(s["total_RC"]):.3}</td>'
+                    f'<td class="n">{s["with_OoR"]}</td><td class="n">{s["with_failures"]}</td>'
+                    f'<td>{"IA" if s["IAmode"] else "standard"}</td></tr>')
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif }}
+table {{ border-collapse: collapse }}
+th, td {{ padding: 2px 8px; border-bottom: 1px solid #DDD; text-align: left; vertical-align: top }}
+td.n {{ text-align: right }}
+tr.error {{ color: #A00 }}
+</style></head>
+<body><h1>{html.escape(title)}</h1>
+<p>{len(summaries)} {what}s, {counted}, total RC {Quantity(totals["total_RC"]):.3},
+{totals["with_OoR"]} of them with OoR, {totals["with_failures"]} with failures.
+The total RC is the sum of the members' mean RC: what verifying them all once costs. The elements are the members in standard mode, and the ABs in IA mode.</p>
+<table>
+<tr><th>{what}</th><th>worst score</th><th>worst elements</th><th>elements</th><th>total RC</th><th>with OoR</th><th>with failures</th><th>mode</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+
+def writeIndex(summaries: list[dict], indexpath: str, title: str, what: str) -> int:
+    with open(indexpath, "w") as f:
+        f.write(indexPage(summaries, title, what))
+    print(f"Created file {indexpath}")
+    os.system(f"open {indexpath}")
+    return 1 if any("error" in s for s in summaries) else 0
+
+def checkArgs(args) -> None:
+    if args.format != "html":
+        sys.exit("--batch and --per-file only produce HTML pages")
+    logging_level = max(log.DEBUG, log.WARNING - args.verbose * 10)
+    log.basicConfig(level=logging_level, format='%(levelname)s:%(message)s')
+    os.makedirs(args.output_dir, exist_ok=True)
+
+def batch(args) -> int:
+    """A page per log, plus an index.html"""
+    checkArgs(args)
+    paths = logPaths(args.paths or ["darum"])
+    if not paths:
+        sys.exit("No logs to plot")
+    # Pages are named after their log, so logs with the same name in different dirs would overwrite each other's
+    names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    duplicated = {n for n in names if names.count(n) > 1}
+    if duplicated:
+        sys.exit(f"Logs with the same name would overwrite each other's page: {', '.join(sorted(duplicated))}")
+
+    summaries = plotAll(args, [([p], os.path.basename(p), {}) for p in paths])
+    return writeIndex(summaries, os.path.join(args.output_dir, "index.html"), f"Darum: {len(paths)} logs", "log")
+
+def fileOutput(output: list[str], filename: str) -> list[str]:
+    """The lines of Dafny's output about the given file: each message that starts with it, with its indented continuation lines.
+    General lines, about no file, are kept for every file"""
+    lines = []
+    current = None
+    for l in output:
+        m = dafny_message_file.search(l)
+        if m is not None:
+            current = os.path.basename(m[1])
+        elif not l.startswith((" ", "\t")):
+            current = None
+        if current in (None, filename):
+            lines.append(l)
+    return lines
+
+def fileContext(context: dict, filename: str) -> dict:
+    """The darum context of a log, with only the given source file and the output about it"""
+    base = os.path.basename(filename)
+    return context | {
+        "files": {k: v for k, v in context.get("files", {}).items() if os.path.basename(k) == base},
+        "output": fileOutput(context.get("output", []), base),
+    }
+
+def perFile(args) -> int:
+    """A page per source file, each embedding only its own source and output, plus the project index in place of the usual page"""
+    checkArgs(args)
+    if not args.paths:
+        sys.exit("--per-file needs the logs to plot")
+    results = readLogs(args.paths, args.recreate_pickle)
+    contexts = [readDarumContext(p) for p in args.paths]
+    title = "-".join([os.path.splitext(os.path.basename(p))[0] for p in args.paths])
+
+    shards: dict[str, resultsType] = {}
+    for element, d in results.items():
+        shards.setdefault(d.filename, {})[element] = d
+    tasks = []
+    titles: set[str] = set()
+    for filename, shard in sorted(shards.items()):
+        name = os.path.splitext(os.path.basename(filename))[0] or "unknown"
+        # files with the same name in different dirs
+        shard_title, n = f"{title}-{name}", 1
+        while shard_title in titles:
+            n += 1
+            shard_title = f"{title}-{name}{n}"
+        titles.add(shard_title)
+        tasks.append((args.paths, filename or "(no file)",
+                      {"results": shard, "contexts": [fileContext(c, filename) for c in contexts], "title": shard_title}))
+
+    summaries = plotAll(args, tasks)
+    return writeIndex(summaries, os.path.join(args.output_dir, title + ".html"), f"{title}: {len(tasks)} files", "file")
@@ -0,0 +1,48 @@
+#! python3
+"""
+Single entry point for darum's tools: `darum <command> [args]`.
+Each command's module is only imported when the command is run.
+"""
+
+import importlib
+import sys
+
+commands = { # command: (module, description)
+    "measure":       ("darum.dafny_measure",        "Run dafny measure-complexity and store an augmented log"),
+    "plot":          ("darum.plot_distribution",    "Analyze and plot a log"),
+    "compare":       ("darum.compare_distribution", "Compare a log in normal mode against one in IA mode"),
+    "find-extremes": ("darum.find_extremes",        "Search random seeds for extreme RCs of a member"),
+    "seeds":         ("darum.seed_bank",            "Record/list the seeds behind the extreme results of each member/AB"),
+    "reproduce":     ("darum.reproduce",            "Re-run the members' extreme results recorded in the seed bank"),
+    "replay":        ("darum.smt_replay",           "Replay captured SMT-LIB queries of ABs directly on Z3"),
+    "ingest":        ("darum.history",              "Add logs to the history database"),
+    "query":         ("darum.history_query",        "Query the history database: runs, most brittle elements, element history, seeds"),
+    "trend":         ("darum.trend",                "Flag the elements whose minRC or span jumped across successive runs"),
+    "correlate":     ("darum.correlation",          "Find which members drive the variance of the total cost of the iterations"),
+    "gate":          ("darum.gate",                 "CI gate: fail if a candidate log regressed significantly against a baseline"),
+}
+
+def usage() -> str:
+    lines = ["usage: darum <command> [args]", "", "commands:"]
+    for c, (_, desc) in commands.items():
+        lines.append(f"  {c:16} {desc}")
+    lines.append("")
+    lines.append("Run `darum <command> --help` for each command's options.")
+    return "\n".join(lines)
+
+def main() -> int:
+    if len(sys.argv) < 2 or sys.argv[1] in ["-h", "--help"]:
+        print(usage())
+        return 0
+    command = sys.argv[1]
+    if command not in commands:
+        print(f"Unknown command: {command}\n\n{usage()}", file=sys.stderr)
+        return 2
+    module = importlib.import_module(commands[command][0])
+    # the commands parse sys.argv themselves
+    sys.argv = [f"darum {command}"] + sys.argv[2:]
+    return module.main()
+
+# for easier debugging
+if __name__ == "__main__":
+    sys.exit(main())
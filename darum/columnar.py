@@ -0,0 +1,99 @@
+"""
+Array-backed view of the results, to compute per-element statistics in bulk instead of element by element.
+"""
+
+from itertools import chain
+import logging as log
+import numpy as np
+from darum.log_readers import resultsType
+
+kinds = ["RC", "OoR", "failures"]
+
+class ResultsColumns:
+    """The results as columns. Per-element data has one entry per element, in the order of the results.
+    The samples of each kind are concatenated for all elements, and offsets[kind][i]:offsets[kind][i+1]
+    delimits those of element i."""
+    def __init__(self, results: resultsType) -> None:
+        dets = list(results.values())
+        n = len(dets)
+        self.n = n
+        self.element = np.array(list(results.keys()), dtype=object)
+        self.displayName = np.array([d.displayName for d in dets], dtype=object)
+        self.AB = np.fromiter((d.AB for d in dets), dtype=np.int64, count=n)
+        self.filename = np.array([d.filename for d in dets], dtype=object)
+        self.loc = np.array([d.loc for d in dets], dtype=object)
+        self.description = np.array([d.description for d in dets], dtype=object)
+        self.offsets: dict[str, np.ndarray] = {}
+        self.values: dict[str, np.ndarray] = {}
+        self.seeds: dict[str, np.ndarray] = {}
+        self._position: dict[str, int] | None = None
+        for kind in kinds:
+            samples = [getattr(d, kind) for d in dets]
+            counts = np.fromiter(map(len, samples), dtype=np.int64, count=n)
+            self.offsets[kind] = np.concatenate(([0], np.cumsum(counts)))
+            total = int(self.offsets[kind][-1])
+            self.values[kind] = np.fromiter(chain.from_iterable(samples), dtype=np.float64, count=total)
+            self.seeds[kind] = np.fromiter(chain.from_iterable(getattr(d, kind + "_seeds") for d in dets), dtype=np.int64, count=total)
+
+    def positions(self, elements) -> np.ndarray:
+        """The row of each of the given elements"""
+        if self._position is None:
+            self._position = {e: i for i, e in enumerate(self.element)}
+        return np.fromiter((self._position[e] for e in elements), dtype=np.int64)
+
+    def count(self, kind: str) -> np.ndarray:
+        return np.diff(self.offsets[kind])
+
+    def owner(self, kind: str) -> np.ndarray:
+        """The element index of each sample"""
+        return np.repeat(np.arange(self.n), self.count(kind))
+
+    def reduce(self, kind: str, ufunc: np.ufunc, empty: float) -> np.ndarray:
+        """ufunc.reduce over each element's samples; elements without samples get `empty`"""
+        out = np.full(self.n, empty, dtype=np.float64)
+        nonempty = self.count(kind) > 0
+        if nonempty.any():
+            # reduceat only works well for non-empty segments
+            out[nonempty] = ufunc.reduceat(self.values[kind], self.offsets[kind][:-1][nonempty])
+        return out
+
+    def min(self, kind: str) -> np.ndarray:
+        return self.reduce(kind, np.minimum, np.inf)
+
+    def max(self, kind: str) -> np.ndarray:
+        return self.reduce(kind, np.maximum, -np.inf)
+
+    def all_seeds(self) -> np.ndarray:
+        """The seeds of all the samples, sorted and without repeats: one per iteration"""
+        return np.unique(np.concatenate(list(self.seeds.values())))
+
+    def by_seed(self, kind: str, rows: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+        """The samples of the given elements as a matrix with a column per seed (sorted), NaN where an element
+        has no sample with that seed. Logs measured with the same --random-seed share their per-iteration seeds,
+        so this pairs their samples."""
+        row = np.full(self.n, -1)
+        row[rows] = np.arange(len(rows))
+        r = row[self.owner(kind)]
+        c = np.minimum(np.searchsorted(seeds, self.seeds[kind]), max(len(seeds) - 1, 0))
+        found = (r >= 0) & (len(seeds) > 0)
+        found[found] = seeds[c[found]] == self.seeds[kind][found]
+        cells = r[found] * len(seeds) + c[found]
+        repeated = len(cells) - len(np.unique(cells))
+        if repeated:
+            log.warning(f"{repeated} {kind} samples repeat an element's seed, and only the last one is kept. "
+                        "Were some logs measured with the same --random-seed?")
+        m = np.full((len(rows), len(seeds)), np.nan)
+        m[r[found], c[found]] = self.values[kind][found]
+        return m
+
+    def padded(self, kind: str, rows: np.ndarray | None = None) -> np.ndarray:
+        """The samples of the given elements (default: all) as a matrix, one row per element, padded with NaN"""
+        if rows is None:
+            rows = np.arange(self.n)
+        counts = self.count(kind)[rows]
+        m = np.full((len(rows), int(counts.max(initial=0))), np.nan)
+        col = np.arange(m.shape[1])
+        mask = col[None, :] < counts[:, None]
+        src = self.offsets[kind][rows][:, None] + col[None, :]
+        m[mask] = self.values[kind][src[mask]]
+        return m
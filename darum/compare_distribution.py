@@ -2,21 +2,15 @@
 
 import argparse
 #from matplotlib import table
-import panel as pn
 from quantiphy import Quantity
 import logging as log
 from math import inf, nan
 import os
-import numpy as np
-import pandas as pd
 from darum.log_readers import Details, readLogs
+from darum.report import formats, report
 from quantiphy import Quantity
 from pathlib import Path
 
-from bokeh.models import NumeralTickFormatter, HoverTool
-from bokeh.util.compiler import TypeScript
-from bokeh.models.widgets.tables import NumberFormatter
-
 
 def smag(i) -> str:
     return f"{Quantity(i):.3}"
@@ -55,39 +49,14 @@ def row_from_Details(v: Details):
     }
 
 
-class NumericalTickFormatterWithLimit(NumeralTickFormatter):
-    min_fail = 0
-    min_OoR = 0
-
-    def __init__(self, min_OoR, min_fail, **kwargs):
-        super().__init__(**kwargs)
-        assert min_OoR < min_fail
-        NumericalTickFormatterWithLimit.min_fail = min_fail
-        NumericalTickFormatterWithLimit.min_OoR = min_OoR
-        NumericalTickFormatterWithLimit.__implementation__ = TypeScript(
-"""
-import {NumeralTickFormatter} from 'models/formatters/numeral_tick_formatter'
-
-export class NumericalTickFormatterWithLimit extends NumeralTickFormatter {
-    static __name__ = '""" + __name__ + """.NumericalTickFormatterWithLimit'
-    MIN_FAIL=""" + str(int(min_fail)) + """
-    MIN_OOR=""" + str(int(min_OoR)) + """
-    doFormat(ticks: number[], _opts: {loc: number}): string[] {
-        const formatted = []
-        const ticks2 = super.doFormat(ticks, _opts)
-        for (let i = 0; i < ticks.length; i++) {
-            if (ticks[i] < this.MIN_OOR) {
-                formatted.push(ticks2[i])
-            } else if (ticks[i] < this.MIN_FAIL) {
-                formatted.push('OoR')
-            } else {
-                formatted.push('FAIL')
-            }
-        }
-        return formatted
-    }
-}
-""")
+def NumericalTickFormatterWithLimit(min_OoR, min_fail, **kwargs):
+    """A NumeralTickFormatter that shows the ticks over min_OoR as OoR, and over min_fail as FAIL.
+    Plain JS run by bokeh's CustomJSTickFormatter, so there's nothing to compile when generating the page."""
+    from bokeh.models import CustomJSTickFormatter, NumeralTickFormatter
+    assert min_OoR < min_fail
+    return CustomJSTickFormatter(
+        args={"numeral": NumeralTickFormatter(**kwargs), "min_OoR": int(min_OoR), "min_fail": int(min_fail)},
+        code="return tick < min_OoR ? numeral.compute(tick) : tick < min_fail ? 'OoR' : 'FAIL'")
 
 def main() -> None:
     parser = argparse.ArgumentParser()
@@ -103,10 +72,15 @@ def main() -> None:
     # parser.add_argument("-s", "--stop", default=False, action='store_true', help="Process the data but stop before plotting")
     # parser.add_argument("-a", "--IAmode", default=False, action='store_true', help="Isolated Assertions mode. Used only for sanity checking.")
     parser.add_argument("-l", "--limitRC", type=Quantity, default=None, help="The RC limit used during verification. Used only for sanity checking.")
+    parser.add_argument("-f", "--format", choices=formats, default="html", help="html: plot to an HTML file. text/markdown/json: just print a report of the top N members (JSON: all members) without plotting. Default: %(default)s")
     # parser.add_argument("-b", "--bspan", type=int, default=0, help="The minimum bin span for a histogram to be plotted")
 
     args = parser.parse_args()
 
+    # Not needed for --help or bad arguments, and slow to import
+    import numpy as np
+    import pandas as pd
+
     numeric_level = log.WARNING - args.verbose * 10
     log.basicConfig(level=numeric_level,format='%(asctime)s-%(levelname)s:%(message)s',datefmt='%H:%M:%S')
 
@@ -172,9 +146,19 @@ def main() -> None:
 
 
 
+    if args.format != "html":
+        # Headless: just the report, without importing the plotting stack
+        table = df.drop(columns=["Element_ordered"]).set_index("Element")
+        print(report(args.format, product, {"Comparison normal mode vs IA mode": table}, "",
+                     {"paths_normal": args.path_normal, "paths_IA": args.path_IA}, args.top))
+        return
+
     # HOLOVIEWS
 
     import holoviews as hv # type: ignore
+    import panel as pn
+    from bokeh.models import HoverTool
+    from bokeh.models.widgets.tables import NumberFormatter
     # import hvplot
     # from hvplot import hvPlot
     from holoviews import opts
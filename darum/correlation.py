@@ -0,0 +1,209 @@
+#! python3
+"""
+Which members drive the swings of the total cost of an iteration. All the members of an iteration are verified with the same seed,
+so their costs can rise and fall together: the variance of the total is the sum of the members' variances plus all their covariances.
+Each member's share of it is its covariance with the total, which splits into its own variance and its covariance with the others.
+In IA mode, the same decomposition attributes each member's variance to its ABs.
+"""
+
+import argparse
+import logging as log
+import sys
+import numpy as np
+from darum.columnar import ResultsColumns, kinds
+from darum.log_readers import readLogs, smag
+from darum.report import formats, report
+
+def cost_matrix(cols: ResultsColumns, rows: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """The cost of each of the given elements in each iteration (a column per seed), whatever its outcome: an OoR or failure costs
+    what it consumed until then. NaN where the element has no result with that seed."""
+    m = np.full((len(rows), len(seeds)), np.nan)
+    for kind in kinds:
+        m = np.fmax(m, cols.by_seed(kind, rows, seeds))
+    return m
+
+def contributions(X: np.ndarray) -> dict[str, np.ndarray]:
+    """The decomposition of the variance of the total cost of the iterations (the columns of X) into the rows' contributions:
+    var(total) = sum_i cov(X_i, total), and cov(X_i, total) = var(X_i) + sum_j≠i cov(X_i, X_j).
+    Missing costs must have been filled in already."""
+    n = X.shape[1]
+    Xc = X - X.mean(axis=1, keepdims=True)
+    total = Xc.sum(axis=0)
+    var_total = total @ total / (n - 1)
+    var = (Xc ** 2).sum(axis=1) / (n - 1)
+    cov_total = Xc @ total / (n - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {"var_total": var_total, "sd": np.sqrt(var),
+                "var_share": cov_total / var_total, "var_own": var / var_total, "var_shared": (cov_total - var) / var_total,
+                "r_total": cov_total / np.sqrt(var * var_total)}
+
+def correlated_pairs(X: np.ndarray, var_total: float, top: int, budget: int = 10_000_000) -> dict[str, np.ndarray]:
+    """Each row's most correlated other row, and the top pairs of rows by their share of the variance of the total (2 cov / var(total)).
+    The covariance matrix is computed in chunks of rows, to bound the memory to about `budget` entries."""
+    m, n = X.shape
+    Xc = X - X.mean(axis=1, keepdims=True)
+    sd = np.sqrt((Xc ** 2).sum(axis=1) / (n - 1))
+    inv_sd = np.divide(1, sd, out=np.zeros(m), where=sd > 0) # constant rows correlate with nothing
+    partner = np.full(m, -1)
+    r_partner = np.full(m, np.nan)
+    best_i, best_j, best_cov = [np.zeros(0, dtype=np.int64)] * 2 + [np.zeros(0)]
+    step = max(1, budget // max(1, m))
+    for s in range(0, m, step):
+        e = min(m, s + step)
+        rows = np.arange(e - s)
+        cov = Xc[s:e] @ Xc.T
+        cov /= n - 1
+        r = cov * inv_sd[s:e, None]
+        r *= inv_sd[None, :]
+        r[rows, rows + s] = -np.inf
+        partner[s:e] = r.argmax(axis=1)
+        r_partner[s:e] = r[rows, partner[s:e]]
+        # each pair once: only the columns after the row
+        upper = cov[:, s:]
+        upper[np.tril_indices(e - s, m=m - s)] = -np.inf
+        flat = upper.ravel()
+        k = min(top, flat.size)
+        chosen = np.argpartition(flat, -k)[-k:] if k > 0 else np.zeros(0, dtype=np.int64)
+        best_i = np.concatenate([best_i, s + chosen // (m - s)])
+        best_j = np.concatenate([best_j, s + chosen % (m - s)])
+        best_cov = np.concatenate([best_cov, flat[chosen]])
+        keep = np.argsort(-best_cov, kind="stable")[:top]
+        best_i, best_j, best_cov = best_i[keep], best_j[keep], best_cov[keep]
+    constant = (sd == 0) | (m == 1)
+    partner[constant], r_partner[constant] = -1, np.nan
+    keep = np.isfinite(best_cov)
+    best_i, best_j, best_cov = best_i[keep], best_j[keep], best_cov[keep]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {"partner": partner, "r_partner": r_partner,
+                "pair_i": best_i, "pair_j": best_j, "pair_r": best_cov / (sd[best_i] * sd[best_j]), "pair_share": 2 * best_cov / var_total}
+
+def ab_attribution(cols: ResultsColumns, members: np.ndarray, seeds: np.ndarray) -> dict[str, np.ndarray]:
+    """In IA mode, how much each AB of the given members (cols rows) accounts for the variation of its member's cost, all members at once.
+    Only the iterations where the member succeeded count: in the others, the ABs after a failure are missing. There, the member's cost
+    is the sum of its ABs', so the decomposition is exact:
+    var_share is the AB's cov(AB, member) / var(member), and span_share its part of the cost difference between the member's
+    most and least expensive iterations. Each adds up to 100% over the member's ABs. Returns the ABs' rows, their member (index into members)
+    and shares, and the members' span and number of iterations."""
+    position = {dn: i for i, dn in enumerate(cols.displayName[members].tolist())}
+    g = np.fromiter((position.get(dn, -1) for dn in cols.displayName.tolist()), dtype=np.int64, count=cols.n)
+    abs_ = np.flatnonzero((cols.AB > 0) & (g >= 0))
+    g = g[abs_]
+    V = ~np.isnan(cols.by_seed("RC", members, seeds))
+    A = np.where(V[g], np.nan_to_num(cost_matrix(cols, abs_, seeds), nan=0), 0)
+    M = np.zeros(V.shape)
+    np.add.at(M, g, A)
+    n = V.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Mc = np.where(V, M - M.sum(axis=1, keepdims=True) / n[:, None], 0)
+        Ac = np.where(V[g], A - A.sum(axis=1, keepdims=True) / n[g, None], 0)
+        var = (Mc ** 2).sum(axis=1) / (n - 1)
+        var_share = (Ac * Mc[g]).sum(axis=1) / (n[g] - 1) / var[g]
+        var_own = (Ac ** 2).sum(axis=1) / (n[g] - 1) / var[g]
+        hi = np.where(V, M, -np.inf).argmax(axis=1)
+        lo = np.where(V, M, np.inf).argmin(axis=1)
+        M_hi, M_lo = M[np.arange(len(M)), hi], M[np.arange(len(M)), lo]
+        span_share = (A[np.arange(len(g)), hi[g]] - A[np.arange(len(g)), lo[g]]) / (M_hi - M_lo)[g]
+        span = (M_hi - M_lo) / M_lo
+    return {"AB_row": abs_, "member": g, "var_share": var_share, "var_own": var_own, "span_share": span_share,
+            "span": np.where(n > 0, span, np.nan), "iterations": n}
+
+def driversTable(names: np.ndarray, X: np.ndarray, c: dict[str, np.ndarray], p: dict[str, np.ndarray]):
+    import pandas as pd
+    df = pd.DataFrame({
+        "meanRC": X.mean(axis=1),
+        "sd": c["sd"],
+        "var_share": c["var_share"],
+        "var_own": c["var_own"],
+        "var_shared": c["var_shared"],
+        "r_total": c["r_total"],
+        "most_correlated": np.where(p["partner"] >= 0, names[p["partner"]], ""),
+        "r": p["r_partner"],
+    }, index=pd.Index(names, name="Member"))
+    return df.sort_values("var_share", ascending=False, kind="stable")
+
+def pairsTable(names: np.ndarray, p: dict[str, np.ndarray]):
+    import pandas as pd
+    return pd.DataFrame({"with": names[p["pair_j"]], "r": p["pair_r"], "var_share": p["pair_share"]},
+                        index=pd.Index(names[p["pair_i"]], name="Member"))
+
+def attributionTable(cols: ResultsColumns, members: np.ndarray, a: dict[str, np.ndarray], loc: np.ndarray | None = None, linked: np.ndarray | None = None):
+    """A row per member with several ABs and a varying cost, in the order of members: the AB that accounts for most of its variance,
+    with its share of the variance and of the span. The ABs' locations are taken from loc (default: cols.loc), and their linked flags
+    from linked, if given, both per cols row"""
+    import pandas as pd
+    top = np.lexsort((-np.nan_to_num(a["var_share"], nan=-np.inf), a["member"]))
+    first = top[np.flatnonzero(np.diff(a["member"][top], prepend=-1))]
+    ABs = np.bincount(a["member"], minlength=len(members))
+    shown = first[(ABs[a["member"][first]] > 1) & np.isfinite(a["var_share"][first])]
+    shown = shown[np.argsort(a["member"][shown], kind="stable")]
+    m, row = a["member"][shown], a["AB_row"][shown]
+    df = pd.DataFrame({
+        "span": a["span"][m],
+        "iterations": a["iterations"][m],
+        "ABs": ABs[m],
+        "worst_AB": cols.AB[row],
+        "loc": (cols.loc if loc is None else loc)[row],
+        "var_share": a["var_share"][shown],
+        "var_own": a["var_own"][shown],
+        "span_share": a["span_share"][shown],
+        "desc": cols.description[row],
+    }, index=pd.Index(cols.element[members][m], name="Member"))
+    if linked is not None:
+        df["linked"] = linked[row]
+    return df
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Find which members drive the variance of the total cost of the iterations, and which members get expensive together.")
+    parser.add_argument("logs", nargs="+", help="The log(s) to analyze. The iterations are matched by their seed")
+    parser.add_argument("-p", "--pairs", type=int, default=20, help="Number of most covarying pairs of members to list. Default=%(default)s")
+    parser.add_argument("-t", "--top", type=int, default=20, help="Rows in the text and Markdown tables. Default=%(default)s")
+    parser.add_argument("-f", "--format", choices=formats[1:], default="text")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    numeric_level = log.WARNING - args.verbose * 10
+    log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
+
+    cols = ResultsColumns(readLogs(args.logs))
+    seeds = cols.all_seeds()
+    members = np.flatnonzero(cols.AB == 0)
+    X = cost_matrix(cols, members, seeds)
+    measured = (~np.isnan(X)).sum(axis=1)
+    enough = measured >= 3
+    if (~enough).any():
+        log.info(f"{(~enough).sum()} members have less than 3 results, so they were skipped")
+    members, X, measured = members[enough], X[enough], measured[enough]
+    if len(seeds) < 3 or len(members) == 0:
+        sys.exit(f"Correlations need at least 3 iterations of some member. There are {len(seeds)} iterations")
+    missing = int(np.isnan(X).sum())
+    if missing:
+        # a missing cost is replaced by the member's mean, which only dilutes its covariances
+        log.warning(f"{missing} results of {np.count_nonzero(measured < len(seeds))} members are missing in some iterations. They count as the member's mean cost")
+        X = np.where(np.isnan(X), np.nanmean(X, axis=1, keepdims=True), X)
+
+    c = contributions(X)
+    p = correlated_pairs(X, c["var_total"], args.pairs)
+    names = cols.element[members]
+    drivers = driversTable(names, X, c, p)
+
+    n = len(seeds)
+    totals = X.sum(axis=0)
+    shared = float(np.nansum(c["var_shared"]))
+    ranked = np.sort(np.nan_to_num(c["var_share"]))[::-1]
+    eighty = int(np.searchsorted(np.cumsum(ranked), 0.8) + 1)
+    comment_box = (f"* {len(members)} members over {n} iterations. Total cost per iteration: {smag(totals.min())} to {smag(totals.max())}, "
+                   f"mean {smag(totals.mean())}, sd {smag(np.sqrt(c['var_total']))}.\n"
+                   f"* var_share is each member's share of the variance of the total cost: var_own from its own variance, var_shared from its covariance with the other members. The shares add up to 100%.\n"
+                   f"* The covariances between members account for {shared:.0%} of the variance of the total: "
+                   + ("the members tend to get expensive in the same iterations.\n" if shared > 0.1 else
+                      "the members tend to compensate each other.\n" if shared < -0.1 else "the members mostly vary independently.\n")
+                   + f"* {eighty} members account for 80% of the variance of the total.\n"
+                   f"* With {n} iterations, correlations under about {2 / np.sqrt(n):.2f} are indistinguishable from noise.\n")
+    print(report(args.format, f"Cost correlations over {n} iterations",
+                 {"Drivers of the total cost": drivers, "Most covarying pairs": pairsTable(names, p)}, comment_box,
+                 {"logs": args.logs, "iterations": n}, args.top))
+    return 0
+
+# for easier debugging
+if __name__ == "__main__":
+    main()
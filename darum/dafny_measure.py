@@ -16,12 +16,34 @@ import sys
 import time
 import logging
 from datetime import datetime as dt, timedelta as td, timezone
-import psutil
 from quantiphy import Quantity
 from typing import NoReturn
-from sh import Command
 from functools import partial
+import glob
+import re
 
+def toolVersion(exec: str) -> str | None:
+    """The first line of `exec --version`, or None if it can't be run"""
+    from sh import Command, ErrorReturnCode, CommandNotFound
+    try:
+        return str(Command(exec)("--version")).strip().splitlines()[0]
+    except (ErrorReturnCode, CommandNotFound, IndexError):
+        return None
+
+def z3Version(z3_path: str | None, dafnyexec: str) -> str | None:
+    """The version of the Z3 that Dafny will use: the given one, or else the newest of those bundled with Dafny"""
+    if z3_path is None:
+        # Dafny's releases bundle Z3 as z3/bin/z3-<version> next to the dafny executable
+        dafny_path = shutil.which(dafnyexec)
+        if dafny_path is None:
+            return None
+        bundled = glob.glob(os.path.join(os.path.dirname(os.path.realpath(dafny_path)), "z3", "bin", "z3-*"))
+        if not bundled:
+            return None
+        z3_path = max(bundled, key=lambda p: [int(n) for n in re.findall(r"\d+", os.path.basename(p))])
+    version = toolVersion(z3_path)
+    m = re.search(r"\d+\.\d+(\.\d+)?", version or "")
+    return m[0] if m else version
 
 
 
@@ -30,8 +52,8 @@ def main():
     parser.add_argument("dafnyfiles", nargs="+", help="The dafny file(s) to verify.")
     parser.add_argument("-e", "--extra_args", default="", help="A quoted string of extra arguments to pass to dafny")
     parser.add_argument("-d", "--dafnyexec", default="dafny", help="The dafny executable")
-    parser.add_argument("-r", "--rseed", default=str(int(time.time())),help="The random seed. By default is seeded with the current time.")
-    parser.add_argument("-i", "--iter", default="10", help="Number of iterations. Default=%(default)s")
+    parser.add_argument("-r", "--rseed", help="The random seed. By default is seeded with the current time.")
+    parser.add_argument("-i", "--iter", help="Number of iterations. Default=10, or the baseline's with --paired-with")
     parser.add_argument("-f", "--format", default="json", help=argparse.SUPPRESS) # CVS needs updating
     parser.add_argument("-s", "--filter-symbol", help="Only verify symbols containing this substring.")
     parser.add_argument("-l", "--limitRC", type=Quantity, default=Quantity("10M"), help="The Resource Count limit. Accepts magnitudes (K,M,G...). Default=%(default)s")
@@ -41,14 +63,39 @@ def main():
     parser.add_argument("-o", "--output_dir", default="darum", help="Directory to store the results. Default=%(default)s")
     parser.add_argument("-v", "--verbose", action="count", default=0)
     parser.add_argument("-n", "--no-plotting",action="store_true", help="Do not call plot_distribution after verification")
+    parser.add_argument("-q", "--capture-smt", action="store_true", help="Capture the SMT-LIB queries sent to the solver, for replaying them with `darum replay`")
+    parser.add_argument("-b", "--seed-bank", help="Seed bank to record the seeds of the extreme results in. Default: OUTPUT_DIR/seedbank.json")
+    parser.add_argument("-p", "--paired-with", help="A baseline log whose random seed to reuse, so that each iteration gets the same seed as in the baseline and `darum gate --paired` can compare them seed by seed. Can't be combined with --rseed")
 
     args = parser.parse_args()
+    if args.paired_with and args.rseed is not None:
+        parser.error("--paired-with reuses the baseline's random seed, so it can't be combined with --rseed")
+
+    # Not needed for --help or bad arguments, and slow to import
+    import psutil
+    from sh import Command
 
     logging.basicConfig() #level=numeric_level,format='%(levelname)s:%(message)s')
     logger = logging.getLogger(__name__)
     numeric_level = max(logging.DEBUG, logging.WARNING - args.verbose * 10)
     logger.setLevel(numeric_level)
 
+    if args.paired_with:
+        # measure-complexity derives each iteration's seed from --random-seed, so reusing it reuses the baseline's seeds
+        from darum.log_readers import readDarumContext
+        from darum.seed_bank import rseed_from_cmd
+        baseline_cmd = readDarumContext(args.paired_with).get("dafny_cmd", [])
+        rseed = rseed_from_cmd(baseline_cmd)
+        if rseed is None:
+            sys.exit(f"{args.paired_with} doesn't record its --random-seed, so its seeds can't be reused")
+        args.rseed = str(rseed)
+        if args.iter is None and "--iterations" in baseline_cmd:
+            args.iter = baseline_cmd[baseline_cmd.index("--iterations")+1]
+    if args.iter is None:
+        args.iter = "10"
+    if args.rseed is None:
+        args.rseed = str(int(time.time()))
+
     if args.verify_included_files:
         print("Using --verify-included-files. Beware, only the top file's source will be saved into the augmented log")
 
@@ -75,7 +122,7 @@ def main():
         source_dict[dfbase] = {
             "contents": src,
             "hash": hash,
-            "modified": mod_date,
+            "modified": mod_date.isoformat(),
         }
         dafnyfiles_str += f"_{dfsplit[0]}_H{hash[0:4]}"
         # take a snapshot of this input file, adding the same hash piece as in the log
@@ -86,9 +133,13 @@ def main():
     symbol = f"_s{args.filter_symbol}" if args.filter_symbol else ""
     dafnyexec= os.path.basename(args.dafnyexec)
     argstring4filename = f"{dafnyexec}{dafnyfiles_str}_IT{args.iter}_L{args.limitRC}{IAstr}{VIFstr}{z3str}{symbol}_{args.extra_args}".replace("/","").replace("-","").replace(":","").replace(" ","")
-    darum_context = dt.now()
-    dstr = darum_context.strftime('%m%d-%H%M%S')
+    started = dt.now()
+    dstr = started.strftime('%m%d-%H%M%S')
     logfilename = os.path.join(args.output_dir, dstr + "_" + argstring4filename)
+    smt_dir = logfilename + "_smt"
+    if args.capture_smt:
+        # Boogie writes a prover log per procedure, each containing the queries of all its ABs
+        os.makedirs(smt_dir)
     # for convenience, take another snapshot of each single-input-file with the same full filename as the log
     # if len(args.dafnyfiles)==1:
     #     df= args.dafnyfiles[0]
@@ -108,6 +159,7 @@ def main():
         "--verify-included-files" if args.verify_included_files else "",
         *(["--solver-path", args.z3_path] if args.z3_path else []),
         *(["--filter-symbol", args.filter_symbol] if args.filter_symbol else []),
+        *(["--boogie", f"/proverLog:{smt_dir}/@PROC@.smt2"] if args.capture_smt else []),
         *args.extra_args.split(),
         *args.dafnyfiles
         ]
@@ -205,15 +257,43 @@ def main():
         darum_context['files']=source_dict
         darum_context['output']=stdout_store
         darum_context['dafny_cmd']=[args.dafnyexec] + arglist
+        darum_context['timestamp']=started.astimezone(timezone.utc).isoformat()
+        darum_context['versions']={
+            "dafny": toolVersion(args.dafnyexec),
+            "z3": z3Version(args.z3_path, args.dafnyexec),
+        }
         darum_context['darum_args']={
             "IAmode" : args.isolate_assertions,
             "limitRC": args.limitRC
         }
+        if args.paired_with:
+            darum_context['darum_args']['paired_with'] = args.paired_with
+        if args.capture_smt:
+            darum_context['smt_dir']=smt_dir
         json_data["darum"]=darum_context
         with open(f"{logfilename}.{args.format}",mode='w') as jsonfile:
             json.dump(json_data,jsonfile)
         print(f"DARUM:Generated augmented logfile at {logfilename}.{args.format}")
 
+        # Bookkeeping: a log that can't be read (e.g. no results because --filter-symbol matched nothing) mustn't abort the measurement
+        try:
+            from darum.seed_bank import updateSeedBank
+            seed_bank = args.seed_bank or os.path.join(args.output_dir, "seedbank.json")
+            updateSeedBank(seed_bank, [f"{logfilename}.{args.format}"])
+            print(f"DARUM:Updated seed bank {seed_bank}")
+
+            if args.paired_with:
+                from darum.log_readers import readIterationSeeds
+                seeds = readIterationSeeds(f"{logfilename}.{args.format}")
+                baseline_seeds = readIterationSeeds(args.paired_with)
+                n = min(len(seeds), len(baseline_seeds))
+                if seeds[:n] != baseline_seeds[:n]:
+                    logger.warning(f"The iterations' seeds differ from those of {args.paired_with}. Maybe a different Dafny version derives them differently?")
+                else:
+                    print(f"DARUM:{n} iterations paired with {args.paired_with}. Compare them with `darum gate {args.paired_with} -c {logfilename}.{args.format} --paired`")
+        except (Exception, SystemExit) as e:
+            logger.warning(f"Could not update the seed bank or check the paired seeds: {e!r}")
+
     print("\n-----------------------------------------------------------------------------------\n")
 
     # Check for leaked Z3 processes
@@ -1,157 +1,235 @@
 #! python3
 """
-Runs measure-complexity with random seeds until it finds CSV logs with Resource Usage <min and >max for the given DisplayName.
-As of Dafny 4.6 this is obsolete because Dafny got more reliable with iterations and reports each random seed.
+Runs measure-complexity with many random seeds in parallel until it finds logs with Resource Count <min and >max for the given DisplayName.
+Seeds are evaluated in batches: each Dafny process runs ITERATIONS iterations starting from a random batch seed,
+only for the target symbol, so that the .NET startup and Boogie translation are paid once per batch instead of once per seed.
+The logs of the batches that set a new MIN/MAX are kept.
+
+Each iteration is reported by its randomSeed in the log, and can be reproduced deterministically by re-running
+measure-complexity with the batch seed and as many iterations as the iteration's position.
 """
 import argparse
-import csv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from math import inf
-from os import error, mkdir, rename
 import os
 import random
+import re
+import signal
 import subprocess as sp
-import sys
-#from shlex import quote
-import time
+import threading
 import logging as log
-import enum
-from datetime import datetime as dt, timedelta as td
+from datetime import datetime as dt
 from quantiphy import Quantity
-# from yaspin import yaspin, Spinner
-# from yaspin.spinners import Spinners
-
-def shell(str, **kwargs):
-    """Convenient way to run a shell command and get its exit code, stdout, stderr.."""
-    r = sp.run(str, shell=True, capture_output=True, text=True, **kwargs)
-    #print(r)
-    return r
-
-def smag(i) -> str:
-    return f"{Quantity(i):.3}"
+from darum.log_readers import readJSONIterations, smag
+
+uint32_max = 4294967295
+
+class SeedRunner:
+    """Runs Dafny processes for batches of seeds, and can kill all of the running ones at once"""
+    def __init__(self, dafnyexec: str, dafnyfiles: list[str], extra_args: list[str], timeout: int) -> None:
+        self.dafnyexec = dafnyexec
+        self.dafnyfiles = dafnyfiles
+        self.extra_args = extra_args
+        self.timeout = timeout
+        self.stopping = threading.Event()
+        self.procs: set[sp.Popen] = set()
+        self.lock = threading.Lock()
+
+    def run(self, seed: int, logfilename: str, iterations: int, filter_symbol: str) -> tuple[int, str | None]:
+        """Verifies a batch of iterations starting from the given seed. Returns the seed and the log's path, or None if there's no usable log."""
+        if self.stopping.is_set():
+            return seed, None
+        arglist = [
+            self.dafnyexec,
+            "measure-complexity",
+            "--random-seed", str(seed),
+            "--iterations", str(iterations),
+            "--filter-symbol", filter_symbol,
+            "--log-format", f"json;LogFileName={logfilename}",
+            *self.extra_args,
+            *self.dafnyfiles
+            ]
+        log.debug(f"Executing: {' '.join(arglist)}")
+        # A new session per process, so that the whole group (Dafny + its Z3s) can be killed
+        proc = sp.Popen(arglist, stdout=sp.PIPE, stderr=sp.STDOUT, text=True, start_new_session=True)
+        with self.lock:
+            self.procs.add(proc)
+        try:
+            stdout, _ = proc.communicate(timeout=self.timeout)
+        except sp.TimeoutExpired:
+            log.info(f"Seed {seed} timed out after {self.timeout} s")
+            self.kill(proc)
+            return seed, None
+        finally:
+            with self.lock:
+                self.procs.discard(proc)
+
+        if self.stopping.is_set():
+            return seed, None
+        # measure-complexity exits with non-zero codes when some member failed verification, but the log is still valid
+        if proc.returncode not in [0, 2, 3, 4] or not os.path.isfile(logfilename):
+            log.warning(f"Seed {seed}: returncode={proc.returncode}\n{stdout}")
+            return seed, None
+        return seed, logfilename
+
+    def kill(self, proc: sp.Popen) -> None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        with self.lock:
+            procs = list(self.procs)
+        for proc in procs:
+            self.kill(proc)
+
+def member_symbol(displayName: str) -> str:
+    # Dafny's --filter-symbol matches the member's name, without our [C] tag
+    return displayName.replace("[C]", "")
+
+def RCs_per_iteration(logfilename: str, displayname: str) -> list[tuple[int,list[int]]]:
+    """For each iteration in the log, its randomSeed and the RCs of the elements matching the displayName, no matter their outcome"""
+    RCs_iterations = []
+    for rseed, results in readJSONIterations(logfilename):
+        RCs: list[int] = []
+        for k, v in results.items():
+            if displayname in k:
+                RCs.extend(v.RC + v.OoR + v.failures)
+        RCs_iterations.append((rseed, RCs))
+    return RCs_iterations
 
 def main() -> int:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("dafnyfile")
-    parser.add_argument("--displayname", default="")
-    parser.add_argument("--min", type=Quantity, default=-inf)
-    parser.add_argument("--max", type=Quantity, default=inf)
-    parser.add_argument("extra_args", nargs='?', default="")
+    parser = argparse.ArgumentParser(description="Verify with random seeds in parallel until finding Resource Counts <MIN and >MAX for the given DisplayName.")
+    parser.add_argument("dafnyfiles", nargs="+", help="The dafny file(s) to verify.")
+    parser.add_argument("--displayname", required=True, help="Substring of the DisplayName/s to track")
+    parser.add_argument("--min", type=Quantity, default=-inf, help="Stop once a RC <= MIN was found (and MAX). Accepts magnitudes (K,M,G...)")
+    parser.add_argument("--max", type=Quantity, default=inf, help="Stop once a RC >= MAX was found (and MIN). Accepts magnitudes (K,M,G...)")
+    parser.add_argument("-i", "--iterations", type=int, default=10, help="Seeds evaluated by each Dafny process. 1 means a process per seed. Default=%(default)s")
+    parser.add_argument("-s", "--filter-symbol", help="Only verify symbols containing this substring. Default: the DisplayName")
+    parser.add_argument("-e", "--extra_args", default="", help="A quoted string of extra arguments to pass to dafny")
+    parser.add_argument("-d", "--dafnyexec", default="dafny", help="The dafny executable")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of batches to verify concurrently. Default=%(default)s")
+    parser.add_argument("-t", "--timeout", type=int, default=60, help="Seconds before giving up on a batch. Default=%(default)s")
+    parser.add_argument("-o", "--output_dir", default="darum", help="Directory to store the results. Default=%(default)s")
+    parser.add_argument("-k", "--keep-logs", action="store_true", help="Keep the logs of every batch, not only those that set a new MIN/MAX")
     parser.add_argument("-v", "--verbose", action="count", default=0)
 
     args = parser.parse_args()
 
-    # loglevel = "debug"
-    # numeric_level = getattr(log, loglevel.upper(), None)
-    # if not isinstance(numeric_level, int):
-    #     raise ValueError('Invalid log level: %s' % loglevel)
     numeric_level = log.WARNING - args.verbose * 10
     log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
 
+    Quantity.set_prefs(strip_zeros=False)
+    logs_directory = os.path.join(args.output_dir, "extremes_" + dt.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(logs_directory)
+
+    filter_symbol = args.filter_symbol or member_symbol(args.displayname)
+    runner = SeedRunner(args.dafnyexec, args.dafnyfiles, args.extra_args.split(), args.timeout)
+    # Better not to simply sweep random-seed from 0 because we'd be repeating that sequence at each new run
+    rng = random.Random()
+
+    def submit(pool: ThreadPoolExecutor):
+        seed = rng.randint(0, uint32_max)
+        return pool.submit(runner.run, seed, os.path.join(logs_directory, f"seed{seed}.json"), args.iterations, filter_symbol)
 
-    uint32_max = 4294967295
-    random.seed()
     ru_gmin = inf
-    seed_gmin = None
+    seed_gmin = None # (batch seed, iteration, randomSeed)
     ru_gmax = -inf
     seed_gmax = None
-    Quantity.set_prefs(strip_zeros=False)
+    batches = 0
     iterations = 0
-    logs_directory: str = "TestResults/" + dt.now().strftime('%Y%m%d-%H%M%S')
-    os.makedirs(logs_directory)
-
-    #with yaspin(Spinner("/-\\|",1000), text="Working...") as spinner:
-    #    spinner.hide()
-    while True:
-        iterations += 1
-        # Better not to simply sweep random-seed from 0 because we'd be repeating that sequence at each new run
-        random_seed = random.randint(0, uint32_max)
-        #argstring = f"--random-seed {random_seed} "
-        argstring = f"--boogie /randomSeed:{random_seed}"
-        #argstring += "--iterations 1 "
-        argstring += args.extra_args
-        argstring4filename = (argstring + args.displayname).replace("/","").replace("--","").replace(" ","").replace(":","")
-        d = dt.now()
-        dstr = d.strftime('%Y%m%d-%H%M%S')
-        filename = logs_directory + "/" + dstr + "_" + argstring4filename + ".csv"
-
-        #CLI_line: str = fr"dafny44 measure-complexity --log-format csv\;LogFileName='{filename}' {argstring} {args.dafnyfile}"
-        CLI_line: str = fr"dafny44 verify --log-format csv\;LogFileName='{filename}' {argstring} {args.dafnyfile}"
-        log.debug("executing: " + CLI_line)
+    t0 = dt.now()
+    done = False
+    # Batches in a row without a usable log. If Dafny never writes one (e.g. bad arguments), retrying forever is pointless
+    unusable = 0
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        pending = {submit(pool) for _ in range(args.jobs)}
         try:
-            res = shell(CLI_line, timeout=10)
-        except sp.TimeoutExpired as te:
-            log.info(f"Timed out:\n{te}")
-            #log.info("executed: " + CLI_line)
-            continue
-
-        if res.returncode != 0:
-            print(f"returncode={res.returncode}")
-            print(f"stdout={res.stdout}")
-            print(f"stderr={res.stderr}")
-            continue
-            #exit(res.returncode)
-
-        if args.displayname == "":
-            continue
-
-        with open(filename) as csvfile:
-            reader = csv.DictReader(csvfile)
-            rows_num = 0
-            rus: list[int] = []
-            for row in reader:
-                rows_num += 1
-                log.debug(f"CSV row {rows_num}")
-                if args.displayname in row['TestResult.DisplayName'] :
-                    # if ru == None:
-                    #     ru = int(row['TestResult.ResourceCount'])
-                    # else:
-                    #     # if we run a single iteration, there should be no multiple rows for a given method/function, right? Though those might happen when something is included or whatever...?
-                    #     log.error(f"File {filename} contains multiple rows for {args.displayname}!")
-                    #     exit(100)
-                    rus.append(int(row['TestResult.ResourceCount']))
-
-        if rus == []:
-            log.error("DisplayName not in results!")
-            exit(100)
-
-        rus.sort()
-        rus_min = rus[0]
-        rus_max = rus[-1]
-
-        rus_range_str = f"{smag(rus_min)}"
-
-        if rus_min != rus_max:
-            rus_range_str += f"..{smag(rus_max)}"
-
-        if rus_min < ru_gmin:
-            filename2 = f"{filename[:-4]}MIN{smag(rus_min)}.csv"
-            rename(filename, filename2)
-            ru_gmin = rus_min
-            seed_gmin = random_seed
-        elif rus_max > ru_gmax:
-            filename2 = f"{filename[:-4]}MAX{smag(rus_max)}.csv"
-            rename(filename, filename2)
-            ru_gmax = rus_max
-            seed_gmax = random_seed
-
-        status = f"iteration {iterations:4}: seed {random_seed:12} -> {len(rus)}/{rows_num} rows, RU {rus_range_str}\t-"
-        status += f"\tmin {smag(ru_gmin)} "
-        if ru_gmin <= args.min:
-            status += "✅"
-        status += f"\tmax {smag(ru_gmax)} "
-        if ru_gmax >= args.max:
-            status += "✅"
-
-        #spinner.text=line #+ "\n"
-        #spinner.write(line)
-        log.info(status)
-
-        if ru_gmin <= args.min and ru_gmax >= args.max:
-            # TODO generate HTML report
-            #spinner.write(line)
-            break
-        else:
-            time.sleep(1)
-
-    print(f"Done: {iterations} iterations. Max RU = {ru_gmax} with seed {seed_gmax}. Min RU = {ru_gmin} with seed {seed_gmin}.")
-    return 0
\ No newline at end of file
+            while not done:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    batch_seed, logfilename = fut.result()
+                    if logfilename is None:
+                        unusable += 1
+                        if unusable >= max(3, args.jobs):
+                            log.error(f"The last {unusable} batches produced no usable log. Check the Dafny arguments, or raise --timeout")
+                            runner.stop()
+                            return 1
+                        if not runner.stopping.is_set():
+                            pending.add(submit(pool))
+                        continue
+                    unusable = 0
+                    batches += 1
+                    rus_batch = []
+                    RCs_iterations = RCs_per_iteration(logfilename, args.displayname)
+                    # a filter that matches nothing leaves the log without iterations
+                    if RCs_iterations == [] or any(rus == [] for _, rus in RCs_iterations):
+                        log.error(f"DisplayName not in results! (verified with --filter-symbol {filter_symbol})")
+                        runner.stop()
+                        return 100
+                    for i, (rseed, rus) in enumerate(RCs_iterations):
+                        iterations += 1
+                        rus_batch.extend(rus)
+                        if min(rus) < ru_gmin:
+                            ru_gmin = min(rus)
+                            seed_gmin = (batch_seed, i+1, rseed)
+                        if max(rus) > ru_gmax:
+                            ru_gmax = max(rus)
+                            seed_gmax = (batch_seed, i+1, rseed)
+                    tag = ""
+                    if seed_gmin is not None and seed_gmin[0] == batch_seed:
+                        tag += f"MIN{smag(ru_gmin)}"
+                    if seed_gmax is not None and seed_gmax[0] == batch_seed:
+                        tag += f"MAX{smag(ru_gmax)}"
+                    if tag != "":
+                        os.rename(logfilename, f"{logfilename[:-5]}{tag}.json")
+                    elif not args.keep_logs:
+                        os.remove(logfilename)
+
+                    rus_min = min(rus_batch)
+                    rus_max = max(rus_batch)
+                    rus_range_str = f"{smag(rus_min)}"
+                    if rus_min != rus_max:
+                        rus_range_str += f"..{smag(rus_max)}"
+
+                    minutes = (dt.now() - t0).total_seconds() / 60
+                    status = f"batch {batches:4}: seed {batch_seed:12} -> {len(rus_batch)} RCs, RC {rus_range_str}\t-"
+                    status += f"\tmin {smag(ru_gmin)} "
+                    if ru_gmin <= args.min:
+                        status += "✅"
+                    status += f"\tmax {smag(ru_gmax)} "
+                    if ru_gmax >= args.max:
+                        status += "✅"
+                    status += f"\t{iterations/minutes:.1f} seeds/min"
+                    log.info(status)
+
+                    if ru_gmin <= args.min and ru_gmax >= args.max:
+                        done = True
+                    elif not runner.stopping.is_set():
+                        pending.add(submit(pool))
+        finally:
+            # Whether done or interrupted, stop every worker still verifying
+            for fut in pending:
+                fut.cancel()
+            runner.stop()
+
+    if not args.keep_logs:
+        # Batches that finished while stopping were never evaluated, so their logs are uninteresting
+        for f in os.listdir(logs_directory):
+            if re.fullmatch(r"seed\d+\.json", f):
+                os.remove(os.path.join(logs_directory, f))
+
+    minutes = (dt.now() - t0).total_seconds() / 60
+    print(f"Done: {iterations} seeds in {batches} batches of {args.iterations}, {iterations/minutes:.1f} seeds/min.")
+    for name, ru, s in [("Max", ru_gmax, seed_gmax), ("Min", ru_gmin, seed_gmin)]:
+        if s is not None:
+            print(f"{name} RC = {ru} with randomSeed {s[2]}. Reproduce with: measure-complexity --random-seed {s[0]} --iterations {s[1]} --filter-symbol {filter_symbol}")
+    print(f"Logs in {logs_directory}")
+    return 0
+
+# for easier debugging
+if __name__ == "__main__":
+    main()
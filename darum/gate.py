@@ -0,0 +1,185 @@
+#! python3
+"""
+Gate a candidate log against a baseline for CI: test each element for a statistically significant regression
+of its RCs or of its OoR/failure counts, report as text, JSON or JUnit XML, and exit with 1 if any regressed.
+Errors exit with 2, so that CI can tell a regression from a broken run.
+"""
+
+import argparse
+import json
+import logging as log
+import os
+import sys
+import warnings
+import xml.etree.ElementTree as ET
+import numpy as np
+from darum.columnar import ResultsColumns
+from darum.log_readers import readDarumContext, readLogs, smag
+from darum.significance import benjamini_hochberg, fisher_greater, mann_whitney_greater, sign_greater, wilcoxon_greater
+
+def nanmedian(a: np.ndarray) -> np.ndarray:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # all-NaN rows
+        return np.nanmedian(a, axis=1) if a.shape[1] > 0 else np.full(a.shape[0], np.nan)
+
+def outcomes(cols: ResultsColumns, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The bad (OoR or failed) and total outcomes of the given elements"""
+    bad = cols.count("OoR")[rows] + cols.count("failures")[rows]
+    return bad, bad + cols.count("RC")[rows]
+
+def unpairedTests(baseline: ResultsColumns, candidate: ResultsColumns, rows_b: np.ndarray, rows_c: np.ndarray) -> dict[str, np.ndarray]:
+    """Mann-Whitney of the RCs and Fisher of the outcomes, for independently seeded logs"""
+    x, y = baseline.padded("RC", rows_b), candidate.padded("RC", rows_c)
+    _, p_RC = mann_whitney_greater(x, y)
+    median_b, median_c = nanmedian(x), nanmedian(y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = median_c / median_b - 1
+    bad_b, total_b = outcomes(baseline, rows_b)
+    bad_c, total_c = outcomes(candidate, rows_c)
+    return {"median_baseline": median_b, "median_candidate": median_c, "shift": shift, "p_RC": p_RC,
+            "bad_baseline": bad_b, "total_baseline": total_b, "bad_candidate": bad_c, "total_candidate": total_c,
+            "p_outcomes": fisher_greater(bad_b, total_b, bad_c, total_c)}
+
+def pairedTests(baseline: ResultsColumns, candidate: ResultsColumns, rows_b: np.ndarray, rows_c: np.ndarray, seeds: np.ndarray) -> dict[str, np.ndarray]:
+    """Wilcoxon signed-rank of the RC ratios and sign test of the discordant outcomes, for the samples with the same seed.
+    Much of the variance of the RCs comes from the seed, so pairing by seed needs fewer iterations to see the same shift."""
+    x, y = baseline.by_seed("RC", rows_b, seeds), candidate.by_seed("RC", rows_c, seeds)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = y / x
+    paired = ~np.isnan(ratio)
+    _, p_RC = wilcoxon_greater(np.log(ratio))
+    failed = lambda cols, rows: ~np.isnan(cols.by_seed("OoR", rows, seeds)) | ~np.isnan(cols.by_seed("failures", rows, seeds))
+    bad_b, bad_c = failed(baseline, rows_b), failed(candidate, rows_c)
+    both = (~np.isnan(x) | bad_b) & (~np.isnan(y) | bad_c)
+    return {"pairs": both.sum(axis=1),
+            "median_baseline": nanmedian(np.where(paired, x, np.nan)), "median_candidate": nanmedian(np.where(paired, y, np.nan)),
+            "shift": nanmedian(ratio) - 1, "p_RC": p_RC,
+            "bad_baseline": (bad_b & both).sum(axis=1), "total_baseline": both.sum(axis=1),
+            "bad_candidate": (bad_c & both).sum(axis=1), "total_candidate": both.sum(axis=1),
+            "p_outcomes": sign_greater((bad_c & ~bad_b & both).sum(axis=1), (bad_b & ~bad_c & both).sum(axis=1))}
+
+def gate(baseline: ResultsColumns, candidate: ResultsColumns, alpha: float, min_shift: float, members_only: bool,
+         seeds: np.ndarray | None = None) -> dict[str, np.ndarray]:
+    """Tests every element present in both, all at once. An element regressed if its candidate RCs are significantly greater
+    and its median RC (or, if paired, its median RC ratio) grew by at least min_shift, or if its OoR/failures are significantly more.
+    Significant means a Benjamini-Hochberg q-value under alpha, so that testing many elements doesn't flag many by chance.
+    If seeds are given, only the samples with those seeds are compared, paired by seed."""
+    in_baseline = set(baseline.element.tolist())
+    common = [e for e, AB in zip(candidate.element.tolist(), candidate.AB.tolist()) if e in in_baseline and (AB == 0 or not members_only)]
+    rows_b, rows_c = baseline.positions(common), candidate.positions(common)
+    if seeds is None:
+        g = unpairedTests(baseline, candidate, rows_b, rows_c)
+    else:
+        g = pairedTests(baseline, candidate, rows_b, rows_c, seeds)
+    g["q_RC"], g["q_outcomes"] = benjamini_hochberg(g["p_RC"]), benjamini_hochberg(g["p_outcomes"])
+    g["slower"] = (g["q_RC"] < alpha) & (g["shift"] >= min_shift)
+    g["worse_outcomes"] = g["q_outcomes"] < alpha
+    g["regression"] = g["slower"] | g["worse_outcomes"]
+    return {"element": np.array(common, dtype=object), "filename": candidate.filename[rows_c]} | g
+
+def reasons(g: dict[str, np.ndarray], i: int) -> str:
+    what = []
+    if g["slower"][i]:
+        what.append(f"median RC {smag(g['median_baseline'][i])} -> {smag(g['median_candidate'][i])} ({g['shift'][i]:+.0%}, q={g['q_RC'][i]:.2g})")
+    if g["worse_outcomes"][i]:
+        what.append(f"OoR/failures {g['bad_baseline'][i]}/{g['total_baseline'][i]} -> {g['bad_candidate'][i]}/{g['total_candidate'][i]} (q={g['q_outcomes'][i]:.2g})")
+    return ", ".join(what)
+
+def regressionsFirst(g: dict[str, np.ndarray]) -> np.ndarray:
+    """The regressed elements, worst outcomes first, then by their RC shift"""
+    idx = np.flatnonzero(g["regression"])
+    return idx[np.lexsort((-np.nan_to_num(g["shift"][idx], nan=0), ~g["worse_outcomes"][idx]))]
+
+def textReport(g: dict[str, np.ndarray], summary: dict) -> str:
+    lines = [f"{summary['tested']} elements tested, {summary['regressions']} regressed"]
+    lines += [f"  {g['element'][i]}: {reasons(g, i)}" for i in regressionsFirst(g)]
+    return "\n".join(lines)
+
+def jsonReport(g: dict[str, np.ndarray], summary: dict) -> str:
+    def value(v):
+        v = v.item() if isinstance(v, np.generic) else v
+        return None if isinstance(v, float) and np.isnan(v) else v
+    keys = [k for k in g if k not in ["regression"]]
+    regressions = [{k: value(g[k][i]) for k in keys} | {"reasons": reasons(g, i)} for i in regressionsFirst(g)]
+    return json.dumps(summary | {"regressed": regressions})
+
+def junitReport(g: dict[str, np.ndarray], summary: dict) -> str:
+    """A JUnit test suite with a test case per element, failed if it regressed"""
+    suite = ET.Element("testsuite", name="darum gate", tests=str(summary["tested"]), failures=str(summary["regressions"]), errors="0")
+    props = ET.SubElement(suite, "properties")
+    for k in ["baseline", "candidate", "alpha", "min_shift"]:
+        ET.SubElement(props, "property", name=k, value=str(summary[k]))
+    for i, e in enumerate(g["element"].tolist()):
+        case = ET.SubElement(suite, "testcase", classname=os.path.splitext(os.path.basename(g["filename"][i]))[0] or "darum", name=e)
+        if g["regression"][i]:
+            r = reasons(g, i)
+            ET.SubElement(case, "failure", message=r, type="brittleness regression").text = r
+    suites = ET.Element("testsuites", tests=suite.get("tests"), failures=suite.get("failures"))
+    suites.append(suite)
+    return ET.tostring(suites, encoding="unicode", xml_declaration=True)
+
+reports = {"text": textReport, "json": jsonReport, "junit": junitReport}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare a candidate log against a baseline, and exit with 1 if any element's RCs or OoR/failures regressed significantly.",
+                                     epilog="Exit codes: 0 if nothing regressed, 1 if something regressed, 2 on errors (bad arguments, unreadable logs, or no shared seeds with --paired).")
+    parser.add_argument("baseline", nargs="+", help="The baseline log(s)")
+    parser.add_argument("-c", "--candidate", nargs="+", required=True, help="The candidate log(s)")
+    parser.add_argument("-a", "--alpha", type=float, default=0.05, help="Significance level, as the false discovery rate over all the elements tested. Default=%(default)s")
+    parser.add_argument("-s", "--min-shift", type=float, default=0.1, help="Minimum growth of an element's median RC to be a regression, however significant. Default=%(default)s")
+    parser.add_argument("-p", "--paired", action="store_true", help="Pair the samples by seed, for a candidate measured with `dafny_measure --paired-with BASELINE`. Needs fewer iterations to detect the same regression")
+    parser.add_argument("-m", "--members", action="store_true", help="Only test whole members, not their ABs")
+    parser.add_argument("-f", "--format", choices=reports.keys(), default="text", help="Default: %(default)s")
+    parser.add_argument("-o", "--output", help="Write the report to this file instead of stdout")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    numeric_level = log.WARNING - args.verbose * 10
+    log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
+
+    try:
+        return runGate(args)
+    except SystemExit as e:
+        # The log readers exit with 1 or a message on bad input, which CI would take for a regression
+        if e.code in (None, 0):
+            raise
+        if not isinstance(e.code, int):
+            print(e.code, file=sys.stderr)
+        return 2
+    except Exception:
+        log.exception("Failed to gate the logs")
+        return 2
+
+def runGate(args: argparse.Namespace) -> int:
+    modes = [readDarumContext(p).get("darum_args", {}).get("IAmode") for p in args.baseline + args.candidate]
+    if len(set(m for m in modes if m is not None)) > 1:
+        log.warning("Mixing IA and standard mode logs: the members' RCs aren't comparable")
+    baseline = ResultsColumns(readLogs(args.baseline))
+    candidate = ResultsColumns(readLogs(args.candidate))
+    seeds = None
+    if args.paired:
+        seeds = np.intersect1d(baseline.all_seeds(), candidate.all_seeds())
+        if len(seeds) == 0:
+            log.error("The logs share no seeds. Measure the candidate with `dafny_measure --paired-with BASELINE` to pair them")
+            return 2
+        log.info(f"{len(seeds)} seeds shared")
+    g = gate(baseline, candidate, args.alpha, args.min_shift, args.members, seeds)
+    new = len(set(candidate.element.tolist()) - set(baseline.element.tolist()))
+    if new:
+        log.info(f"{new} elements are only in the candidate, so they weren't tested")
+
+    summary = {"baseline": args.baseline, "candidate": args.candidate, "alpha": args.alpha, "min_shift": args.min_shift,
+               "paired_seeds": len(seeds) if seeds is not None else None,
+               "tested": len(g["element"]), "regressions": int(g["regression"].sum())}
+    out = reports[args.format](g, summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+        print(f"{summary['tested']} elements tested, {summary['regressions']} regressed. Report at {args.output}")
+    else:
+        print(out)
+    return 1 if summary["regressions"] > 0 else 0
+
+# for easier debugging
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Overview of all the elements at once: the fraction of each element's results in each log-RC bin, plus its OoRs and failures,
+as a single image so that it stays light however many elements there are.
+"""
+
+from __future__ import annotations
+import numpy as np
+from quantiphy import Quantity
+from darum.columnar import ResultsColumns
+from darum.histograms import bin_edges, histograms
+
+# Beyond this many elements, each row of the image aggregates a block of consecutive elements
+max_rows = 1000
+# Elements binned at once, to bound the memory of the padded samples
+chunk = 10000
+
+def heatmap(cols: ResultsColumns, rows: np.ndarray, nbins: int = 50) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The fraction of the results of the given elements (cols rows, in display order) in each of nbins log-RC bins,
+    then in OoR and in failures. One image row per element, or per block of elements if there are more than max_rows.
+    Returns the fractions (NaN where empty), the RC bin edges and the first element of each image row."""
+    chosen = np.zeros(cols.n, dtype=bool)
+    chosen[rows] = True
+    RCs = cols.values["RC"][chosen[cols.owner("RC")]]
+    lo, hi = (RCs.min(), RCs.max()) if len(RCs) else (1, 1)
+    edges = bin_edges(RCs, lo, hi, nbins, "log")
+    counts = np.concatenate([histograms(cols.padded("RC", rows[s:s+chunk]), edges) for s in range(0, len(rows), chunk)]
+                            or [np.zeros((0, nbins), dtype=np.int64)])
+    counts = np.column_stack([counts, cols.count("OoR")[rows], cols.count("failures")[rows]])
+
+    block = max(1, -(-len(rows) // max_rows))
+    starts = np.arange(0, len(rows), block)
+    if block > 1:
+        counts = np.add.reduceat(counts, starts, axis=0)
+    totals = counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fractions = (counts / totals).astype(np.float32)
+    fractions[counts == 0] = np.nan
+    return fractions, edges, starts
+
+def heatmap_figure(fractions: np.ndarray, edges: np.ndarray, starts: np.ndarray, labels: list[str], title: str, table_tag: str | None = None):
+    """A bokeh figure of heatmap()'s results, given the labels of all the elements. Clicking a row jumps to its first element
+    in the Panel Tabulator tagged table_tag, if given"""
+    from bokeh.models import CustomJS, CustomJSHover, FixedTicker, HoverTool, LinearColorMapper
+    from bokeh.palettes import Viridis256
+    from bokeh.plotting import figure
+
+    nrows, ncols = fractions.shape
+    nbins = len(edges) - 1
+    block = int(starts[1] - starts[0]) if len(starts) > 1 else 1
+    p = figure(title=title, x_range=(0, ncols), y_range=(max(nrows, 1), 0), height=min(max(200, nrows * 2), 600),
+               sizing_mode="stretch_width", tools="xpan,ypan,wheel_zoom,box_zoom,reset,tap", toolbar_location="above")
+    mapper = LinearColorMapper(palette=Viridis256, low=0, high=1, nan_color=(0, 0, 0, 0))
+    p.image(image=[fractions], x=0, y=0, dw=ncols, dh=nrows, color_mapper=mapper)
+
+    # Label the edges of the RC bins, and the OoR/fail columns
+    ticks = list(range(0, nbins + 1, max(1, nbins // 10)))
+    p.xaxis.ticker = FixedTicker(ticks=ticks + [nbins + 0.5, nbins + 1.5])
+    p.xaxis.major_label_overrides = {t: f"{Quantity(edges[t]):.2}" for t in ticks} | {nbins + 0.5: "OoR", nbins + 1.5: "fail"}
+    p.xaxis.axis_label = "RC (log bins)"
+    p.yaxis.visible = False
+    p.grid.visible = False
+
+    bin_label = [f"{Quantity(a):.3} - {Quantity(b):.3}" for a, b in zip(edges[:-1], edges[1:])] + ["OoR", "fail"]
+    row_labels = [labels[s] if block == 1 else f"{labels[s]} ... ({min(block, len(labels) - s)} elements)" for s in starts]
+    p.add_tools(HoverTool(tooltips=[("element", "$y{custom}"), ("RC", "$x{custom}"), ("fraction", "@image{0.0%}")],
+                          formatters={"$y": CustomJSHover(args={"labels": row_labels}, code="return labels[Math.floor(value)] || ''"),
+                                      "$x": CustomJSHover(args={"bins": bin_label}, code="return bins[Math.floor(value)] || ''")}))
+    if table_tag is not None:
+        p.js_on_event("tap", CustomJS(args={"fig": p, "block": block, "tag": table_tag}, code="""
+            const row = Math.floor(cb_obj.y) * block
+            for (const m of fig.document.all_models) {
+                if (m.tags && m.tags.includes(tag) && row < m.source.get_length()) {
+                    m.page = Math.floor(row / m.page_size) + 1
+                    m.source.selected.indices = [row]
+                    const view = Bokeh.index.find_one(m)
+                    if (view) {
+                        view.el.scrollIntoView({block: "center"})
+                    }
+                }
+            }
+        """))
+    return p
@@ -0,0 +1,94 @@
+"""
+Histograms of many elements at once, over a padded samples matrix: one row per element, padded with NaN.
+"""
+
+import numpy as np
+
+def histograms(samples: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Like np.histogram(row, bins=edges) for each row of samples, ignoring NaNs. One row of counts per element."""
+    rows, nbins = samples.shape[0], len(edges)-1
+    idx = np.searchsorted(edges, samples, side="right") - 1
+    # np.histogram's last bin is closed on the right
+    idx[samples == edges[-1]] = nbins - 1
+    valid = (idx >= 0) & (idx < nbins) # NaNs are sorted past the last edge
+    row = np.broadcast_to(np.arange(rows)[:, None], samples.shape)
+    counts = np.bincount(row[valid]*nbins + idx[valid], minlength=rows*nbins)
+    return counts.reshape(rows, nbins)
+
+def bin_spans(counts: np.ndarray) -> np.ndarray:
+    """Number of bins between the first and last non-empty bins of each row, or -1 if the row is empty"""
+    nonempty = counts > 0
+    first = nonempty.argmax(axis=1)
+    last = counts.shape[1] - 1 - nonempty[:, ::-1].argmax(axis=1)
+    return np.where(nonempty.any(axis=1), last - first, -1)
+
+def log_counts(counts: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore'): # log of 0 values
+        logs = np.log10(counts)
+    # log10(1) = 0, so it's barely visible in plot. log10(2)=0.3. So let's plot 1 as 0.2
+    logs[counts == 1] = 0.2
+    return logs
+
+binnings = ["linear", "log", "fd", "blocks"]
+
+def bin_edges(samples: np.ndarray, lo: float, hi: float, nbins: int, mode: str = "linear") -> np.ndarray:
+    """Bin edges between lo and hi, shared by all the histograms. samples are the pooled RCs that decide the adaptive modes:
+    linear: nbins bins of the same width
+    log: nbins bins of the same width in log scale
+    fd: bins of the same width, as given by the Freedman–Diaconis rule
+    blocks: bins of varying width that follow the density of the samples (Bayesian blocks)"""
+    with np.errstate(invalid='ignore'): # lo and hi could be inf if all the plotted elements failed for all random seeds
+        linear = np.linspace(lo, hi, num=nbins+1)
+    if not (np.isfinite(lo) and np.isfinite(hi)) or lo >= hi:
+        return linear
+    samples = samples[(samples >= lo) & (samples <= hi)]
+    if mode == "linear":
+        return linear
+    if mode == "log":
+        return np.geomspace(max(lo, 1), hi, num=nbins+1)
+    if mode == "fd":
+        q1, q3 = np.percentile(samples, [25, 75]) if len(samples) > 1 else (0, 0)
+        width = 2 * (q3 - q1) / len(samples)**(1/3) if q3 > q1 else 0
+        if width == 0:
+            return linear
+        return np.linspace(lo, hi, num=int(min(np.ceil((hi - lo) / width), max_bins)) + 1)
+    if mode == "blocks":
+        edges = bayesian_blocks(samples)
+        if len(edges) < 2:
+            return linear
+        edges[0], edges[-1] = lo, hi
+        return edges
+    raise ValueError(f"Unknown binning mode {mode}. Available: {binnings}")
+
+max_bins = 200
+max_blocks_points = 2000
+
+def bayesian_blocks(samples: np.ndarray, p0: float = 0.05) -> np.ndarray:
+    """Edges of the optimal partition of the samples into blocks of constant density, as in Scargle et al. 2013.
+    Quadratic on the number of distinct values, so beyond max_blocks_points they are grouped by quantiles first."""
+    x, weights = np.unique(samples, return_counts=True)
+    if len(x) > max_blocks_points:
+        cuts = np.searchsorted(np.cumsum(weights), np.linspace(0, weights.sum(), max_blocks_points, endpoint=False)[1:])
+        cuts = np.unique(np.concatenate(([0], cuts)))
+        w = np.add.reduceat(weights, cuts)
+        x, weights = np.add.reduceat(x * weights, cuts) / w, w
+    n = len(x)
+    if n < 2:
+        return x
+    edges = np.concatenate(([x[0]], 0.5 * (x[1:] + x[:-1]), [x[-1]]))
+    block_length = x[-1] - edges
+    ncp_prior = 4 - np.log(73.53 * p0 * n**-0.478)
+    best = np.zeros(n)
+    last = np.zeros(n, dtype=np.int64)
+    for r in range(n):
+        # fitness of the last block being r' .. r, for every r'
+        width = block_length[:r+1] - block_length[r+1]
+        count = np.cumsum(weights[:r+1][::-1])[::-1]
+        fitness = count * (np.log(count) - np.log(width)) - ncp_prior
+        fitness[1:] += best[:r]
+        last[r] = np.argmax(fitness)
+        best[r] = fitness[last[r]]
+    change_points = [n]
+    while change_points[-1] > 0:
+        change_points.append(last[change_points[-1] - 1])
+    return edges[change_points[::-1]]
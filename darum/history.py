@@ -0,0 +1,162 @@
+#! python3
+"""
+A local database of all the ingested logs, so that runs can be compared across weeks
+without re-reading their JSON. Queried with `darum query`.
+"""
+
+import argparse
+import hashlib
+import logging as log
+import os
+import sqlite3
+import sys
+from datetime import datetime as dt, timezone
+import numpy as np
+from darum.columnar import ResultsColumns
+from darum.history_query import DEFAULT_DB
+from darum.log_readers import logPaths, readDarumContext, readLogs, resultsType
+from darum.scoring import score
+from darum.seed_bank import rseed_from_cmd
+
+# A run is an ingested log. Each element of a run has a row of statistics, computed once when ingested,
+# and a row per sample, for the queries by seed.
+schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, log TEXT, log_hash TEXT UNIQUE, timestamp TEXT,
+    dafny_version TEXT, z3_version TEXT, IAmode INTEGER, rseed INTEGER, iterations INTEGER, limitRC REAL);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs(timestamp);
+CREATE INDEX IF NOT EXISTS runs_versions ON runs(dafny_version, z3_version);
+CREATE TABLE IF NOT EXISTS sources (
+    run INTEGER REFERENCES runs(id), filename TEXT, hash TEXT, PRIMARY KEY (run, filename));
+CREATE INDEX IF NOT EXISTS sources_hash ON sources(hash);
+CREATE TABLE IF NOT EXISTS elements (
+    run INTEGER REFERENCES runs(id), element TEXT, member TEXT, AB INTEGER, filename TEXT, file_hash TEXT,
+    success INTEGER, OoR INTEGER, fail INTEGER, minRC REAL, maxRC REAL, meanRC REAL, span REAL, score REAL,
+    PRIMARY KEY (run, element));
+CREATE INDEX IF NOT EXISTS elements_member ON elements(member, AB);
+CREATE INDEX IF NOT EXISTS elements_element ON elements(element);
+CREATE INDEX IF NOT EXISTS elements_file_hash ON elements(file_hash);
+CREATE TABLE IF NOT EXISTS samples (
+    run INTEGER REFERENCES runs(id), element TEXT, kind TEXT, seed INTEGER, RC INTEGER);
+CREATE INDEX IF NOT EXISTS samples_seed ON samples(seed);
+CREATE INDEX IF NOT EXISTS samples_element ON samples(element, run);
+"""
+
+def openHistory(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript(schema)
+    return db
+
+def fileHash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def option_from_cmd(dafny_cmd: list[str], option: str) -> str | None:
+    if option in dafny_cmd:
+        return dafny_cmd[dafny_cmd.index(option)+1]
+    return None
+
+def runTimestamp(context: dict, logpath: str) -> str:
+    """When the run started, as recorded by dafny_measure. Older logs only have their modification time"""
+    if "timestamp" in context:
+        return context["timestamp"]
+    return dt.fromtimestamp(os.path.getmtime(logpath), tz=timezone.utc).isoformat()
+
+def foldSingleABs(results: resultsType) -> resultsType:
+    """Drops the AB1 of the members that have a single AB, like plot_distribution does: it repeats its member's samples,
+    and its AB score boost would rank it above its member"""
+    maxAB: dict[str, int] = {}
+    for d in results.values():
+        maxAB[d.displayName] = max(maxAB.get(d.displayName, 0), d.AB)
+    return {e: d for e, d in results.items() if not (d.AB == 1 and maxAB[d.displayName] == 1)}
+
+def elementStats(cols: ResultsColumns) -> dict[str, np.ndarray]:
+    """The per-element statistics that plot_distribution ranks by, for all elements at once.
+    Single-AB members should already be folded by foldSingleABs, as plot_distribution does before scoring"""
+    minRC, maxRC = cols.min("RC"), cols.max("RC")
+    success, OoR, fail = cols.count("RC"), cols.count("OoR"), cols.count("failures")
+    with np.errstate(invalid='ignore', divide='ignore'):
+        meanRC = cols.reduce("RC", np.add, np.nan) / success
+        span = (maxRC - minRC) / minRC
+    # the same big RC that plot_distribution uses for the score
+    bigRC = cols.values["OoR"].min(initial=np.inf)
+    if bigRC == np.inf:
+        bigRC = cols.values["RC"].max(initial=-np.inf)
+    if bigRC == -np.inf:
+        bigRC = cols.values["failures"].max(initial=-np.inf)
+    return {
+        "success": success, "OoR": OoR, "fail": fail,
+        "minRC": np.where(success > 0, minRC, np.nan), "maxRC": np.where(success > 0, maxRC, np.nan),
+        "meanRC": meanRC, "span": span,
+        "score": score(span, minRC, cols.AB, success, OoR, fail, bigRC),
+    }
+
+def nullable(a: np.ndarray) -> list:
+    """Floats for sqlite, with NULL for NaN"""
+    return [None if np.isnan(v) else v for v in a.tolist()]
+
+def ingestLog(db: sqlite3.Connection, logpath: str) -> int | None:
+    """Adds a log to the database, unless it was already there. Returns its run id, or None if it was already ingested"""
+    log_hash = fileHash(logpath)
+    if db.execute("SELECT 1 FROM runs WHERE log_hash=?", (log_hash,)).fetchone() is not None:
+        return None
+    results = foldSingleABs(readLogs([logpath]))
+    context = readDarumContext(logpath)
+    dafny_cmd = context.get("dafny_cmd", [])
+    versions = context.get("versions", {})
+    iterations = option_from_cmd(dafny_cmd, "--iterations")
+    cur = db.execute("INSERT INTO runs (log, log_hash, timestamp, dafny_version, z3_version, IAmode, rseed, iterations, limitRC) VALUES (?,?,?,?,?,?,?,?,?)",
+                     (os.path.abspath(logpath), log_hash, runTimestamp(context, logpath), versions.get("dafny"), versions.get("z3"),
+                      context.get("darum_args", {}).get("IAmode"), rseed_from_cmd(dafny_cmd),
+                      int(iterations) if iterations is not None else None, context.get("darum_args", {}).get("limitRC")))
+    run = cur.lastrowid
+    hashes = {f: c["hash"] for f, c in context.get("files", {}).items() if isinstance(c, dict)}
+    db.executemany("INSERT INTO sources VALUES (?,?,?)", [(run, f, h) for f, h in hashes.items()])
+
+    cols = ResultsColumns(results)
+    stats = elementStats(cols)
+    db.executemany("INSERT INTO elements VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)", zip(
+        [run] * cols.n, cols.element.tolist(), cols.displayName.tolist(), cols.AB.tolist(), cols.filename.tolist(),
+        [hashes.get(os.path.basename(f)) for f in cols.filename.tolist()],
+        stats["success"].tolist(), stats["OoR"].tolist(), stats["fail"].tolist(),
+        *(nullable(stats[c]) for c in ["minRC", "maxRC", "meanRC", "span", "score"])))
+    for kind in ["RC", "OoR", "failures"]:
+        owners = cols.element[cols.owner(kind)].tolist()
+        db.executemany("INSERT INTO samples VALUES (?,?,?,?,?)",
+                       zip([run] * len(owners), owners, [kind] * len(owners), cols.seeds[kind].tolist(), cols.values[kind].astype(np.int64).tolist()))
+    return run
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Add logs to the history database, for `darum query` to compare runs without re-reading the logs.")
+    parser.add_argument("paths", nargs="+", help="Logs, directories of logs or globs. Logs already in the database are skipped.")
+    parser.add_argument("-d", "--db", default=DEFAULT_DB, help="The history database. Default=%(default)s")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    numeric_level = log.WARNING - args.verbose * 10
+    log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
+
+    paths = logPaths(args.paths)
+    if not paths:
+        sys.exit("No logs to ingest")
+    db = openHistory(args.db)
+    ingested = 0
+    for p in paths:
+        t0 = dt.now()
+        run = ingestLog(db, p)
+        if run is None:
+            log.info(f"{p} was already ingested")
+            continue
+        db.commit()
+        ingested += 1
+        elements = db.execute("SELECT COUNT(*) FROM elements WHERE run=?", (run,)).fetchone()[0]
+        print(f"Ingested {p}: run {run}, {elements} elements, in {(dt.now()-t0).total_seconds():.2f} s")
+    runs = db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    db.close()
+    print(f"{ingested} new logs, {len(paths)-ingested} already ingested. {args.db} now has {runs} runs")
+    return 0
+
+# for easier debugging
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#! python3
+"""
+Answer questions about the runs in the history database (see `darum ingest`) without re-reading the logs:
+the runs, the most brittle elements over the last runs, an element's history, or the results of a seed.
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+from darum.log_readers import smag
+
+# Imported by darum.history too. Defined here so that queries don't import numpy
+DEFAULT_DB = os.path.join("darum", "history.sqlite")
+
+queries = ["runs", "brittle", "element", "seed"]
+
+rank_columns = { # --rank: SQL ordering of the brittle query
+    "score": "max_score",
+    "span": "max_span",
+    "failures": "fail + OoR",
+}
+
+def selectRuns(db: sqlite3.Connection, args) -> list[int]:
+    """The ids of the last args.runs runs that match the filters, newest first"""
+    where, params = [], []
+    if args.since:
+        where.append("timestamp >= ?")
+        params.append(args.since)
+    if args.dafny:
+        where.append("dafny_version LIKE ?")
+        params.append(args.dafny + "%")
+    if args.z3:
+        where.append("z3_version LIKE ?")
+        params.append(args.z3 + "%")
+    if args.file_hash:
+        where.append("id IN (SELECT run FROM sources WHERE hash LIKE ?)")
+        params.append(args.file_hash + "%")
+    sql = "SELECT id FROM runs" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY timestamp DESC, id DESC"
+    if args.runs:
+        sql += f" LIMIT {int(args.runs)}"
+    return [r[0] for r in db.execute(sql, params)]
+
+def inRuns(runs: list[int]) -> str:
+    # ids come from the database, so they can be inlined
+    return f"({','.join(map(str, runs))})"
+
+def queryRuns(db: sqlite3.Connection, runs: list[int], args) -> tuple[list[str], list[tuple]]:
+    columns = ["run", "timestamp", "dafny", "z3", "mode", "iterations", "elements", "log"]
+    rows = db.execute(f"""SELECT id, timestamp, dafny_version, z3_version, CASE WHEN IAmode THEN 'IA' ELSE 'standard' END, iterations,
+                          (SELECT COUNT(*) FROM elements WHERE run=id), log
+                          FROM runs WHERE id IN {inRuns(runs)} ORDER BY timestamp DESC, id DESC""").fetchall()
+    return columns, rows
+
+def queryBrittle(db: sqlite3.Connection, runs: list[int], args) -> tuple[list[str], list[tuple]]:
+    """The elements with the highest score (or span, or failures) in any of the runs"""
+    columns = ["element", "runs", "max_score", "max_span", "mean_span", "minRC", "maxRC", "OoR", "fail"]
+    where = [f"run IN {inRuns(runs)}", "instr(element, ?) > 0"]
+    if args.members:
+        where.append("AB = 0")
+    rows = db.execute(f"""SELECT element, COUNT(*), MAX(score) AS max_score, MAX(span) AS max_span, AVG(span), MIN(minRC), MAX(maxRC),
+                          SUM(OoR) AS OoR, SUM(fail) AS fail
+                          FROM elements WHERE {" AND ".join(where)} GROUP BY element
+                          ORDER BY {rank_columns[args.rank]} DESC LIMIT ?""", (args.filter, args.top)).fetchall()
+    return columns, rows
+
+def queryElement(db: sqlite3.Connection, runs: list[int], args) -> tuple[list[str], list[tuple]]:
+    """The statistics of the matching elements in each run, oldest first"""
+    columns = ["run", "timestamp", "element", "file_hash", "success", "OoR", "fail", "minRC", "maxRC", "meanRC", "span", "score"]
+    rows = db.execute(f"""SELECT run, timestamp, element, substr(file_hash, 1, 8), success, OoR, fail, minRC, maxRC, meanRC, span, score
+                          FROM elements JOIN runs ON run=id WHERE run IN {inRuns(runs)} AND instr(element, ?) > 0
+                          ORDER BY element, timestamp, run LIMIT ?""", (args.filter, args.top)).fetchall()
+    return columns, rows
+
+def querySeed(db: sqlite3.Connection, runs: list[int], args) -> tuple[list[str], list[tuple]]:
+    """The samples obtained with the given seed"""
+    columns = ["run", "timestamp", "element", "kind", "RC"]
+    rows = db.execute(f"""SELECT run, timestamp, element, kind, RC FROM samples JOIN runs ON run=id
+                          WHERE seed=? AND run IN {inRuns(runs)} AND instr(element, ?) > 0
+                          ORDER BY timestamp, run, element LIMIT ?""", (args.seed, args.filter, args.top)).fetchall()
+    return columns, rows
+
+def cell(column: str, v) -> str:
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return "-"
+    if "span" in column:
+        return f"{v:.2%}"
+    if isinstance(v, float):
+        return smag(v)
+    return str(v)
+
+def textTable(columns: list[str], rows: list[tuple]) -> str:
+    cells = [columns] + [[cell(c, v) for c, v in zip(columns, r)] for r in rows]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(columns))]
+    return "\n".join("  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(r, widths))).rstrip() for r in cells)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query the history database of ingested logs.")
+    parser.add_argument("query", choices=queries, help="runs: the selected runs. brittle: the top elements over the selected runs. "
+                        "element: the history of the elements matching FILTER. seed: the samples of --seed")
+    parser.add_argument("filter", nargs="?", default="", help="Only elements containing this substring")
+    parser.add_argument("-d", "--db", default=DEFAULT_DB, help="The history database. Default=%(default)s")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Only the last RUNS runs (0: all). Default=%(default)s")
+    parser.add_argument("-s", "--since", help="Only runs since this ISO timestamp or date, e.g. 2024-09-01")
+    parser.add_argument("--dafny", help="Only runs with a Dafny version starting with this")
+    parser.add_argument("--z3", help="Only runs with a Z3 version starting with this")
+    parser.add_argument("-H", "--file-hash", help="Only runs of a source file with a hash starting with this")
+    parser.add_argument("-S", "--seed", type=int, help="The seed for the seed query")
+    parser.add_argument("-m", "--members", action="store_true", help="brittle: only whole members, not their ABs")
+    parser.add_argument("-r", "--rank", choices=rank_columns.keys(), default="score", help="brittle: what to rank the elements by. Default=%(default)s")
+    parser.add_argument("-t", "--top", type=int, default=20, help="Max rows. Default=%(default)s")
+    parser.add_argument("-f", "--format", choices=["text", "json"], default="text")
+    args = parser.parse_args()
+
+    if args.query == "seed" and args.seed is None:
+        parser.error("the seed query needs --seed")
+    if not os.path.isfile(args.db):
+        sys.exit(f"No history database at {args.db}. Add logs to it with `darum ingest`")
+    db = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    runs = selectRuns(db, args)
+    if not runs:
+        print("No runs match", file=sys.stderr)
+        return 1
+    columns, rows = {"runs": queryRuns, "brittle": queryBrittle, "element": queryElement, "seed": querySeed}[args.query](db, runs, args)
+    db.close()
+    if args.format == "json":
+        print(json.dumps([dict(zip(columns, r)) for r in rows]))
+    else:
+        print(textTable(columns, rows))
+    return 0
+
+# for easier debugging
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import csv
+import functools
+import glob
 import json
 import logging as log
 from math import ceil, floor, log10
@@ -14,6 +16,27 @@ from quantiphy import Quantity
 def smag(i) -> str:
     return f"{Quantity(i):.3}"
 
+eng_prefixes = {0: "", 3: "k", 6: "M", 9: "G", 12: "T"}
+def smags(values) -> list[str]:
+    """smag() for many values at once, without building a Quantity for each"""
+    out = []
+    for v in values:
+        v = float(v)
+        if v == 0:
+            out.append("0")
+            continue
+        mantissa, exp = f"{v:.3e}".split("e")
+        e = int(exp)
+        e3 = e - e % 3
+        if e3 not in eng_prefixes:
+            out.append(smag(v))
+            continue
+        sign = "-" if mantissa[0] == "-" else ""
+        digits = mantissa.lstrip("-").replace(".", "")
+        whole, frac = digits[:1 + e - e3], digits[1 + e - e3:].rstrip("0")
+        out.append(f"{sign}{whole}{'.' + frac if frac else ''}{eng_prefixes[e3]}")
+    return out
+
 def shortenDisplayName(dn:str) -> str:
     new: str = dn.replace(" (well-formedness)","") # WF is almost everywhere, so take it as default; only mention anything non-WF
     new = new.replace(" (correctness)","[C]")
@@ -25,6 +48,10 @@ class Details: # gathers the results of multiple iterations of verifying a singl
         self.RC: list[int] = []
         self.OoR: list[int] = []   #OutOfResources
         self.failures: list[int] = []
+        # the randomSeed of each of the samples above, in the same order
+        self.RC_seeds: list[int] = []
+        self.OoR_seeds: list[int] = []
+        self.failures_seeds: list[int] = []
         #self.RC_max: int     #useful for the table
         #self.RC_min: int
         self.loc: str = ""
@@ -43,6 +70,9 @@ def mergeResults(r:resultsType, rNew:resultsType):
             r[k].RC.extend(rNew[k].RC)
             r[k].OoR.extend(rNew[k].OoR)
             r[k].failures.extend(rNew[k].failures)
+            r[k].RC_seeds.extend(rNew[k].RC_seeds)
+            r[k].OoR_seeds.extend(rNew[k].OoR_seeds)
+            r[k].failures_seeds.extend(rNew[k].failures_seeds)
         else:
             r[k] = rNew[k]
 
@@ -84,20 +114,57 @@ def readCSV(fullpath) -> resultsType:
 # there's no JSON schema for the logs. The structure is based on what we've seen experimentally,
 # so the reader is rather defensive/paranoic, so that any changes in the format don't cause 
 # silent failures.
+@functools.lru_cache(maxsize=1)
+def _loadJSON(fullpath: str, mtime_ns: int) -> dict:
+    with open(fullpath) as jsonfile:
+        return json.load(jsonfile)
+
+def loadJSON(fullpath: str) -> dict:
+    """The parsed log. The last one is kept, because its verificationResults and its darum context
+    are usually read one right after the other. Must not be modified."""
+    return _loadJSON(fullpath, os.stat(fullpath).st_mtime_ns)
+
+def loadVerificationResults(fullpath: str) -> list:
+    try:
+        verificationResults = loadJSON(fullpath)["verificationResults"]
+    except:
+        sys.exit("No verificationResults!")
+    log.debug(f"{fullpath}: {len(verificationResults)} verificationResults")
+    return verificationResults
+
 def readJSON(fullpath: str, paranoid=True) -> resultsType: #tuple[resultsType,dict[int,int]]:
     #reads 1 file (possibly containing multiple verification runs)
-    results: resultsType = {}
-
-    with open(fullpath) as jsonfile:
+    return digestVerificationResults(loadVerificationResults(fullpath), paranoid)
+
+def readIterationSeeds(fullpath: str) -> list[int]:
+    """The randomSeed of each iteration in the log, in order of appearance.
+    measure-complexity runs its iterations one after the other, so this is also the iteration order."""
+    seeds: dict[int,None] = {} # used as an ordered set
+    for vr in loadVerificationResults(fullpath):
+        for vcr in vr['vcResults']:
+            seeds[vcr['randomSeed']] = None
+    return list(seeds)
+
+def readDarumContext(fullpath: str) -> dict:
+    """The context added by dafny_measure to a log, or {} if there's none"""
+    return loadJSON(fullpath).get("darum", {})
+
+def readJSONIterations(fullpath: str, paranoid=True) -> list[tuple[int,resultsType]]:
+    """Reads 1 file keeping each verification iteration apart, as (randomSeed, results) in the order they appear in the log"""
+    iterations: dict[int,list] = {} # randomSeed:vRs. Dicts keep the insertion order
+    for vr in loadVerificationResults(fullpath):
         try:
-            j = json.load(jsonfile)
-            verificationResults = j["verificationResults"]
+            vr_rseed = vr['vcResults'][0]['randomSeed']
         except:
-            sys.exit("No verificationResults!")
-    log.debug(f"{fullpath}: {len(verificationResults)} verificationResults")
+            sys.exit(f"{vr["name"]} has no random seed. Maybe this log was created by `dafny verify` instead of `measure-complexity`?")
+        iterations.setdefault(vr_rseed, []).append(vr)
+    return [(rseed, digestVerificationResults(vrs, paranoid)) for rseed, vrs in iterations.items()]
+
+def digestVerificationResults(verificationResults: list, paranoid=True) -> resultsType:
+    results: resultsType = {}
     if len(verificationResults) == 0:
         return results
-    
+
     # A JSON verification log contains a list of verificationResults (vR) objects.
     # Each vR corresponds to a member (function, method...)
     # and contains its Display Name, overall Resource Count, verification outcome and the vcResults (Assertion Batches)
@@ -126,7 +193,6 @@ def readJSON(fullpath: str, paranoid=True) -> resultsType: #tuple[resultsType,di
 
         # the rseed is only present in the vcrs, but seems to be constant at the vR level
         # so get it from the first one
-        # we won't return it to the user, it's only used for sanity checking and error reporting
         try:
             vr_rseed = vr['vcResults'][0]['randomSeed']
         except:
@@ -140,12 +206,15 @@ def readJSON(fullpath: str, paranoid=True) -> resultsType: #tuple[resultsType,di
         det.displayName = shortDN # they only differ in ABs
         if vr["outcome"] == "Correct":
             det.RC.append(vr_RC)
+            det.RC_seeds.append(vr_rseed)
         elif vr["outcome"] == "OutOfResource":
             det.OoR.append(vr_RC)
+            det.OoR_seeds.append(vr_rseed)
             #assert vr["outcome"] != "Errors", f"{vr["name"]}, rseed={vr_rseed} has error outcome!"
         elif vr["outcome"] == "Errors":
                 #log.info(f"{vr["name"]}, rseed={vr_rseed} has error outcome")
             det.failures.append(vr_RC)
+            det.failures_seeds.append(vr_rseed)
         else:
             sys.exit(f"{shortDN}.outcome == {vr["outcome"]}: unknown case!")
 
@@ -262,17 +331,20 @@ def readJSON(fullpath: str, paranoid=True) -> resultsType: #tuple[resultsType,di
             if vcr["outcome"] == "OutOfResource" :
                 assert vr["outcome"] == "OutOfResource", f"{display_name_AB}==OoR, {shortDN}=={vr["outcome"]}: unexpected!"
                 det.OoR.append(vcr_RC)
+                det.OoR_seeds.append(vr_rseed)
                 results[display_name_AB] = det
                 log.debug(f"{display_name_AB}==OoR, skipping remaining {ABmax-ABn} ABs in {shortDN}")
                 skipping_reason = "OoR"
             elif vcr["outcome"] == "Invalid":
                 assert vr["outcome"] == "Errors", f"{display_name_AB}==Invalid, {shortDN}=={vr["outcome"]}: unexpected!"
                 det.failures.append(vcr_RC)
+                det.failures_seeds.append(vr_rseed)
                 results[display_name_AB] = det
                 log.debug(f"{display_name_AB}==Invalid, skipping remaining {ABmax-ABn} ABs in {shortDN}")
                 skipping_reason = "Fail"
             elif vcr["outcome"] == "Valid":
                 det.RC.append(vcr_RC)
+                det.RC_seeds.append(vr_rseed)
                 results[display_name_AB] = det
                 vcrs_RC.append(vcr_RC)
             else:
@@ -299,6 +371,19 @@ def readJSON(fullpath: str, paranoid=True) -> resultsType: #tuple[resultsType,di
 
 
 
+def logPaths(paths: list[str]) -> list[str]:
+    """The logs in the given directories, globs or files, without repetitions"""
+    logs: dict[str, None] = {} # used as an ordered set
+    for p in paths:
+        if os.path.isdir(p):
+            found = sorted(glob.glob(os.path.join(p, "*.json")))
+        else:
+            found = sorted(glob.glob(p))
+        if not found:
+            log.warning(f"No logs found in {p}")
+        logs |= dict.fromkeys(found)
+    return list(logs)
+
 def readLogs(paths, read_pickle = False, write_pickle = False) -> resultsType:
 
     results: resultsType = {}
@@ -306,7 +391,7 @@ def readLogs(paths, read_pickle = False, write_pickle = False) -> resultsType:
     # to be un/pickled: [files, results]
 
     t0 = dt.now()
-    picklefilepath = "".join(paths)+"v2.pickle"
+    picklefilepath = "".join(paths)+"v3.pickle"
     if os.path.isfile(picklefilepath) and read_pickle:
         with open(picklefilepath, 'rb') as pf:
             [files, results] = pickle.load(pf)
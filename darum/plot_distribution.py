@@ -1,6 +1,10 @@
 #! python3
 
+from __future__ import annotations
 import argparse
+import base64
+import gzip
+import html
 import json
 import math
 import re
@@ -12,22 +16,18 @@ import logging
 from math import inf, nan
 import os
 import numpy as np
-import pandas as pd
-from darum.log_readers import Details, readLogs
-from quantiphy import Quantity
-import holoviews as hv  # type: ignore
-# import hvplot           # type: ignore
-# from hvplot import hvPlot
-from holoviews import opts
-from bokeh.models.tickers import FixedTicker, CompositeTicker, BasicTicker
-from bokeh.models import NumeralTickFormatter, HoverTool
-from bokeh.util.compiler import TypeScript
-from bokeh.settings import settings
+from typing import TYPE_CHECKING
+from darum.log_readers import Details, readDarumContext, readLogs, resultsType, smags
+from darum.columnar import ResultsColumns
+from darum.scoring import bootstrap_ci, modality, score
+from darum.histograms import bin_edges, bin_spans, binnings, histograms, log_counts
+from darum.report import formats, report, textTable
+from darum.heatmap import heatmap, heatmap_figure
+from darum.correlation import ab_attribution, attributionTable
 import os
 import glob
-import panel as pn
-from bokeh.models.widgets.tables import NumberFormatter, BooleanFormatter
-from ansi2html import Ansi2HTMLConverter
+if TYPE_CHECKING:
+    import pandas as pd
 
 def smag(i) -> str:
     return f"{Quantity(i):.3}"
@@ -40,34 +40,308 @@ def dn_is_excluded(dn, exclude_list):
 
 
 
-class NumericalTickFormatterWithLimit(NumeralTickFormatter):
-    fail_min = 0
+def NumericalTickFormatterWithLimit(fail_min:int, **kwargs):
+    """A NumeralTickFormatter that shows the ticks over fail_min as FAIL/OoR.
+    Plain JS run by bokeh's CustomJSTickFormatter, so there's nothing to compile when generating the page."""
+    from bokeh.models import CustomJSTickFormatter, NumeralTickFormatter
+    return CustomJSTickFormatter(
+        args={"numeral": NumeralTickFormatter(**kwargs), "fail_min": int(fail_min)},
+        code="return tick < fail_min ? numeral.compute(tick) : 'FAIL/OoR'")
 
-    def __init__(self, fail_min:int, **kwargs):
-        super().__init__(**kwargs)
-        NumericalTickFormatterWithLimit.fail_min = fail_min
-        NumericalTickFormatterWithLimit.__implementation__ = TypeScript(
-"""
-import {NumeralTickFormatter} from 'models/formatters/numeral_tick_formatter'
-
-export class NumericalTickFormatterWithLimit extends NumeralTickFormatter {
-    static __name__ = '""" + __name__ + """.NumericalTickFormatterWithLimit'
-    FAIL_MIN=""" + str(int(fail_min)) + """
-
-    doFormat(ticks: number[], _opts: {loc: number}): string[] {
-        const formatted = []
-        const ticks2 = super.doFormat(ticks, _opts)
-        for (let i = 0; i < ticks.length; i++) {
-            if (ticks[i] < this.FAIL_MIN) {
-                formatted.push(ticks2[i])
+def packed(text: str) -> str:
+    """text gzipped and in base64, for the page to inflate it only when needed"""
+    return base64.b64encode(gzip.compress(text.encode(), mtime=0)).decode()
+
+def serializedSize(df: pd.DataFrame) -> int:
+    """Rough size of a table once embedded in the page: numbers as base64 typed arrays (ints as int32), the rest as JSON"""
+    size = len(df) * 4 * 4 // 3 # the index
+    for c in df.columns:
+        kind = df[c].dtype.kind
+        if kind in "biuf":
+            size += len(df) * (df[c].dtype.itemsize if kind == "f" else min(df[c].dtype.itemsize, 4)) * 4 // 3
+        else:
+            size += len(df[c].to_json(orient="values"))
+    return size
+
+rank_keys = {"score": ["score"], "modes": ["modes", "gap", "score"], "gap": ["gap", "score"]}
+
+def plotBins(RCs: np.ndarray, minRC_plot, maxRC_plot, nbins: int, binning: str, plotting_fails: bool, failstr: str) -> dict:
+    """The bins shared by the histograms of the plotted elements, decided by the binning mode from their RCs,
+    and what the plots need to place them: widths and offsets are measured in the scale of the x axis.
+    The histograms have bins between minRC_plot and maxRC_plot, + filler to the left until x=0, + 2 bins if there are fails (margin and fails bar)"""
+    bins = bin_edges(RCs[~np.isnan(RCs)], float(minRC_plot), float(maxRC_plot), nbins, binning)
+    log_axis = binning == "log"
+    to_axis, from_axis = (np.log10, lambda x: 10**x) if log_axis else (lambda x: x, lambda x: x)
+    with np.errstate(invalid='ignore'): # silence RuntimeWarnings for inf values
+        # those values could be in min/maxRC_plot if all plots are for funcs that failed for all random seeds
+        bin_widths = np.diff(to_axis(bins))
+    # only Bayesian blocks have bins of different widths
+    bin_width = np.median(bin_widths) if binning == "blocks" else bin_widths[0]
+
+    bin_margin = from_axis(to_axis(bins[-1]) + 3 * bin_width)
+    bin_fails = from_axis(to_axis(bin_margin) + 3 * bin_width)
+    bins_with_fails = np.append(bins,[bin_margin,bin_fails])
+
+    bins_plot = bins_with_fails if plotting_fails else bins
+    bin_centers = from_axis(0.5 * (to_axis(bins_plot[:-1]) + to_axis(bins_plot[1:])))
+    bin_labels = [smag(b) for b in bin_centers]
+    if plotting_fails:
+        bin_labels = bin_labels[0:-2] + ["",failstr ]
+    # The spikes share the bins' axis
+    xlim = (0 if not log_axis else from_axis(to_axis(bins_plot[0]) - bin_width), from_axis(to_axis(bins_plot[-1]) + bin_width))
+    return {
+        "bins": bins,
+        "bins_plot": bins_plot,
+        "bin_centers": bin_centers,
+        "bin_labels": bin_labels,
+        "bin_width": bin_width,
+        "bin_margin": bin_margin,
+        "plotting_fails": plotting_fails,
+        "log_axis": log_axis,
+        "to_axis": to_axis,
+        "from_axis": from_axis,
+        "xlim": xlim,
+    }
+
+def elementCounts(cols: ResultsColumns, rows: np.ndarray, nfails: np.ndarray, pb: dict) -> np.ndarray:
+    """The histograms of the given elements over the bins of plotBins, with their fails in the last bin"""
+    counts = histograms(cols.padded("RC", rows), pb["bins"])
+    if pb["plotting_fails"]:
+        counts = np.column_stack([counts, np.zeros(len(nfails), dtype=counts.dtype), nfails])
+    return counts
+
+def elementsPlot(labels: list[str], names: list[str], counts: np.ndarray, results: resultsType, pb: dict, maxRC_plot, failstr: str):
+    """The histograms of the given elements overlaid, over their RCs as spikes. labels are the elements in results, names how to show them.
+    Needs hv.extension('bokeh')"""
+    import holoviews as hv  # type: ignore
+    from holoviews import opts
+    from bokeh.models.tickers import BasicTicker, LogTicker
+    from bokeh.models import CustomJSHover, HoverTool
+
+    bins_plot, bin_centers, bin_labels, bin_width, log_axis, to_axis, from_axis, xlim = (pb[k] for k in
+        ["bins_plot", "bin_centers", "bin_labels", "bin_width", "log_axis", "to_axis", "from_axis", "xlim"])
+
+    histplots_dict = {}
+    jitter = (bin_width)/len(labels)/3
+    for i,(eo, c, l) in enumerate(zip(names, counts, log_counts(counts))):
+        h = hv.Histogram(
+                (from_axis(to_axis(bins_plot)+i*jitter),
+                    l,
+                    c,
+                    bin_labels
+                    ),
+                kdims=["RC"],
+                vdims=["LogQuantity", "Quantity", "RCbin"]
+            )
+        histplots_dict[eo] = h
+
+    hover = HoverTool(tooltips=[
+        ("Element", "@Element"),
+        ("ResCount bin", "@RCbin"),
+        ("Quantity", "@Quantity"),
+        ("Log(Quantity)", "@LogQuantity"),
+        ])
+
+    bticker = LogTicker() if log_axis else BasicTicker(min_interval = 10**math.floor(math.log10(bin_width)), num_minor_ticks=0)
+
+    hists = hv.NdOverlay(histplots_dict)#, kdims='Elements')
+    hists.opts(
+        opts.Histogram(alpha=0.9,
+                        logx=log_axis,
+                        responsive=True,
+                        height=500,
+                        tools=[hover],
+                        show_legend=True,
+                        muted=True,
+                        backend_opts={
+                        "xaxis.bounds" : xlim,
+                        "xaxis.ticker" : bticker
+                            },
+                        autorange='y',
+                        ylim=(0,None),
+                        xlim=xlim,
+                        xlabel="RC bins",
+                        padding=((0.1,0.1), (0, 0.1)),
+            ),
+        #,logy=True # histograms with logY have been broken in bokeh for years: https://github.com/holoviz/holoviews/issues/2591
+        opts.NdOverlay(show_legend=True,)
+        )
+
+    # A vertical line separating the fails bar
+    # disabled because it disables the autoranging of the histograms
+    # vline = hv.VLine(bin_centers[-2]).opts(
+    #     opts.VLine(color='black', line_width=3, autorange='y',ylim=(0,None))
+    # )
+    # vspan = hv.VSpan(bin_centers[-2],bin_centers[-1]).opts(
+    #     opts.VSpan(color='red', autorange='y',ylim=(0,None),apply_ranges=False)
+    # )
+
+    # hists = hists * vspan
+
+
+    ####### SPIKES
+
+    # A JavaScript function to customize the hovertool
+    RCFfunc = CustomJSHover(code='''
+            var value;
+            var modified;
+            if (value > ''' + str(int(maxRC_plot)) + ''') {
+                modified = "''' + failstr + '''";
             } else {
-                formatted.push('FAIL/OoR')
+                modified = value.toString();
             }
-        }
-        return formatted
+            return modified
+    ''')
+
+    nlabs = len(labels)
+    spikes_dict = {}
+    for i,(dn, eo) in enumerate(zip(labels, names)):
+        # Represent the failures / OoRs with a spike in the last bin
+        RC = results[dn].RC + [from_axis(to_axis(bin_centers[-1])+f*bin_width/20) for f in range(len(results[dn].OoR)+len(results[dn].failures))]
+        hover2 = HoverTool(
+                    tooltips=[
+                        ("Element", dn),
+                        ("ResCount", "@RC{custom}"),
+                        ],
+                    formatters={
+                        "@RC" : RCFfunc,
+                        "dn"  : 'numeral'
+                    }
+                )
+        spikes_dict[eo] = hv.Spikes(RC,kdims="RC").opts(position=nlabs-i-1,tools=[hover2],xaxis="bottom")
+
+    yticks = [(nlabs-i-0.5, list(spikes_dict.keys())[i]) for i in range(nlabs)]#-1,-1,-1)]
+    spikes = hv.NdOverlay(spikes_dict).opts(
+        yticks = yticks
+        )
+
+    spikes.opts(
+        opts.Spikes(spike_length=1,
+                    logx=log_axis,
+                    line_alpha=1,
+                    responsive=True,
+                    height=50+nlabs*20,
+                    color=hv.Cycle(),
+                    ylim=(0,nlabs),
+                    autorange=None,
+                    yaxis='right',
+                    backend_opts={
+                        "xaxis.bounds" : xlim
+                        },
+                    ),
+        opts.NdOverlay(show_legend=False,
+                        click_policy='mute',
+                        autorange=None,
+                        ylim=(0,nlabs),
+                        xlim=xlim,
+                        padding=((0.1,0.1), (0, 0.1)),
+                    ),
+        #opts.NdOverlay(shared_axes=True, shared_datasource=True,show_legend=False)
+        )
+
+    ##### HISTOGRAMS AND SPIKES TOGETHER
+
+    hvplot = hists + spikes #+ table_plot #+ hist #+ violin
+    mf = NumericalTickFormatterWithLimit(pb["bin_margin"], format="0.0a")
+
+    hvplot.opts(
+    #     #opts.Histogram(responsive=True, height=500, width=1000),
+        # opts.Layout(sizing_mode="scale_both", shared_axes=True, sync_legends=True, shared_datasource=True)
+        opts.NdOverlay(
+            click_policy='mute',
+            autorange='y',
+            xformatter=mf,
+            legend_position="right",
+            responsive=True
+            )
+    )
+    hvplot.opts(shared_axes=True)
+    hvplot.cols(1)
+    return hvplot
+
+def htmlTable(df: pd.DataFrame, dropped_cols: list[str]) -> pd.DataFrame:
+    """The table as shown in the page.
+    Numeric columns are embedded as typed arrays, so "-" for missing values is left to the formatters"""
+    df = df.drop(columns=dropped_cols, errors='ignore')
+    for c in ["span", "span_lo", "span_hi"]:
+        if c in df:
+            df[c] = df[c].apply(lambda d: nan if np.isnan(d) else int(d*10000)/100)
+    df["gap"] = df["gap"].apply(lambda d: d if np.isinf(d) else int(d*10000)/100)
+    # We can't use magnitudes with the RCs because then the tables can't be sorted correctly.
+    df["minRC"] = df.minRC.where(df.minRC.abs() < inf)
+    df["maxRC"] = df.maxRC.where(df.maxRC.abs() < inf)
+    df["success"] = df.success.where(df.success != 0)
+    df["linked"] = df.linked.astype(np.uint8)
+    return df.rename(
+        columns={
+            "span":"RCspan%",
+            "span_lo":"RCspan%_lo",
+            "span_hi":"RCspan%_hi",
+            "gap":"gap%",
+            "loc_txt":"loc",
+            }
+    )
+
+def htmlAttributionTable(df: pd.DataFrame) -> pd.DataFrame:
+    """The attribution table as shown in the page, with the shares as percentages like the spans"""
+    df = df.copy()
+    for c in ["span", "var_share", "var_own", "span_share"]:
+        df[c] = df[c].apply(lambda d: int(d*10000)/100 if np.isfinite(d) else nan)
+    df["linked"] = df.linked.astype(np.uint8)
+    return df.reset_index().rename(columns={"span": "RCspan%", "var_share": "var%", "var_own": "own%", "span_share": "span%"})
+
+def tabulator(dft: pd.DataFrame, **kwargs):
+    """A Tabulator widget for a table from htmlTable. kwargs override the defaults."""
+    import panel as pn
+    from bokeh.models.widgets.tables import HTMLTemplateFormatter, NumberFormatter
+    bokeh_formatters = {
+        'minRC': NumberFormatter(format='0,0', text_align = 'right', nan_format='-'),
+        'maxRC': NumberFormatter(format='0,0', text_align = 'right', nan_format='-'),
+        # 'RCspan%': NumberFormatter(format='0.00', text_align = 'right'),
+        'score': NumberFormatter(format='0,0', text_align = 'right'),
+        'score_lo': NumberFormatter(format='0,0', text_align = 'right'),
+        'score_hi': NumberFormatter(format='0,0', text_align = 'right'),
+        'success': NumberFormatter(format='0,0', text_align = 'right', nan_format='-'),
+        'fail': NumberFormatter(format='0,0', text_align = 'right'),
+        'OoR': NumberFormatter(format='0,0', text_align = 'right'),
+        'loc': HTMLTemplateFormatter(template=loc_link),
     }
-}
-""")
+    return pn.widgets.Tabulator(dft, **({
+        "pagination": 'local', # only a page of rows is rendered at a time
+        "page_size": 100,
+        "frozen_columns": ['index'],
+        "hidden_columns": ['linked'],
+        "disabled": True,
+        "layout": 'fit_data_table',
+        "selectable": False,
+        "text_align": {"diag":"center"},
+        "formatters": bokeh_formatters,
+        "configuration": {
+            "initialSort":[{"column":"score","dir":"asc"}], # not working anyway
+        },
+        "height": 300, #give a glimpse of more rows
+        } | kwargs))
+
+# The tables get the locations as text; the ones with source are turned into links to their line
+loc_link = r"""<%= linked ? value.replace(/(L?)(\d+)(-\d+|:\d+)?$/, (m, L, n, rest) =>
+    (L ? '<b><a href="#L' + n + '">L' + n + '</a></b>' : '<a href="#L' + n + '">' + n + '</a>') + (rest || '')) : value %>"""
+
+# the legend and other explanations (score?) could be turned into table tooltips, hoped for Panel 1.5
+legend_icons = """
+## Legend
+### Elements
+MemberName [C] = MemberName's Correctness assertions (as opposed to the default Well-Formedness)
+MemberName B2  = MemberName's Assertion Batch 2
+
+
+### Diagnostic icons
+❌  All iterations failed verification
+⌛️  Some iteration ran Out of Resources
+❗️  Flipflopping result: some successes, some failures
+❓  Notable entry because there was only 1 success
+📊  Item present in the plot
+⛔️  Item excluded from plot
+"""
 
 customJS = r"""
 <script type="text/javascript">
@@ -89,19 +363,53 @@ function onLoadHandler()  {
 }
 
 function delayedAdder() {
-    codeDOM = xfind('pre>code')
-    lines = Array.from(codeDOM.querySelectorAll('a[id^="L"]'))
+    findSource()
 
     //stdoutDOM = xfindAll('.ansi2html-content')
     anchorlinks = xfindAll('a[href^="#"]')
     anchorlinks.forEach((d) => {
         d.addEventListener("click", clickInterceptor)
     })
+    packedDOMs = xfindAll('details[data-packed]')
+    packedDOMs.forEach((d) => {
+        d.addEventListener("toggle", unpackOnToggle)
+    })
 
     window.addEventListener("popstate", PopStateHandler)
     console.log("delayAdder finished")
 }
 
+function findSource() {
+    codeDOM = xfind('pre>code')
+    lines = codeDOM === null ? [] : Array.from(codeDOM.querySelectorAll('a[id^="L"]'))
+}
+
+/* The sources and Dafny's output are stored gzipped in base64, and only inflated when shown */
+async function unpack(d) {
+    const packed = d.dataset.packed
+    if (packed === undefined) {
+        return
+    }
+    delete d.dataset.packed
+    const bytes = Uint8Array.from(atob(packed), (c) => c.charCodeAt(0))
+    const inflated = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"))
+    d.insertAdjacentHTML("beforeend", await new Response(inflated).text())
+    findSource()
+}
+
+function unpackOnToggle(e) {
+    if (e.target.open) {
+        unpack(e.target)
+    }
+}
+
+async function unpackAll() {
+    await Promise.all(Array.from(xfindAll('details[data-packed]')).map((d) => {
+        d.open = true
+        return unpack(d)
+    }))
+}
+
 function clearSourceBackground() {
 
     debugger
@@ -110,7 +418,7 @@ function clearSourceBackground() {
     })
 }
 
-function clickInterceptor(e) {
+async function clickInterceptor(e) {
     const target = e.target;
     console.log("clickInterceptor:"+target)
     debugger
@@ -125,9 +433,16 @@ function clickInterceptor(e) {
         destID = target.getAttribute('href').slice(1)
         console.log("Navigating to anchor:" + destID)
         anchorSelector = 'a[id^="' + destID + '"]'
+        if (xfind(anchorSelector) === null) {
+            // the destination must be in the sources or stdout, still packed
+            await unpackAll()
+        }
         dest = xfind(anchorSelector)
+        if (dest === null) {
+            return
+        }
         dest.scrollIntoView() 
-        if (codeDOM.querySelectorAll(anchorSelector) !== null) {
+        if (codeDOM !== null && codeDOM.querySelectorAll(anchorSelector) !== null) {
             highlighted = Array.from(codeDOM.querySelectorAll('.highlighted'))
             highlighted.forEach( h => {
                 h.classList.remove("highlighted")
@@ -162,12 +477,102 @@ if (document.readyState !== "complete") {
 </script>
 """
 
+def resultsTable(cols: ResultsColumns, sourcecode: dict[str, list[str]], limitRC, log, mode_gap: float = 0.25) -> tuple[pd.DataFrame, dict]:
+    """Digests each entry's list of RCs into a dataframe row of the entry's stats, in bulk.
+    Also returns the global extremes: maxRC, minRC (for members and for ABs), minOoR, minFailures, maxFailures."""
+    import pandas as pd
+    minRC_entry = cols.min("RC")
+    maxRC_entry = cols.max("RC")
+    minOoR_entry = cols.min("OoR")
+    minFailures_entry = cols.min("failures")
+    maxFailures_entry = cols.max("failures")
+    isAB = cols.AB > 0
+    extremes = {
+        "minRC": minRC_entry[~isAB].min(initial=inf),
+        "maxRC": maxRC_entry[~isAB].max(initial=-inf),
+        "minRC_ABs": minRC_entry[isAB].min(initial=inf),
+        "maxRC_ABs": maxRC_entry[isAB].max(initial=-inf),
+        "minOoR": minOoR_entry.min(initial=inf),
+        "minFailures": minFailures_entry.min(initial=inf),
+        "maxFailures": maxFailures_entry.max(initial=-inf),
+    }
+
+    # if a limit was given, we can do some fine grained checks
+    if limitRC is not None:
+        # any RC > limitRC should be in the OoRs, not in the RCs
+        # but beware, in IAmode, the vRs' RC is the sum of its ABs, so they can legitimately have RCs > limitRC
+        for i in np.flatnonzero(isAB & (maxRC_entry > limitRC)):
+            log.warning(f"LimitRC={limitRC} but {cols.element[i]}(AB={cols.AB[i]}) has maxRC={Quantity(maxRC_entry[i])}. Should be OoR! ")
+        for i in np.flatnonzero(isAB & (minOoR_entry < limitRC)):
+            log.warning(f"MinOoR for {cols.element[i]} is {Quantity(minOoR_entry[i])}, should be > LimitRC={limitRC}")
+
+    # Calculate the % span between max and min
+    with np.errstate(invalid='ignore', divide='ignore'):
+        span = (maxRC_entry-minRC_entry)/minRC_entry
+
+    # The RC distributions of brittle elements tend to be multimodal
+    modes, gap = modality(cols.padded("RC"), mode_gap)
+
+    fail_extremes = np.full(cols.n, "", dtype=object)
+    has_failures = cols.count("failures") > 0
+    fail_extremes[has_failures] = [f"{mi} - {ma}" for mi, ma in zip(smags(minFailures_entry[has_failures]), smags(maxFailures_entry[has_failures]))]
+
+    index = pd.Index(cols.element, name="element")
+    filename = pd.Series(cols.filename, index=index, dtype=object)
+    loc_entry = pd.Series(cols.loc, index=index, dtype=object)
+    filenames_only_one = len({f for f in cols.filename if len(f)>1}) == 1
+    prefix = "" if filenames_only_one else filename + ":"
+    loc_txt = prefix + loc_entry
+
+    # if we have the source for the location, the HTML table makes the location text into an hyperlink (see loc_link), and shows the line
+    basename = filename.map({f: os.path.basename(f) for f in set(cols.filename)})
+    has_source = basename.isin(list(sourcecode.keys()))
+    loc_range = loc_entry.str.extract(r'^L(\d+)(-\d+)?$')
+    with_range = has_source & loc_range[0].notna()
+    loc_LC = loc_entry.str.extract(r'^(\d+):(\d+)$')
+    with_LC = has_source & loc_LC[0].notna()
+
+    src = np.full(cols.n, "", dtype=object)
+    LC_rows = np.flatnonzero(with_LC.to_numpy())
+    LC_line = loc_LC[0].to_numpy()[LC_rows].astype(np.int64) - 1
+    LC_col = loc_LC[1].to_numpy()[LC_rows].astype(np.int64)
+    for f, idx in pd.Series(basename.to_numpy()[LC_rows]).groupby(basename.to_numpy()[LC_rows]).indices.items():
+        lines = np.array(sourcecode[f] + [""], dtype=object) # the extra line is for out-of-range locations
+        line_idx = LC_line[idx]
+        line_idx[(line_idx < 0) | (line_idx >= len(lines)-1)] = len(lines)-1
+        srcline = pd.Series(lines[line_idx], dtype=object)
+        stripped = srcline.str.lstrip()
+        leading_whitespace = (srcline.str.len() - stripped.str.len()).to_numpy() # This is correct if tab == 1 char. Dafny 4.8 does this, hence prints error markers out of place in stdout when there's tabs; some changes might come. https://github.com/dafny-lang/dafny/issues/5718
+        adjusted_col = LC_col[idx] - leading_whitespace
+        src[LC_rows[idx]] = [s[:c] + '🛑' + s[c:] for s, c in zip(stripped, adjusted_col.tolist())]
+
+    df = pd.DataFrame({
+            "minRC" : minRC_entry,
+            "maxRC" : maxRC_entry,
+            "span" : span,
+            "modes" : modes,
+            "gap" : gap,
+            "success": cols.count("RC"),
+            "OoR" : cols.count("OoR"),
+            "fail" : cols.count("failures"),
+            "fail_extr": fail_extremes,
+            "AB" : cols.AB,
+            "loc_txt" : loc_txt.to_numpy(),
+            "linked" : (with_range | with_LC).to_numpy(),
+            "diag": "",
+            "displayName": cols.displayName,
+            "desc": cols.description,
+            "src": src,
+        }, index=index)
+    return df, extremes
+
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('paths', nargs='*', help="File/s to plot. If absent, tries to plot the latest file in the current dir.")
     parser.add_argument("-v", "--verbose", action="count", default=0)
     parser.add_argument("-p", "--recreate-pickle",action="store_true")
-    parser.add_argument("-n", "--nbins", default=50)
+    parser.add_argument("-n", "--nbins", type=int, default=50, help="Number of bins for the linear and log binnings. Default: %(default)s")
+    parser.add_argument("-g", "--binning", choices=binnings, default="linear", help="How to bin the histograms: linear, log, fd (Freedman–Diaconis) or blocks (Bayesian blocks). Default: %(default)s")
     #parser.add_argument("-d", "--RCspan", type=int, default=10, help="The span maxRC-minRC (as a % of max) over which a plot is considered interesting")
     parser.add_argument("-x", "--exclude", action='append', default=[], help="DisplayNames matched by this regex will be excluded from plot")
     parser.add_argument("-o", "--output_dir", default="darum", help="Directory to store the results. Default=%(default)s")
@@ -176,12 +581,34 @@ def main() -> int:
     parser.add_argument("-s", "--force-standard-mode", default=False, action='store_true', help="Treat Assertion Batches just like members. Default: autodetect")
     parser.add_argument("-a", "--force-IA-mode", default=False, action='store_true', help="Whether to separate Assertion Batches and focus on them, instead of members. Best for Isolated Assertions mode. Default: autodetect")
     parser.add_argument("-l", "--limitRC", type=Quantity, default=None, help="The RC limit that was used during verification. Used only to check consistency of results. Default: %(default)s")
+    parser.add_argument("-r", "--rank", choices=["score", "modes", "gap"], default="score", help="Rank the elements by score, by number of RC modes, or by the biggest gap between modes. Default: %(default)s")
+    parser.add_argument("-m", "--mode-gap", type=float, default=0.25, help="Relative jump between consecutive sorted RCs that separates two modes. Default: %(default)s")
+    parser.add_argument("-c", "--ci", type=float, default=0.9, help="Confidence level of the bootstrap intervals for span and score. Default: %(default)s")
+    parser.add_argument("-k", "--resamples", type=int, default=200, help="Bootstrap resamples for the confidence intervals; 0 to skip them. Default: %(default)s")
+    parser.add_argument("-f", "--format", choices=formats, default="html", help="html: plot to an HTML file. text/markdown/json: just print a report of the top N elements (JSON: all elements) without plotting. Default: %(default)s")
+    parser.add_argument("-z", "--max-size", type=float, default=10, help="Approximate budget in MB for the tables, sources and Dafny output in the HTML page. The tables drop their lowest ranked rows to fit. Default: %(default)s")
+    parser.add_argument("-S", "--serve", action="store_true", help="Instead of saving a page, serve the results in a local Panel server, which plots whichever rows get selected in the tables. Default: %(default)s")
+    parser.add_argument("-P", "--port", type=int, default=5006, help="Port for --serve. Default: %(default)s")
+    parser.add_argument("-B", "--batch", action="store_true", help="Treat the paths as directories or globs of logs, and plot each log into its own page, in parallel, plus an index.html of the pages sorted by their worst score. Default: %(default)s")
+    parser.add_argument("-F", "--per-file", action="store_true", help="Plot each source file's results into its own page, embedding only that file, in parallel. The usual page becomes an index of the files' pages. Default: %(default)s")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of pages to plot concurrently in --batch and --per-file modes. Default=%(default)s")
     parser.add_argument("-b", "--bspan", type=int, default=0, help="A function's histogram will only be plotted if it spans => BSPAN bins. Default: %(default)s")
 
     args = parser.parse_args()
+    if args.batch:
+        from darum.batch import batch
+        return batch(args)
+    if args.per_file:
+        from darum.batch import perFile
+        return perFile(args)
     return plot(args)
 
-def plot(args) -> int:
+def plot(args, summary: dict | None = None, results: resultsType | None = None, contexts: list[dict] | None = None, title: str | None = None) -> int:
+    """Plot the logs in args.paths. A part of them can be plotted instead by giving its results and the darum context of each log,
+    under another title. If a summary dict is given, as in batch mode, the page isn't opened,
+    and the summary gets its path, totals and the worst elements"""
+    # Only once the arguments are parsed, so that --help doesn't wait for pandas
+    import pandas as pd
     logging.basicConfig() #level=numeric_level,format='%(levelname)s:%(message)s')
     log = logging.getLogger(__name__)
     numeric_level = max(logging.DEBUG, logging.WARNING - args.verbose * 10)
@@ -191,123 +618,46 @@ def plot(args) -> int:
         # Get the path of the latest file in the current directory
         latest_file = max(glob.glob("darum/*"), key=os.path.getmtime)
         if latest_file.endswith(".json"):
-            print(f"Plotting latest file in darum/: {os.path.basename(latest_file)}")
+            print(f"Plotting latest file in darum/: {os.path.basename(latest_file)}", file=sys.stderr)
             args.paths.append(latest_file)
         else:
             sys.exit("Error: No file given, and latest file in dir is not JSON.")
 
-    results = readLogs(args.paths, args.recreate_pickle)
-
-    sourcecode = {} 
+    if results is None:
+        results = readLogs(args.paths, args.recreate_pickle)
+    if contexts is None:
+        contexts = [readDarumContext(p) for p in args.paths]
+    if title is None:
+        title = "-".join([os.path.splitext(os.path.basename(p))[0] for p in args.paths])
 
     darum_context = {}
-    for p in args.paths:
-        with open(p) as jsonfile:
-            dc = json.load(jsonfile)['darum']
-        for k in dc.keys():
-            darum_context[k] = darum_context.get(k, {}) | dc[k] # merge
-
-    fdict = darum_context['files']
-    for f,c in fdict.items():
-        sourcecode[f] = c.splitlines()
+    for dc in contexts:
+        for k,v in dc.items():
+            # merge the contexts of all the logs
+            if isinstance(v, dict):
+                darum_context[k] = darum_context.get(k, {}) | v
+            elif isinstance(v, list):
+                darum_context[k] = darum_context.get(k, []) + v
+            else:
+                darum_context[k] = v
+
+    sourcecode = {} # filename: lines
+    for f,c in darum_context.get('files', {}).items():
+        # older logs stored only the contents
+        sourcecode[f] = (c["contents"] if isinstance(c, dict) else c).splitlines()
 
     # PROCESS THE DATA
     comment_box = ""
-    # Calculate the max-min span for each DisplayName, and the global maxRC, minRC, minFail
-    maxRC = -inf
-    minRC = inf
-    maxRC_ABs = -inf
-    minRC_ABs = inf
-    minOoR = inf # min RC of the OoR entries
-    minFailures = inf # min RC of the failed entries
-    maxFailures = -inf # max RC of the failed entries
-    df = pd.DataFrame( columns=["minRC", "maxRC", "span", "success", "OoR","fail","fail_extr","AB","loc","loc_txt","diag","displayName", "desc", "src"])
-    df.index.name="element"
-
-
-    filenames : set[str]= set()
-    for k,v in results.items():
-        f = v.filename
-        if len(f)>1:
-            filenames.add(f)
-    filenames_only_one = len(filenames)==1
-
-    # Digest each entry's list of RCs into a dataframe row of the entry's stats
-    for k,v in results.items():
-        # for ig in args.exclude:
-        #     if ig in k:
-        #         log.debug(f"Excluding {k}")
-        #         continue
-        minRC_entry = min(v.RC, default=inf)
-        maxRC_entry = max(v.RC, default=-inf)
-        minOoR_entry = min(v.OoR, default=inf)
-        minOoR = min(minOoR,minOoR_entry)
-        minFailures_entry = min(v.failures, default=inf)
-        minFailures = min(minFailures,minFailures_entry)
-        maxFailures_entry = max(v.failures, default=-inf)
-        maxFailures = max(maxFailures,maxFailures_entry)
-        if v.AB==0:
-            minRC = min(minRC, minRC_entry)
-            maxRC = max(maxRC, maxRC_entry)
-        else:
-            minRC_ABs = min(minRC_ABs, minRC_entry)
-            maxRC_ABs = max(maxRC_ABs, maxRC_entry)
-    
-        diag = ""
-
-        # if a limit was given, we can do some fine grained checks
-        if args.limitRC is not None and v.AB>0:
-            # any RC > limitRC should be in the OoRs, not in the RCs
-            # but beware, in IAmode, the vRs' RC is the sum of its ABs, so they can legitimately have RCs > limitRC
-            if maxRC_entry > args.limitRC:
-                log.warning(f"LimitRC={args.limitRC} but {k}({v.AB=}) has maxRC={Quantity(maxRC_entry)}. Should be OoR! ")
-            if minOoR_entry < args.limitRC:
-                log.warning(f"MinOoR for {k} is {min(v.OoR)}, should be > LimitRC={args.limitRC}")
-        # Calculate the % span between max and min
-        span = (maxRC_entry-minRC_entry)/minRC_entry
-        # info = f"{k:40} {len(v.RC):>10} {smag(minRC_entry):>8}    {smag(maxRC_entry):>6} {span:>8.2%}"
-        # log.debug(info)
-        fail_extremes = "" if minFailures_entry == inf else f"{smag(minFailures_entry)} - {smag(maxFailures_entry)}"
-        loc_txt =  v.loc if filenames_only_one else f"{v.filename}:{v.loc}"
-        # if we have the source for the location, make the location text into an hyperlink, and show the line
-        fname = os.path.splitext(v.filename)[0]
-        src = ""
-        if sourcecode.get(fname) is None:
-            loc = loc_txt
-        else:
-            loc = "" if filenames_only_one else f"{v.filename}:"
-            loc_range = re.match(r'L(\d+)-(\d+)',v.loc)
-            if loc_range:
-                firstline = loc_range.group(1)
-                loc += f'<b><a href="#L{firstline}">L{firstline}</a></b>-{loc_range.group(2)}'
-            loc_LC = re.match(r'(\d+):(\d+)',v.loc)
-            if loc_LC:
-                firstline = int(loc_LC.group(1))
-                col = int(loc_LC.group(2))
-                loc += f'<a href="#L{firstline}">{firstline}</a>:{col}'
-                srcline = sourcecode[fname][firstline-1]
-                src = srcline.lstrip()
-                leading_whitespace = len(srcline)-len(src) # This is correct if tab == 1 char. Dafny 4.8 does this, hence prints error markers out of place in stdout when there's tabs; some changes might come. https://github.com/dafny-lang/dafny/issues/5718
-                adjusted_col = col-leading_whitespace
-                src = src[:adjusted_col] + '🛑' + src[adjusted_col:] 
-
-
-        df.loc[k] = {
-            "success": len(v.RC),
-            "minRC" : minRC_entry,
-            "maxRC" : maxRC_entry,
-            "span" : span,
-            "OoR" : len(v.OoR),
-            "fail" : len(v.failures),
-            "AB" : v.AB,
-            "loc"   : loc,
-            "loc_txt" : loc_txt,
-            "diag": diag,
-            "displayName": v.displayName,
-            "desc": v.description,
-            "fail_extr": fail_extremes,
-            "src": src
-        }
+    cols = ResultsColumns(results)
+    df, extremes = resultsTable(cols, sourcecode, args.limitRC, log, args.mode_gap)
+    # per cols row, for the ABs' locations in the attribution table
+    loc_txt, linked = df["loc_txt"].to_numpy().copy(), df["linked"].to_numpy().copy()
+    minRC = extremes["minRC"]
+    maxRC = extremes["maxRC"]
+    maxRC_ABs = extremes["maxRC_ABs"]
+    minOoR = extremes["minOoR"] # min RC of the OoR entries
+    minFailures = extremes["minFailures"] # min RC of the failed entries
+    maxFailures = extremes["maxFailures"] # max RC of the failed entries
 
     if minFailures == inf:
         df.drop(columns=["fail_extr"], inplace=True)
@@ -319,22 +669,24 @@ def plot(args) -> int:
     if df_with_sources.empty:
         df.drop(columns=["src"],inplace=True)
 
-    # Make any per-DN adjustments
-    members_with_many_ABs = 0
-    DNs = set(df["displayName"].values)
-    DNs_number = len(DNs)
-    for d in DNs:
-        # if a DN only has AB0 and AB1, then copy the location from AB1 to AB0 and drop AB1
-        # because AB0 is summarized and easier to detect as non-AB in next steps
-        dnABs = df[(df.displayName==d) & (df.AB>1)]
-        if dnABs.empty:
-            df.loc[(df.displayName==d) & (df.AB==0),"loc"] = df.loc[(df.displayName==d) & (df.AB==1),"loc"].values[0]
-            df.drop(df[(df.displayName==d) & (df.AB==1)].index, inplace=True)
-            df.loc[(df.displayName==d),"maxAB"] = 0
-        else:
-            df.loc[(df.displayName==d),"maxAB"] = max(dnABs.AB)
-            members_with_many_ABs += 1
-
+    # Make any per-DN adjustments, all DNs at once
+    maxAB = df.groupby("displayName", sort=False)["AB"].transform("max")
+    DNs_number = df["displayName"].nunique()
+    members_with_many_ABs = df.loc[maxAB>1, "displayName"].nunique()
+    # if a DN only has AB0 and AB1, then copy the location from AB1 to AB0 and drop AB1
+    # because AB0 is summarized and easier to detect as non-AB in next steps
+    single_AB = maxAB<=1
+    AB1s = single_AB & (df.AB==1)
+    AB0s = single_AB & (df.AB==0)
+    AB1_loc = df.loc[AB1s].drop_duplicates("displayName").set_index("displayName")
+    AB1_idx = AB1_loc.index.get_indexer(df.loc[AB0s,"displayName"]) # -1 if the DN has no AB1
+    with_AB1 = AB1_idx >= 0
+    for c in ["loc_txt", "linked"]:
+        loc_AB0 = df.loc[AB0s,c].to_numpy().copy()
+        loc_AB0[with_AB1] = AB1_loc[c].to_numpy()[AB1_idx[with_AB1]]
+        df.loc[AB0s,c] = loc_AB0
+    df["maxAB"] = maxAB.where(~single_AB, 0)
+    df.drop(df.index[AB1s], inplace=True)
 
     # At this point, we should have no DNs with only AB1: either <1 or >1
     assert df.loc[df.maxAB==1].empty, f"Unexpected AB1s: {df.loc[df.maxAB==1]}"
@@ -356,34 +708,33 @@ def plot(args) -> int:
         comment_box += f"* {line}\n"
 
     # Sorting the items by interestingness is done through a score.
-    # A good starting point:
-    df["score"] = df.span * df.minRC
-    # but there's a lot of corner cases to consider.
-
-    # Items without span or minimum would have NaNs
-    df.loc[np.isnan(df.score),"score"] = 0
-
-    # ABs usually have smaller spans and smaller RCs than whole members, so boost them
-    AB_boost_factor = 5
-    df.loc[df["AB"]>0,"score"] *= AB_boost_factor
-
     # Big RCs in ABs are even more suspicious than in whole members, so boost them
     # we need a big number. We want it around the max plotted to keep some measure of proportion.
     bigRC = minOoR
     if bigRC == inf: # there were no OoRs!
         bigRC = maxRC
     if bigRC == -inf: # there were no successes??
-        bigRC == maxFailures
+        bigRC = maxFailures
+    AB, success, OoR, fail = (df[c].to_numpy() for c in ["AB", "success", "OoR", "fail"])
+    df["score"] = score(df.span.to_numpy(), df.minRC.to_numpy(), AB, success, OoR, fail, bigRC)
 
-    # items with only 1 success have span 0, yet a single success between many failures needs highlighting. Boost the score, but tag them
+    # items with only 1 success have span 0, yet a single success between many failures needs highlighting. The score is boosted, but tag them
     only1success = (df.success==1) & ((df.fail+df.OoR)>1)
-    df.loc[only1success,"score"] = bigRC
     df.loc[only1success,"diag"] += "❓"
 
-    df.loc[df["OoR"]>0,"score"] += bigRC
-    df.loc[df["fail"]>0,"score"] += bigRC * 2
+    # With few iterations, the spans and scores are noisy. Estimate how much.
+    if args.resamples > 0:
+        samples = cols.padded("RC", cols.positions(df.index))
+        (span_lo, span_hi), (score_lo, score_hi) = bootstrap_ci(samples, [
+                lambda rows, mi, ma: (ma-mi)/mi,
+                lambda rows, mi, ma: score((ma-mi)/mi, mi, AB[rows, None], success[rows, None], OoR[rows, None], fail[rows, None], bigRC)
+            ], args.ci, args.resamples)
+        df.insert(df.columns.get_loc("span")+1, "span_lo", span_lo)
+        df.insert(df.columns.get_loc("span")+2, "span_hi", span_hi)
+        df["score_lo"] = score_lo
+        df["score_hi"] = score_hi
 
-    df.sort_values(["score"], ascending=False, kind='stable', inplace=True)
+    df.sort_values(rank_keys[args.rank], ascending=False, kind='stable', inplace=True)
 
 
     IAmode_recommended = members_with_many_ABs > (DNs_number / 2)
@@ -414,8 +765,12 @@ def plot(args) -> int:
         df_vrs = df[df["AB"] == 0]
         df = df[df["AB"]>0]
         log.debug(f"shape of vRs table:{df_vrs.shape}, ABs table:{df.shape}")
+        # Which AB makes each member's cost vary, in the order of the members table
+        members = cols.positions(df_vrs.index)
+        df_attr = attributionTable(cols, members, ab_attribution(cols, members, cols.all_seeds()), loc_txt, linked)
     else:
         df_vrs = None
+        df_attr = None
         df.drop(columns="desc",inplace=True)
 
     # Add a new index that reifies the current order
@@ -482,87 +837,53 @@ def plot(args) -> int:
     minRC_plot = min(df[~df["excluded"]].iloc[0:args.top]["minRC"])
     maxRC_plot = max(df[~df["excluded"]].iloc[0:args.top]["maxRC"])
 
-    # The histograms have the user-given num of bins between minRC_plot and maxRC_plot,
-    # + filler to the left until x=0, + 2 bins if there are fails (margin and fails bar)
-    with np.errstate(invalid='ignore'): # silence RuntimeWarnings for inf values
-        # those values could be in min/maxRC_plot if all plots are for funcs that failed for all random seeds
-        bins = np.linspace(Quantity(minRC_plot),Quantity(maxRC_plot), num=args.nbins+1)
-    bin_width = bins[1]-bins[0]
+    df.loc[df.excluded,'diag'] = "⛔️" + df.loc[df.excluded,'diag']
+    candidates = np.flatnonzero(~df["excluded"].to_numpy())
+    rows = cols.positions(df["element"].to_numpy()[candidates])
+    nfails = (df["OoR"] + df["fail"]).to_numpy()[candidates]
 
-    log.info(f"{args.nbins=}, range {smag(minRC_plot)} - {smag(maxRC_plot)}, bin width {smag(bin_width)}")
     plotting_fails = (minOoR != inf) or (minFailures != inf)
-    bin_margin = bins[-1] + 3 * bin_width
-    bin_fails = bin_margin + 3 * bin_width
-    bins_with_fails = np.append(bins,[bin_margin,bin_fails])
-
-    labels_plotted = []
-    bins_plot = bins_with_fails if plotting_fails else bins
-    bin_centers = 0.5 * (bins_plot[:-1] + bins_plot[1:])
-    bin_labels = [smag(b) for b in bin_centers]
-    if plotting_fails:
-        bin_labels = bin_labels[0:-2] + ["",failstr ]
-    hist_df = pd.DataFrame(index = bin_centers)
-    plotted = 0
-    for i in df.index:
-        row = df.loc[i]
-        if row.excluded:
-            df.loc[i,'diag'] = "⛔️" + df.loc[i,'diag']
-            continue
-        dnab = row.element
-        d = results[dnab]
-        nfails = len(d.OoR)+len(d.failures)
-        counts, _ = np.histogram(d.RC,bins=bins)
-        if plotting_fails:
-            counts = np.append(counts,[0,nfails])
-
-        # remove uninteresting plots: those without fails that would span less than <bspan> bins
-        nonempty_bins = []
-        for b,c in enumerate(counts):
-            if c != 0:
-                nonempty_bins.append(b)
-        bin_span = nonempty_bins[-1]-nonempty_bins[0]
-
-        if (nfails > 0) or (bin_span >= args.bspan):
-            labels_plotted.append(dnab)
-            hist_df[dnab] = counts
-            with np.errstate(divide='ignore'): # to silence the errors because of log of 0 values
-                hist_df[dnab+"_log"] = np.log10(counts)
-            hist_df[dnab+"_log"] = hist_df[dnab+"_log"].apply(
-                lambda l: l if l!=0 else 0.2    # log10(1) = 0, so it's barely visible in plot. log10(2)=0.3. So let's plot 1 as 0.2
-                )
-            hist_df[dnab+"_RCbin"] = bin_labels # for the hover tool
-            df.loc[i,'diag'] = "📊" + df.loc[i,'diag'] #f"F={len(d.failures)} O={len(d.OoR)}"
-            plotted += 1
-        else:
-            #row.diag+=f"{bin_span=}"
-            pass
-        if plotted >= args.top:
+    pb = plotBins(cols.padded("RC", rows[:args.top]), minRC_plot, maxRC_plot, args.nbins, args.binning, plotting_fails, failstr)
+    log.info(f"{len(pb['bins'])-1} {args.binning} bins, range {smag(minRC_plot)} - {smag(maxRC_plot)}")
+
+    # Bin the candidates in chunks, in order, until we have the top N histograms
+    # remove uninteresting plots: those without fails that would span less than <bspan> bins
+    plotted_idx = []
+    plotted_counts = []
+    chunk = max(4*args.top, 256)
+    for start in range(0, len(candidates), chunk):
+        nf = nfails[start:start+chunk]
+        counts = elementCounts(cols, rows[start:start+chunk], nf, pb)
+        keep = np.flatnonzero((nf > 0) | (bin_spans(counts) >= args.bspan))[:args.top-len(plotted_idx)]
+        plotted_idx.extend(candidates[start + keep])
+        plotted_counts.append(counts[keep])
+        if len(plotted_idx) >= args.top:
             break
 
+    labels_plotted = df["element"].to_numpy()[plotted_idx].tolist()
+    df.loc[df.index[plotted_idx],'diag'] = "📊" + df.loc[df.index[plotted_idx],'diag']
+
     dropped_cols = ["element_ordered","AB","excluded","displayName","maxAB"]
 
     dropped_cols_text = dropped_cols.copy()
-    dropped_cols_text += ["loc","src"]
-    print(df.drop(columns=dropped_cols_text, errors='ignore')
-            # .rename(columns={
-            #     "span"          : "RC span %",
-            #     "weighted_span" : "minRC * span"
-            #     })
-            .head(args.top)
-            .to_string (formatters={
-                    'maxRC':lambda x: smag(x) if abs(x)!=inf else "-" ,
-                    'minRC':lambda x: smag(x) if abs(x)!=inf else "-" ,
-                    #'OoRs':smag,
-                    #'failures':smag,
-                    "span":lambda x: f"{x:>8.2%}"
-                    },
-                na_rep='-',
-                float_format=smag
-                #max_rows=8
-                )
-            )
-
-    can_plot = not np.isnan(bin_width) and bin_width >0
+    dropped_cols_text += ["linked","src"]
+    if args.format != "html":
+        # Headless: just the report, without importing the plotting stack
+        tables = {"All elements": df.drop(columns=dropped_cols_text, errors='ignore')}
+        if df_vrs is not None:
+            tables = {"AB-level data": tables["All elements"],
+                      "Member-level summary": df_vrs.drop(columns=dropped_cols_text, errors='ignore'),
+                      "Instability by AB": df_attr.drop(columns=dropped_cols_text, errors='ignore')}
+        print(report(args.format, title, tables, comment_box, {"paths": args.paths, "IAmode": IAmode}, args.top))
+        return 0
+
+    print(textTable(df.drop(columns=dropped_cols_text, errors='ignore').head(args.top)))
+
+    if args.serve:
+        from darum.report_server import serve
+        return serve(args, title, df, df_vrs, cols, results, sourcecode, labels_plotted, failstr, comment_box)
+
+    can_plot = not np.isnan(pb["bin_width"]) and pb["bin_width"] >0
     if not can_plot:
         comment_box += f"* The top {args.top} results were not plottable. Only tables were generated.\n"
 
@@ -574,7 +895,9 @@ def plot(args) -> int:
 
     # HOLOVIEWS
 
-
+    import holoviews as hv  # type: ignore
+    import panel as pn
+    from ansi2html import Ansi2HTMLConverter
 
     hv.extension('bokeh')
     # renderer = hv.renderer('bokeh')
@@ -584,280 +907,37 @@ def plot(args) -> int:
 
     hvplot = None
     if can_plot:
-        histplots_dict = {}
-        jitter = (bin_width)/len(labels_plotted)/3
-        for i,dn in enumerate(labels_plotted):
-            eo = df[df["element"]==dn]["element_ordered"].values[0]
-            h = hv.Histogram(
-                    (bins_plot+i*jitter,
-                        hist_df[dn+"_log"],
-                        hist_df[dn],
-                        hist_df[dn+"_RCbin"]
-                        ),
-                    kdims=["RC"],
-                    vdims=["LogQuantity", "Quantity", "RCbin"]
-                )
-            histplots_dict[eo] = h
-
-        hover = HoverTool(tooltips=[
-            ("Element", "@Element"),
-            ("ResCount bin", "@RCbin"),
-            ("Quantity", "@Quantity"),
-            ("Log(Quantity)", "@LogQuantity"),
-            ])
-
-        bticker = BasicTicker(min_interval = 10**math.floor(math.log10(bin_width)), num_minor_ticks=0)
-
-        hists = hv.NdOverlay(histplots_dict)#, kdims='Elements')
-        hists.opts(
-            opts.Histogram(alpha=0.9,
-                            responsive=True,
-                            height=500,
-                            tools=[hover],
-                            show_legend=True,
-                            muted=True,
-                            backend_opts={
-                            "xaxis.bounds" : (0,bins_plot[-1]+bin_width),
-                            "xaxis.ticker" : bticker
-                                },
-                            autorange='y',
-                            ylim=(0,None),
-                            xlim=(0,bins_plot[-1]+bin_width),
-                            xlabel="RC bins",
-                            padding=((0.1,0.1), (0, 0.1)),
-                ),
-            #,logy=True # histograms with logY have been broken in bokeh for years: https://github.com/holoviz/holoviews/issues/2591
-            opts.NdOverlay(show_legend=True,)
-            )
-
-        # A vertical line separating the fails bar
-        # disabled because it disables the autoranging of the histograms
-        # vline = hv.VLine(bin_centers[-2]).opts(
-        #     opts.VLine(color='black', line_width=3, autorange='y',ylim=(0,None))
-        # )
-        # vspan = hv.VSpan(bin_centers[-2],bin_centers[-1]).opts(
-        #     opts.VSpan(color='red', autorange='y',ylim=(0,None),apply_ranges=False)
-        # )
-
-        # hists = hists * vspan
-
-
-        ####### SPIKES
-
-        # A JavaScript function to customize the hovertool
-        from bokeh.models import CustomJSHover
-
-        RCFfunc = CustomJSHover(code='''
-                var value;
-                var modified;
-                if (value > ''' + str(int(maxRC_plot)) + ''') {
-                    modified = "''' + failstr + '''";
-                } else {
-                    modified = value.toString();
-                }
-                return modified
-        ''')
-
-        nlabs = len(labels_plotted)
-        spikes_dict = {}
-        for i,dn in enumerate(labels_plotted):
-            eo = df[df["element"]==dn]["element_ordered"].values[0]
-            RC = results[dn].RC
-            # Represent the failures / OoRs with a spike in the last bin
-            for f in range(len(results[dn].OoR)+len(results[dn].failures)):
-                RC.append(bin_centers[-1]+f*bin_width/20)
-            hover2 = HoverTool(
-                        tooltips=[
-                            ("Element", dn),
-                            ("ResCount", "@RC{custom}"),
-                            ],
-                        formatters={
-                            "@RC" : RCFfunc,
-                            "dn"  : 'numeral'
-                        }
-                    )
-            spikes_dict[eo] = hv.Spikes(RC,kdims="RC").opts(position=nlabs-i-1,tools=[hover2],xaxis="bottom")
-
-        yticks = [(nlabs-i-0.5, list(spikes_dict.keys())[i]) for i in range(nlabs)]#-1,-1,-1)]
-        spikes = hv.NdOverlay(spikes_dict).opts(
-            yticks = yticks
-            )
-
-        spikes.opts(
-            opts.Spikes(spike_length=1,
-                        line_alpha=1,
-                        responsive=True,
-                        height=50+nlabs*20,
-                        color=hv.Cycle(),
-                        ylim=(0,nlabs),
-                        autorange=None,
-                        yaxis='right',
-                        backend_opts={
-                            "xaxis.bounds" : (0,bins_plot[-1]+bin_width)
-                            },
-                        ),
-            opts.NdOverlay(show_legend=False,
-                            click_policy='mute',
-                            autorange=None,
-                            ylim=(0,nlabs),
-                            xlim=(0,bins_plot[-1]+bin_width),
-                            padding=((0.1,0.1), (0, 0.1)),
-                        ),
-            #opts.NdOverlay(shared_axes=True, shared_datasource=True,show_legend=False)
-            )
-
-        ##### HISTOGRAMS AND SPIKES TOGETHER
-
-        hvplot = hists + spikes #+ table_plot #+ hist #+ violin
-        mf = NumericalTickFormatterWithLimit(bin_margin, format="0.0a")
-
-        hvplot.opts(
-        #     #opts.Histogram(responsive=True, height=500, width=1000),
-            # opts.Layout(sizing_mode="scale_both", shared_axes=True, sync_legends=True, shared_datasource=True)
-            opts.NdOverlay(
-                click_policy='mute',
-                autorange='y',
-                xformatter=mf,
-                legend_position="right",
-                responsive=True
-                )
-        )
-        hvplot.opts(shared_axes=True)
-        hvplot.cols(1)
+        names_plotted = df["element_ordered"].to_numpy()[plotted_idx].tolist()
+        hvplot = elementsPlot(labels_plotted, names_plotted, np.concatenate(plotted_counts), results, pb, maxRC_plot, failstr)
 
-    # TABLE/S
-    dropped_cols += ["loc_txt"]
-    df["span"] = df["span"].apply(lambda d: nan if np.isnan(d) else int(d*10000)/100)
-    # We can't use magnitudes with the RCs because then the tables can't be sorted correctly.
-    df.minRC = df.minRC.apply(lambda x: x if abs(x)<inf else "-")
-    df.maxRC = df.maxRC.apply(lambda x: x if abs(x)<inf else "-")
-    df.success = df.success.apply(lambda x: x if x!=0 else "-")
-    #df.OoR = df.OoR.apply(lambda x: x if x!=0 else "-")
-    #df.fail = df.fail.apply(lambda x: x if x!=0 else "-")
-
-    dft1 = df.drop(columns=dropped_cols).rename(
-        columns={
-            "span":"RCspan%",
-            }
-    )
-
-
-    bokeh_formatters = {
-        'minRC': NumberFormatter(format='0,0', text_align = 'right'),
-        'maxRC': NumberFormatter(format='0,0', text_align = 'right'),
-        # 'RCspan%': NumberFormatter(format='0.00', text_align = 'right'),
-        'score': NumberFormatter(format='0,0', text_align = 'right'),
-        'success': NumberFormatter(format='0,0', text_align = 'right'),
-        'fail': NumberFormatter(format='0,0', text_align = 'right'),
-        'OoR': NumberFormatter(format='0,0', text_align = 'right'),
-        'loc': {'type':'html'}
-    }
-
-    table = pn.widgets.Tabulator(dft1, 
-        pagination=None,  # no explicit pages, just scrolling
-        frozen_columns=['index'], 
-        disabled=True, 
-        layout='fit_data_table', 
-        selectable=False, 
-        text_align={"diag":"center"},
-        formatters=bokeh_formatters, 
-        configuration={
-            "initialSort":[{"column":"score","dir":"asc"}], # not working anyway
-            #"renderVertical":"basic" # the whole table is rendered at once, instead of when scrolled in
-        }, 
-        height=300) #give a glimpse of more rows
-
-    table_title = pn.pane.Markdown("## All elements")
-    table_vrs = None
-    table_vrs_title = None
-    if df_vrs is not None:
-        df_vrs.reset_index(inplace=True)
-        df_vrs.rename_axis(index="idx",inplace=True)
-        df_vrs["span"] = df_vrs["span"].apply(lambda d: nan if np.isnan(d) else int(d*10000)/100)
-        df_vrs.minRC = df_vrs.minRC.apply(lambda x: x if abs(x)<inf else "-")
-        df_vrs.maxRC = df_vrs.maxRC.apply(lambda x: x if abs(x)<inf else "-")
-        df_vrs.success = df_vrs.success.apply(lambda x: x if x!=0 else "-")
-        #df_vrs.OoR = df_vrs.OoR.apply(lambda x: x if x!=0 else "-")
-        #df_vrs.fail = df_vrs.fail.apply(lambda x: x if x!=0 else "-")
-        dft2 = df_vrs.drop(columns=dropped_cols, errors='ignore').rename(
-                            columns={
-                                "span":"RCspan%",
-                                })
-
-        table_vrs = pn.widgets.Tabulator(dft2, 
-            pagination=None,  
-            frozen_columns=['index'], 
-            disabled=True, 
-            layout='fit_data_table', 
-            selectable=False, 
-            text_align={"diag":"center"},
-            formatters=bokeh_formatters, 
-            configuration={
-                "initialSort":[{"column":"score","dir":"asc"}], # not working anyway
-                #"renderVertical":"basic" 
-            }, 
-            height=300) #give a glimpse of more rows
-
-        table_title = pn.pane.Markdown("## AB-level data")
-        table_vrs_title = pn.pane.Markdown("## Member-level summary")
-
-
-    # the legend and other explanations (score?) could be turned into table tooltips, hoped for Panel 1.5
-    legend_icons = """
-## Legend
-### Elements
-MemberName [C] = MemberName's Correctness assertions (as opposed to the default Well-Formedness)
-MemberName B2  = MemberName's Assertion Batch 2
-
-
-### Diagnostic icons
-❌  All iterations failed verification
-⌛️  Some iteration ran Out of Resources
-❗️  Flipflopping result: some successes, some failures
-❓  Notable entry because there was only 1 success
-📊  Item present in the plot
-⛔️  Item excluded from plot
-"""
-    legend_pane = pn.pane.Markdown(legend_icons)
-
-    if comment_box!="":
-        comment_box = "# Comments:\n" + comment_box
-        pane_comment_box = pn.pane.Markdown(comment_box)
-        # print(f"\n{comment_box}")
-    else:
-        pane_comment_box = None
-        
+    # OVERVIEW OF ALL THE ELEMENTS
+    fractions, edges, starts = heatmap(cols, cols.positions(df["element"]), args.nbins)
+    overview = pn.pane.Bokeh(heatmap_figure(fractions, edges, starts, df["element"].tolist(),
+            f"All {len(df)} {'ABs' if IAmode else 'elements'}, in table order: share of results per RC bin", table_tag="darum-table"),
+        sizing_mode="stretch_width")
 
+    # SOURCES AND STDOUT
+    # Stored compressed, and only inflated by the page when shown or when a link points into them
     pane_cmds = pn.Column()
     conv = Ansi2HTMLConverter()
-    for p in args.paths:
+    packed_size = 0
+    for p, j in zip(args.paths, contexts):
         try:
-            with open(p) as jsonfile:
-                j = json.load(jsonfile)['darum']
-            pane_cmds.append(pn.pane.Markdown("**" + ' '.join(j['cmd']) + "**"))
-            pane_cmds.append(pn.pane.HTML(f"""<a id="stdout"></a>""" + 
-                    conv.convert("".join(j['output'])),styles={'background-color': '#CCC'}))
-            for name,source in j['files'].items():
-    #             source = """Here is an example:
-
-    #     :::python
-    #     print('hellow world')
-    #     """
-    #             source = """Here is an example of AppleScript:
-    # ``` { .lang linenos=true linenostart=42 hl_lines="43-44 50" title="An Example Code Block" }
-    #     :::python
-    #     print('hellow world')
-    # ```
-    # """
+            pane_cmds.append(pn.pane.Markdown("**" + ' '.join(j['dafny_cmd']) + "**"))
+            stdout = packed('<a id="stdout"></a>' + conv.convert("".join(j['output'])))
+            packed_size += len(stdout)
+            pane_cmds.append(pn.pane.HTML(f"""<details data-packed="{stdout}"><summary>Dafny output ({len(j['output'])} lines)</summary></details>""",
+                    styles={'background-color': '#CCC'}))
+            for name,file in j['files'].items():
+                # older logs stored only the contents
+                source = file["contents"] if isinstance(file, dict) else file
                 # The markdown rendereres are supposed to highlight source code. But I can't make them work even to just add line numbers.
                 # Pygments doesn't highlight Dafny, anyway.
                 # So we add our own line numbers.
-                numbered = ""
                 splitted = source.splitlines(False)
                 lines_max = len(splitted)
-                num_digits = int(math.log10(lines_max))
-                for i,l in enumerate(splitted):
-                    numbered += f'<a id="L{i+1}">{i+1:{num_digits}}: {l}</a><br />'
+                num_digits = int(math.log10(max(lines_max, 1)))
+                numbered = "".join(f'<a id="L{i+1}">{i+1:{num_digits}}: {html.escape(l)}</a><br />' for i,l in enumerate(splitted))
                 stylesheet = '''
 a[id^="L"] {
   scroll-margin-top: 50vh;
@@ -866,19 +946,73 @@ a[id^="L"] {
   background-color : yellow
 }
 '''
-                pane_cmds.append(pn.pane.HTML(f'<h2 id="title">{name}</h2><pre><code>{numbered}</code></pre>', stylesheets=[stylesheet]))#, renderer="markdown",extensions=["fenced_code","codehilite"]))
+                code = packed(f'<pre><code>{numbered}</code></pre>')
+                packed_size += len(code)
+                pane_cmds.append(pn.pane.HTML(f'<h2 id="title">{name}</h2><details data-packed="{code}"><summary>{lines_max} lines</summary></details>', stylesheets=[stylesheet]))
         except Exception as e:
             log.info(f"Failed to get extra context data from {p}:{e}")
             continue
 
-    title = "-".join([os.path.splitext(os.path.basename(p))[0] for p in args.paths])
+    # TABLE/S
+    dft1 = htmlTable(df, dropped_cols)
+    dft2 = None
+    if df_vrs is not None:
+        df_vrs.reset_index(inplace=True)
+        df_vrs.rename_axis(index="idx",inplace=True)
+        dft2 = htmlTable(df_vrs, dropped_cols)
+    dft3 = None
+    if df_attr is not None and not df_attr.empty:
+        dft3 = htmlAttributionTable(df_attr)
+
+    # Keep the tables within what's left of the size budget, dropping their lowest ranked rows
+    html_tables = [t for t in [dft1, dft2, dft3] if t is not None]
+    tables_size = sum(serializedSize(t) for t in html_tables)
+    tables_budget = args.max_size * 1e6 - packed_size
+    if tables_size > tables_budget:
+        fraction = max(tables_budget, 0) / tables_size
+        rows = [max(int(len(t) * fraction), args.top) for t in html_tables]
+        if any(r < len(t) for r, t in zip(rows, html_tables)):
+            dft1, dft2, dft3 = [t.head(r) for r, t in zip(rows, html_tables)] + [None] * (3 - len(html_tables))
+            comment_box += (f"* To keep the page within {args.max_size} MB, its tables only include the top "
+                            + " and ".join(f"{r} of {len(t)}" for r, t in zip(rows, html_tables))
+                            + " rows. Use `--max-size` to include more, or `--format json` for all of them.\n")
+
+    table = tabulator(dft1, tags=["darum-table"]) # for the overview to jump to its rows
+    table_title = pn.pane.Markdown("## All elements")
+    table_vrs = None
+    table_vrs_title = None
+    if dft2 is not None:
+        table_vrs = tabulator(dft2)
+        table_title = pn.pane.Markdown("## AB-level data")
+        table_vrs_title = pn.pane.Markdown("## Member-level summary")
+    table_attr = None
+    table_attr_title = None
+    if dft3 is not None:
+        table_attr = tabulator(dft3, frozen_columns=['Member'])
+        table_attr_title = pn.pane.Markdown("## Instability by AB\n"
+            "For each member with several ABs, in the order of the member-level summary: the AB that accounts for most of the variance "
+            "of the member's cost across the successful iterations (var%), with the part of it from the AB's own variance (own%), "
+            "and the AB's part of the difference between the member's most and least expensive iterations (span%).")
+
+
+    legend_pane = pn.pane.Markdown(legend_icons)
+
+    if comment_box!="":
+        comment_box = "# Comments:\n" + comment_box
+        pane_comment_box = pn.pane.Markdown(comment_box)
+        # print(f"\n{comment_box}")
+    else:
+        pane_comment_box = None
+        
+
     pane_title = pn.pane.Markdown(f"# {title}")
     pane_customJS = pn.pane.HTML(customJS, visible=False)
-    plot = pn.Column(pane_title, hvplot, table_title, table, table_vrs_title, table_vrs,   pane_comment_box, legend_pane, pane_cmds, pane_customJS)
+    plot = pn.Column(pane_title, hvplot, overview, table_title, table, table_vrs_title, table_vrs, table_attr_title, table_attr, pane_comment_box, legend_pane, pane_cmds, pane_customJS)
 
 
     # fig.xaxis.bounds = (0,bin_fails)
 
+    os.makedirs(args.output_dir, exist_ok=True)
     plotfilepath = os.path.join(args.output_dir, title+".html")
 
     try:
@@ -893,6 +1027,27 @@ a[id^="L"] {
     plot.save(plotfilepath,title=title)#, resources=INLINE)
 
     print(f"Created file {plotfilepath}")
+    if summary is not None:
+        worst = df.nlargest(3, "score")
+        # In standard mode, df also has the ABs of the members with several, so count only the members
+        counted = df if IAmode else df[df.AB == 0]
+        members = cols.AB == 0
+        with np.errstate(invalid='ignore', divide='ignore'): # members without successes
+            mean_RC = cols.reduce("RC", np.add, 0)[members] / cols.count("RC")[members]
+        summary.update({
+            "title": title,
+            "page": plotfilepath,
+            "IAmode": bool(IAmode),
+            "elements": len(counted),
+            "counted": "ABs" if IAmode else "members",
+            "with_OoR": int((counted.OoR > 0).sum()),
+            "with_failures": int((counted.fail > 0).sum()),
+            # the sum of the members' mean RC: what verifying them all once costs, typically
+            "total_RC": float(np.nansum(mean_RC)),
+            "worst_score": float(worst["score"].iloc[0]) if not worst.empty else nan,
+            "worst_elements": worst["element"].tolist(),
+        })
+        return 0
     os.system(f"open {plotfilepath}")
 
 
@@ -0,0 +1,92 @@
+"""
+The ranked tables and the diagnostics as text, Markdown or JSON, for CI and terminals.
+Doesn't need the plotting stack.
+"""
+
+from __future__ import annotations
+import json
+import math
+from math import inf
+from typing import TYPE_CHECKING
+from darum.log_readers import smag
+if TYPE_CHECKING:
+    import pandas as pd
+
+formats = ["html", "text", "markdown", "json"]
+
+def percent(x) -> str:
+    return f"{x:>8.2%}"
+
+def correlation(x) -> str:
+    return f"{x:>6.2f}"
+
+column_formatters = {
+    'maxRC': lambda x: smag(x) if abs(x)!=inf else "-",
+    'minRC': lambda x: smag(x) if abs(x)!=inf else "-",
+    "span": percent,
+    "span_lo": percent,
+    "span_hi": percent,
+    "gap": percent,
+    "minRC_shift": percent,
+    "span_shift": percent,
+    "var_share": percent,
+    "var_own": percent,
+    "var_shared": percent,
+    "span_share": percent,
+    "r": correlation,
+    "r_total": correlation,
+}
+
+def formatter(column: str):
+    # compare_distribution suffixes the IA mode columns
+    return column_formatters.get(column.removesuffix(" IA"))
+
+def textTable(df: pd.DataFrame) -> str:
+    return df.to_string(formatters={c: formatter(c) for c in df.columns if formatter(c)}, na_rep='-', float_format=smag)
+
+def comments(comment_box: str) -> list[str]:
+    """The comments as a list, from their Markdown list"""
+    return [l.removeprefix("* ") for l in comment_box.splitlines() if l.strip() != ""]
+
+def markdownCell(column: str, v) -> str:
+    if isinstance(v, float):
+        if math.isnan(v):
+            return "-"
+        return (formatter(column) or smag)(v).strip()
+    return str(v).replace("|", "\\|")
+
+def markdownTable(df: pd.DataFrame) -> str:
+    columns = [df.index.name or ""] + list(df.columns)
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for idx, row in zip(df.index, df.itertuples(index=False)):
+        lines.append("| " + " | ".join([str(idx)] + [markdownCell(c, v) for c, v in zip(df.columns, row)]) + " |")
+    return "\n".join(lines)
+
+def markdownReport(title: str, tables: dict[str, pd.DataFrame], comment_box: str) -> str:
+    md = [f"# {title}"]
+    for heading, df in tables.items():
+        md += ["", f"## {heading}", "", markdownTable(df)]
+    if comment_box != "":
+        md += ["", "## Comments", "", comment_box.rstrip()]
+    return "\n".join(md) + "\n"
+
+def jsonReport(title: str, tables: dict[str, pd.DataFrame], comment_box: str, context: dict | None = None) -> str:
+    report = {
+        "title": title,
+        "comments": comments(comment_box),
+    } | (context or {})
+    # pandas writes the tables much faster than the json module, and NaN/inf as null, which is valid JSON
+    tables_json = ",".join(f"{json.dumps(heading, ensure_ascii=False)}:{df.reset_index().to_json(orient='records', force_ascii=False, double_precision=15)}"
+                           for heading, df in tables.items())
+    return json.dumps(report, ensure_ascii=False)[:-1] + f', "tables": {{{tables_json}}}}}'
+
+def report(format: str, title: str, tables: dict[str, pd.DataFrame], comment_box: str, context: dict | None = None, top: int | None = None) -> str:
+    """The report in the given format. The text and Markdown tables only include the top rows; JSON includes all of them."""
+    if format == "json":
+        return jsonReport(title, tables, comment_box, context)
+    shown = {heading: df.head(top) if top is not None else df for heading, df in tables.items()}
+    if format == "markdown":
+        return markdownReport(title, shown, comment_box)
+    if format == "text":
+        return "\n\n".join(textTable(df) for df in shown.values()) + f"\nComments:\n{comment_box}"
+    raise ValueError(f"Unknown report format {format}. Available: {formats}")
@@ -0,0 +1,193 @@
+"""
+Serve plot_distribution's results from a local Panel server, instead of saving them into a static page.
+The logs are processed once and kept in memory. The plots and the source context are computed for whichever rows
+get selected in the tables, and re-ranking, filtering or excluding elements only re-sort the tables already in memory.
+"""
+
+from __future__ import annotations
+import os
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING
+import numpy as np
+from darum.columnar import ResultsColumns
+from darum.heatmap import heatmap, heatmap_figure
+from darum.histograms import binnings
+from darum.log_readers import readDarumContext, resultsType
+from darum.plot_distribution import dn_is_excluded, elementCounts, elementsPlot, htmlTable, legend_icons, plotBins, rank_keys, tabulator
+if TYPE_CHECKING:
+    import pandas as pd
+
+dropped_cols = ["element_ordered", "AB", "excluded", "displayName", "maxAB"]
+
+# Lines of source shown around each selected element's location, and at most for each element
+context_lines = 3
+max_source_lines = 50
+
+def rankedTable(df: pd.DataFrame, rank: str, exclude: list[str]) -> pd.DataFrame:
+    """The table of the elements (indexed by element) as shown in the page, ranked and with the exclusions marked"""
+    df = df.sort_values(rank_keys[rank], ascending=False, kind='stable')
+    excluded = np.array([dn_is_excluded(e, exclude) for e in df.index], dtype=bool)
+    df = df.assign(diag=np.where(excluded, "⛔️", "") + df["diag"], linked=False) # there are no sources in the page to link to
+    return htmlTable(df.reset_index().rename_axis(index="idx"), dropped_cols)
+
+def topRows(dft: pd.DataFrame, top: int) -> list[int]:
+    """The first rows of the table that aren't excluded from the plots"""
+    return np.flatnonzero(~dft["diag"].str.startswith("⛔️").to_numpy())[:top].tolist()
+
+def matching(df: pd.DataFrame, pattern: str) -> pd.DataFrame:
+    """The rows whose element matches the regex, or contains the text if it's not a valid regex"""
+    if not pattern:
+        return df
+    try:
+        return df[df["element"].str.contains(pattern, case=False, regex=True)]
+    except re.error:
+        return df[df["element"].str.contains(pattern, case=False, regex=False)]
+
+def sourceContext(element: str, loc: str, filename: str, sourcecode: dict[str, list[str]]) -> str:
+    """Markdown with the source lines at the element's location (L12-20 or 12:5), or "" if unavailable"""
+    m = re.match(r'^L?(\d+)(?:-(\d+)|:(\d+))?$', loc.removeprefix(filename + ":"))
+    lines = sourcecode.get(os.path.basename(filename))
+    if m is None or lines is None:
+        return ""
+    first = int(m[1])
+    last = min(int(m[2] or first), first + max_source_lines)
+    shown = range(max(first - context_lines, 1), min(last + context_lines, len(lines)) + 1)
+    num_digits = len(str(shown.stop))
+    code = "\n".join(f"{'>' if first <= i <= last else ' '}{i:{num_digits}}: {lines[i-1]}" for i in shown)
+    return f"**{element}** ({loc})\n```\n{code}\n```\n"
+
+def serve(args, title: str, df: pd.DataFrame, df_vrs: pd.DataFrame | None, cols: ResultsColumns, results: resultsType,
+          sourcecode: dict[str, list[str]], plotted: list[str], failstr: str, comment_box: str) -> int:
+    """Serve the processed tables until interrupted. plotted are the elements selected at first, as in the static page."""
+    import holoviews as hv  # type: ignore
+    import panel as pn
+
+    hv.extension('bokeh')
+
+    # The tables' rows as they came from plot_distribution, before marking the plotted/excluded ones
+    tables = {("AB-level data" if df_vrs is not None else "All elements"): df.set_index("element")}
+    if df_vrs is not None:
+        tables["Member-level summary"] = df_vrs
+    for name, t in tables.items():
+        tables[name] = t.assign(diag=t["diag"].str.replace("📊", "").str.replace("⛔️", ""))
+    loc = {e: l for t in tables.values() for e, l in t["loc_txt"].items()}
+
+    cmds = []
+    for p in args.paths:
+        try:
+            cmds.append("**" + ' '.join(readDarumContext(p)['dafny_cmd']) + "**")
+        except Exception:
+            pass
+
+    @lru_cache(maxsize=64)
+    def binned(elements: tuple[str, ...], binning: str) -> tuple[dict, np.ndarray, float] | None:
+        """The histograms of the elements, sharing the bins decided from their own RCs. None if there's nothing to bin."""
+        rows = cols.positions(elements)
+        RCs = cols.padded("RC", rows)
+        if np.isnan(RCs).all():
+            return None
+        nfails = cols.count("OoR")[rows] + cols.count("failures")[rows]
+        minRC, maxRC = np.nanmin(RCs), np.nanmax(RCs)
+        pb = plotBins(RCs, minRC, maxRC, args.nbins, binning, bool(nfails.any()), failstr)
+        if np.isnan(pb["bin_width"]) or pb["bin_width"] <= 0:
+            return None
+        return pb, elementCounts(cols, rows, nfails, pb), maxRC
+
+    main_table = next(iter(tables))
+
+    @lru_cache(maxsize=len(rank_keys))
+    def overview(rank: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+        """The heatmap of the main table's elements, in the order of the ranking"""
+        elements = tables[main_table].sort_values(rank_keys[rank], ascending=False, kind='stable').index.tolist()
+        return *heatmap(cols, cols.positions(elements), args.nbins), elements
+
+    def app():
+        # Each session gets its own widgets; the data is shared
+        rank = pn.widgets.Select(name="Rank by", options=list(rank_keys), value=args.rank)
+        exclude = pn.widgets.TextInput(name="Exclude from plots (comma separated)", value=", ".join(args.exclude))
+        pattern = pn.widgets.TextInput(name="Filter elements (regex)", placeholder="element")
+        binning = pn.widgets.Select(name="Binning", options=binnings, value=args.binning)
+
+        def excluded() -> list[str]:
+            return [e.strip() for e in exclude.value.split(",") if e.strip()]
+
+        widgets = {}
+        for name, t in tables.items():
+            dft = rankedTable(t, rank.value, excluded())
+            widgets[name] = tabulator(dft,
+                pagination='remote', # the rows stay in the server until their page is shown
+                page_size=20,
+                selectable='checkbox',
+                selection=[i for i, e in enumerate(dft["element"]) if e in plotted], # like the static page
+                header_filters=True,
+                height=None)
+            widgets[name].add_filter(pn.bind(matching, pattern=pattern))
+
+        def rerank(_):
+            for i, (name, w) in enumerate(widgets.items()):
+                w.value = rankedTable(tables[name], rank.value, excluded())
+                w.selection = topRows(w.value, args.top) if i == 0 else []
+        rank.param.watch(rerank, "value")
+        exclude.param.watch(rerank, "value")
+
+        def selected() -> list[str]:
+            elements = []
+            for w in widgets.values():
+                elements += [e for e, d in zip(w.value["element"].iloc[w.selection], w.value["diag"].iloc[w.selection])
+                             if not d.startswith("⛔️") and e not in elements]
+            return elements
+
+        def plots(*_):
+            elements = selected()
+            if not elements:
+                return pn.pane.Markdown("Select some rows in the tables to plot them.")
+            b = binned(tuple(elements), binning.value)
+            if b is None:
+                return pn.pane.Markdown("The selected elements have no spread of successful RCs to plot.")
+            pb, counts, maxRC = b
+            return elementsPlot(elements, elements, counts, results, pb, maxRC, failstr)
+
+        def sources(*_):
+            rows = cols.positions(selected())
+            context = "".join(sourceContext(e, loc[e], f, sourcecode) for e, f in zip(cols.element[rows], cols.filename[rows]))
+            return pn.pane.Markdown("## Sources\n" + context if context else "")
+
+        def overviewPlot(rank: str):
+            from bokeh.events import Tap
+            fractions, edges, starts, elements = overview(rank)
+            fig = heatmap_figure(fractions, edges, starts, elements,
+                                 f"All {len(elements)} elements, in table order: share of results per RC bin. Click to select.")
+            def select(e):
+                w = widgets[main_table]
+                if 0 <= int(e.y) < len(starts):
+                    row = int(starts[int(e.y)])
+                    label = w.value.index[row]
+                    # the pages are over the filtered and sorted view, so clear the filter if it hides the element
+                    if label not in w.current_view.index:
+                        pattern.value = ""
+                    if label in w.current_view.index:
+                        w.page = w.current_view.index.get_loc(label) // w.page_size + 1
+                    w.selection = [row]
+            fig.on_event(Tap, select)
+            return pn.pane.Bokeh(fig, sizing_mode="stretch_width")
+
+        selections = [w.param.selection for w in widgets.values()] + [w.param.value for w in widgets.values()]
+        column = pn.Column(
+            pn.pane.Markdown(f"# {title}"),
+            pn.Row(rank, exclude, pattern, binning),
+            pn.panel(pn.bind(plots, *selections, binning), sizing_mode="stretch_width"),
+            pn.bind(sources, *selections),
+            pn.bind(overviewPlot, rank),
+            sizing_mode="stretch_width")
+        for name, w in widgets.items():
+            column.extend([pn.pane.Markdown(f"## {name}"), w])
+        if comment_box != "":
+            column.append(pn.pane.Markdown("# Comments:\n" + comment_box))
+        column.append(pn.pane.Markdown(legend_icons.replace("📊  Item present in the plot\n", "")))
+        column.extend([pn.pane.Markdown(c) for c in cmds])
+        return column
+
+    # Blocks until interrupted
+    pn.serve({"darum": app}, port=args.port, show=True, title=title, threaded=False)
+    return 0
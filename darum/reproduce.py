@@ -0,0 +1,123 @@
+#! python3
+"""
+Re-run the (member, seed) pairs recorded in the seed bank, in parallel and only for the member in question,
+to check and investigate their results in seconds instead of re-measuring everything.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging as log
+import os
+from datetime import datetime as dt
+from darum.find_extremes import SeedRunner, member_symbol
+from darum.log_readers import readDarumContext, readJSONIterations, smag
+from darum.seed_bank import DEFAULT_BANK, loadSeedBank
+
+# The options that are set per run, so they are removed from the original command
+overridden_options = ["--random-seed", "--iterations", "--log-format", "--filter-symbol"]
+
+def base_args(dafny_cmd: list[str]) -> tuple[str, list[str]]:
+    """The Dafny executable and the args of the original command, without measure-complexity and the per-run options"""
+    args = []
+    skip = False
+    for a in dafny_cmd[2:]:
+        if skip:
+            skip = False
+        elif a in overridden_options:
+            skip = True
+        elif a != "":
+            args.append(a)
+    return dafny_cmd[0], args
+
+def outcome_of(results, element: str, randomSeed: int) -> tuple[str, int] | None:
+    d = results.get(element)
+    if d is None:
+        return None
+    for kind, RCs, seeds in [("RC", d.RC, d.RC_seeds), ("OoR", d.OoR, d.OoR_seeds), ("failures", d.failures, d.failures_seeds)]:
+        if randomSeed in seeds:
+            return kind, RCs[seeds.index(randomSeed)]
+    return None
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-run the members' extreme results recorded in the seed bank.")
+    parser.add_argument("element", nargs="?", default="", help="Only reproduce elements containing this substring")
+    parser.add_argument("-b", "--bank", default=DEFAULT_BANK, help="The seed bank file. Default=%(default)s")
+    parser.add_argument("-k", "--kinds", default="min,max,OoR,failures", help="Comma-separated kinds of samples to reproduce. Default=%(default)s")
+    parser.add_argument("-d", "--dafnyexec", help="The dafny executable. Default: the one in the original log")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of Dafny processes to run concurrently. Default=%(default)s")
+    parser.add_argument("-t", "--timeout", type=int, default=600, help="Seconds before giving up on a run. Default=%(default)s")
+    parser.add_argument("-o", "--output_dir", default="darum", help="Directory to store the results. Default=%(default)s")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    numeric_level = log.WARNING - args.verbose * 10
+    log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
+
+    bank = loadSeedBank(args.bank)
+    kinds = args.kinds.split(",")
+
+    # Group the samples into runs. ABs of the same member with the same seed are reproduced by a single run.
+    runs: dict[tuple, list[tuple[str, str, dict]]] = {} # (log, rseed, iteration, symbol): [(element, kind, sample)]
+    for element, e in bank["elements"].items():
+        if args.element not in element:
+            continue
+        for kind in kinds:
+            samples = e[kind] if isinstance(e[kind], list) else [e[kind]]
+            for s in samples:
+                if s is None:
+                    continue
+                if s["rseed"] is None or s["iteration"] is None:
+                    log.warning(f"{element} {kind}: {s['log']} has no darum context, can't reproduce")
+                    continue
+                key = (s["log"], s["rseed"], s["iteration"], member_symbol(e["displayName"]))
+                runs.setdefault(key, []).append((element, kind, s))
+
+    if not runs:
+        print("Nothing to reproduce")
+        return 1
+
+    logs_directory = os.path.join(args.output_dir, "reproduce_" + dt.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(logs_directory)
+    runners: dict[str, SeedRunner] = {}
+    for logpath in {k[0] for k in runs}:
+        dafnyexec, extra_args = base_args(readDarumContext(logpath)["dafny_cmd"])
+        runners[logpath] = SeedRunner(args.dafnyexec or dafnyexec, [], extra_args, args.timeout)
+    print(f"Reproducing {sum(len(v) for v in runs.values())} samples with {len(runs)} Dafny runs")
+
+    mismatches = 0
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {}
+        for n, ((logpath, rseed, iteration, symbol), samples) in enumerate(runs.items()):
+            logfilename = os.path.join(logs_directory, f"{n}_seed{rseed}_it{iteration}.json")
+            fut = pool.submit(runners[logpath].run, rseed, logfilename, iteration, symbol)
+            futures[fut] = samples
+        for fut in as_completed(futures):
+            _, logfilename = fut.result()
+            for element, kind, s in futures[fut]:
+                line = f"{element:50} {kind:8} {smag(s['RC']):>8} @{s['randomSeed']:<11} -> "
+                if logfilename is None:
+                    print(line + "no log")
+                    mismatches += 1
+                    continue
+                # The sample is in the last iteration of the run
+                rseed_got, results = readJSONIterations(logfilename)[-1]
+                if rseed_got != s["randomSeed"]:
+                    print(line + f"❌ got randomSeed {rseed_got} instead, in {logfilename}")
+                    mismatches += 1
+                    continue
+                got = outcome_of(results, element, rseed_got)
+                if got is None:
+                    print(line + f"❌ {element} not in {logfilename}")
+                    mismatches += 1
+                    continue
+                got_kind, got_RC = got
+                same = got_RC == s["RC"] and (got_kind == kind or (got_kind == "RC" and kind in ["min", "max"]))
+                mismatches += 0 if same else 1
+                print(line + f"{'✅' if same else '❌'} {got_kind} {smag(got_RC)} in {logfilename}")
+
+    print(f"Logs in {logs_directory}")
+    return 0 if mismatches == 0 else 1
+
+# for easier debugging
+if __name__ == "__main__":
+    main()
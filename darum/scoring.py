@@ -0,0 +1,83 @@
+"""
+Statistics for scoring the elements, computed for all elements at once over the padded samples matrix:
+one row per element, padded with NaN.
+"""
+
+import numpy as np
+
+def modality(samples: np.ndarray, min_gap: float = 0.25) -> tuple[np.ndarray, np.ndarray]:
+    """Number of modes and biggest gap of each row.
+    The sorted samples are split into modes wherever one is more than min_gap over the previous one, relative to it.
+    The gap is the biggest of those relative jumps; a gap of 1 means that the next mode starts at twice the previous RC."""
+    if samples.shape[1] == 0:
+        return np.zeros(samples.shape[0], dtype=np.int64), np.zeros(samples.shape[0])
+    s = np.sort(samples, axis=1) # NaNs go last
+    with np.errstate(invalid='ignore', divide='ignore'):
+        jumps = np.nan_to_num(s[:, 1:] / s[:, :-1] - 1, nan=0, posinf=np.inf)
+    modes = (jumps > min_gap).sum(axis=1) + 1
+    modes[np.isnan(s[:, 0])] = 0
+    gap = jumps.max(axis=1, initial=0)
+    return modes, gap
+
+AB_boost_factor = 5
+
+def score(span, minRC, AB, success, OoR, fail, bigRC):
+    """Sorting the items by interestingness is done through a score. Element-wise, so it also works for
+    bootstrap resamples, with one row per element and the per-element arguments as columns."""
+    # A good starting point:
+    s = span * minRC
+    # but there's a lot of corner cases to consider.
+
+    # Items without span or minimum would have NaNs
+    s = np.where(np.isnan(s), 0, s)
+
+    # ABs usually have smaller spans and smaller RCs than whole members, so boost them
+    s = np.where(AB > 0, s * AB_boost_factor, s)
+
+    # items with only 1 success have span 0, yet a single success between many failures needs highlighting
+    s = np.where((success == 1) & ((fail + OoR) > 1), bigRC, s)
+
+    return s + np.where(OoR > 0, bigRC, 0) + np.where(fail > 0, bigRC * 2, 0)
+
+def min_max_positions(c: int) -> tuple[np.ndarray, np.ndarray]:
+    """For c draws with replacement among positions 0..c-1: the CDF of the min position,
+    and the CDFs of the max position given the min, one row per min, each shifted by the min so they can be searched as one."""
+    a = np.arange(c)[:, None]
+    b = np.arange(c)[None, :]
+    # P(min >= a and max <= b)
+    both = np.where(b >= a, ((b - a + 1) / c)**c, 0.0)
+    # P(min == a and max <= b)
+    joint = both - np.vstack([both[1:], np.zeros((1, c))])
+    p_min = joint[:, -1]
+    cdf_min = np.cumsum(p_min)
+    cdf_max_given_min = joint / p_min[:, None] + a
+    return cdf_min, cdf_max_given_min.ravel()
+
+def bootstrap_ci(samples: np.ndarray, statistics: list, level: float = 0.9, resamples: int = 200, seed: int = 0,
+                 budget: int = 10_000_000) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Confidence intervals for statistics of the min and max of each row's samples, by bootstrap.
+    Each statistic is a function (rows, minRC, maxRC) -> values, where minRC and maxRC have one column per resample.
+    Returns the (low, high) bounds for each statistic, NaN for rows without samples."""
+    n, k = samples.shape
+    counts = (~np.isnan(samples)).sum(axis=1)
+    bounds = [(np.full(n, np.nan), np.full(n, np.nan)) for _ in statistics]
+    percentiles = [(1-level)/2*100, (1+level)/2*100]
+    rng = np.random.default_rng(seed)
+    # The min and max of a resample are those of the sorted samples at the min and max drawn positions.
+    # Instead of drawing all the positions, the min and max positions are drawn from their exact joint distribution.
+    # Rows with the same number of samples share that distribution, so they are resampled together, in chunks to bound the memory.
+    ordered = np.sort(samples, axis=1) # NaNs go last
+    for c in np.unique(counts[counts > 0]):
+        cdf_min, cdf_max_given_min = min_max_positions(c)
+        rows_c = np.flatnonzero(counts == c)
+        step = max(1, budget // resamples)
+        for start in range(0, len(rows_c), step):
+            rows = rows_c[start:start+step]
+            min_pos = np.minimum(np.searchsorted(cdf_min, rng.random((len(rows), resamples)), side="right"), c-1)
+            max_pos = np.searchsorted(cdf_max_given_min, min_pos + rng.random((len(rows), resamples)), side="right") - min_pos*c
+            minRC = np.take_along_axis(ordered[rows], min_pos, axis=1)
+            maxRC = np.take_along_axis(ordered[rows], np.minimum(max_pos, c-1), axis=1)
+            for (low, high), statistic in zip(bounds, statistics):
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    low[rows], high[rows] = np.percentile(statistic(rows, minRC, maxRC), percentiles, axis=1)
+    return bounds
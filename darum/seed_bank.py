@@ -0,0 +1,124 @@
+#! python3
+"""
+Keep track of the random seeds that produced the extreme results of each member/AB,
+so that they can be reproduced later without a full re-measurement.
+"""
+
+import argparse
+import json
+import logging as log
+import os
+from darum.log_readers import Details, readDarumContext, readIterationSeeds, readLogs, smag
+
+# The bank is a JSON file:
+# {"elements": {element: {"displayName", "AB", "filename", "hash", "min": sample, "max": sample, "OoR": [sample], "failures": [sample]}}}
+# where each sample is {"RC", "randomSeed", "rseed", "iteration", "log"}.
+# randomSeed is the per-iteration seed reported in the log. To reproduce it, Dafny must be run with the log's --random-seed (rseed)
+# and as many --iterations as the iteration's position in the log, since that's how measure-complexity derives the per-iteration seeds.
+# rseed and iteration are None if the log has no darum context.
+DEFAULT_BANK = os.path.join("darum", "seedbank.json")
+
+def loadSeedBank(bankpath: str) -> dict:
+    if not os.path.isfile(bankpath):
+        return {"elements": {}}
+    with open(bankpath) as f:
+        return json.load(f)
+
+def saveSeedBank(bankpath: str, bank: dict) -> None:
+    os.makedirs(os.path.dirname(bankpath) or ".", exist_ok=True)
+    tmppath = bankpath + ".tmp"
+    with open(tmppath, "w") as f:
+        json.dump(bank, f, indent=1)
+    os.replace(tmppath, bankpath)
+
+def rseed_from_cmd(dafny_cmd: list[str]) -> int | None:
+    if "--random-seed" in dafny_cmd:
+        return int(dafny_cmd[dafny_cmd.index("--random-seed")+1])
+    return None
+
+def samples_from_Details(d: Details, logpath: str, rseed: int | None, iteration_of: dict[int,int]) -> dict:
+    """The min, max, OoR and failure samples of an element, each with the seeds needed to reproduce it"""
+    def sample(RC: int, randomSeed: int) -> dict:
+        return {
+            "RC": RC,
+            "randomSeed": randomSeed,
+            "rseed": rseed,
+            "iteration": iteration_of.get(randomSeed) if rseed is not None else None,
+            "log": logpath,
+        }
+    samples: dict = {"min": None, "max": None}
+    if d.RC:
+        imin = min(range(len(d.RC)), key=lambda i: d.RC[i])
+        imax = max(range(len(d.RC)), key=lambda i: d.RC[i])
+        samples["min"] = sample(d.RC[imin], d.RC_seeds[imin])
+        samples["max"] = sample(d.RC[imax], d.RC_seeds[imax])
+    samples["OoR"] = [sample(rc, s) for rc, s in zip(d.OoR, d.OoR_seeds)]
+    samples["failures"] = [sample(rc, s) for rc, s in zip(d.failures, d.failures_seeds)]
+    return samples
+
+def updateSeedBank(bankpath: str, logpaths: list[str]) -> dict:
+    """Adds the extreme samples of the given logs to the bank. Entries whose source file changed are replaced."""
+    bank = loadSeedBank(bankpath)
+    elements = bank["elements"]
+    for logpath in logpaths:
+        results = readLogs([logpath])
+        context = readDarumContext(logpath)
+        hashes = {f: c["hash"] for f, c in context.get("files", {}).items() if isinstance(c, dict)}
+        rseed = rseed_from_cmd(context.get("dafny_cmd", []))
+        iteration_of = {s: i+1 for i, s in enumerate(readIterationSeeds(logpath))}
+        for k, d in results.items():
+            new = samples_from_Details(d, logpath, rseed, iteration_of)
+            file_hash = hashes.get(os.path.basename(d.filename))
+            old = elements.get(k)
+            if old is None or old["hash"] != file_hash:
+                if old is not None:
+                    log.info(f"{k}: source changed, replacing its seeds")
+                elements[k] = {
+                    "displayName": d.displayName,
+                    "AB": d.AB,
+                    "filename": d.filename,
+                    "hash": file_hash,
+                    **new
+                }
+                continue
+            if new["min"] is not None and (old["min"] is None or new["min"]["RC"] < old["min"]["RC"]):
+                old["min"] = new["min"]
+            if new["max"] is not None and (old["max"] is None or new["max"]["RC"] > old["max"]["RC"]):
+                old["max"] = new["max"]
+            for kind in ["OoR", "failures"]:
+                known = {(s["log"], s["randomSeed"]) for s in old[kind]}
+                old[kind].extend(s for s in new[kind] if (s["log"], s["randomSeed"]) not in known)
+    saveSeedBank(bankpath, bank)
+    return bank
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Record in the seed bank the seeds behind the min, max, OoR and failure results of each member/AB.")
+    parser.add_argument("logs", nargs="*", help="Logs to add to the bank. If absent, just list the bank's contents.")
+    parser.add_argument("-b", "--bank", default=DEFAULT_BANK, help="The seed bank file. Default=%(default)s")
+    parser.add_argument("-f", "--filter", default="", help="Only list elements containing this substring")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    numeric_level = log.WARNING - args.verbose * 10
+    log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
+
+    if args.logs:
+        bank = updateSeedBank(args.bank, args.logs)
+        print(f"Seed bank {args.bank} now has {len(bank['elements'])} elements")
+        return 0
+
+    bank = loadSeedBank(args.bank)
+    for k, e in sorted(bank["elements"].items()):
+        if args.filter not in k:
+            continue
+        line = f"{k:50}"
+        for kind in ["min", "max"]:
+            s = e[kind]
+            line += f" {kind} " + (f"{smag(s['RC']):>8} @{s['randomSeed']:<11}" if s is not None else f"{'-':>8} {'':11}")
+        line += f" OoR {len(e['OoR'])} fail {len(e['failures'])}"
+        print(line)
+    return 0
+
+# for easier debugging
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+One-sided significance tests of a candidate's samples against a baseline's, for all elements at once:
+one row per element, padded with NaN like the samples matrices of scoring.
+"""
+
+import functools
+import math
+import numpy as np
+
+erfc = np.frompyfunc(math.erfc, 1, 1)
+
+def normal_sf(z: np.ndarray) -> np.ndarray:
+    """P(Z > z) for a standard normal Z"""
+    return erfc(np.asarray(z, dtype=np.float64) / math.sqrt(2)).astype(np.float64) / 2
+
+def mann_whitney_greater(x: np.ndarray, y: np.ndarray, budget: int = 10_000_000) -> tuple[np.ndarray, np.ndarray]:
+    """Mann-Whitney U test of each row of y being stochastically greater than the same row of x.
+    Returns U (the number of pairs where y is greater, ties counting half) and the p-value,
+    by the normal approximation with tie and continuity corrections. Rows where a side is empty, or all tied, get p=1.
+    The pairs are compared directly, in chunks of rows to bound the memory to about `budget` comparisons."""
+    rows = x.shape[0]
+    U = np.zeros(rows)
+    ties = np.zeros(rows) # sum over the tie groups of t^3 - t
+    n = x.shape[1] + y.shape[1]
+    step = max(1, budget // max(1, n * n))
+    for s in range(0, rows, step):
+        xs, ys = x[s:s+step], y[s:s+step]
+        U[s:s+step] = (ys[:, None, :] > xs[:, :, None]).sum(axis=(1, 2)) + 0.5 * (ys[:, None, :] == xs[:, :, None]).sum(axis=(1, 2))
+        z = np.concatenate([xs, ys], axis=1)
+        # each sample's tie group size t, counted by each of its t members: sum(t^2 - 1) over samples = sum(t^3 - t) over groups
+        t = (z[:, :, None] == z[:, None, :]).sum(axis=2)
+        ties[s:s+step] = np.where(t > 0, t**2 - 1, 0).sum(axis=1)
+    n1 = (~np.isnan(x)).sum(axis=1)
+    n2 = (~np.isnan(y)).sum(axis=1)
+    n = n1 + n2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+        z = (U - n1 * n2 / 2 - 0.5) / np.sqrt(var)
+    p = np.where((n1 > 0) & (n2 > 0) & (var > 0), normal_sf(np.nan_to_num(z)), 1.0)
+    return U, p
+
+def fisher_greater(bad_x: np.ndarray, total_x: np.ndarray, bad_y: np.ndarray, total_y: np.ndarray) -> np.ndarray:
+    """Exact one-sided Fisher test of each element's proportion of bad outcomes being greater in y than in x:
+    P(at least bad_y of y's outcomes are bad), given the total of bad outcomes, under the hypergeometric distribution."""
+    bad_x, total_x, bad_y, total_y = (np.asarray(a, dtype=np.int64) for a in (bad_x, total_x, bad_y, total_y))
+    N = total_x + total_y
+    K = bad_x + bad_y
+    logfact = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max(int(N.max(initial=0)), 1) + 1)))])
+    logC = lambda a, b: logfact[a] - logfact[b] - logfact[a - b]
+    top = np.minimum(K, total_y)
+    k = bad_y[:, None] + np.arange(int((top - bad_y).max(initial=0)) + 1)[None, :]
+    valid = k <= top[:, None]
+    k = np.where(valid, k, 0)
+    with np.errstate(invalid='ignore'):
+        logpmf = logC(K[:, None], k) + logC((N - K)[:, None], np.clip(total_y[:, None] - k, 0, None)) - logC(N, total_y)[:, None]
+    p = np.where(valid, np.exp(logpmf), 0).sum(axis=1)
+    return np.where(N > 0, np.minimum(p, 1.0), 1.0)
+
+# Up to this many pairs without ties, the signed-rank p-values are exact
+max_exact = 50
+
+@functools.cache
+def signed_rank_tails() -> np.ndarray:
+    """P(W+ >= w) for n pairs, as [n, w], under the null hypothesis. W+ is the sum of a random subset of the ranks 1..n,
+    so its distribution is counted by adding one rank at a time."""
+    top = max_exact * (max_exact + 1) // 2
+    counts = np.zeros((max_exact + 1, top + 1))
+    counts[0, 0] = 1
+    for n in range(1, max_exact + 1):
+        counts[n] = counts[n - 1]
+        counts[n, n:] += counts[n - 1, :-n]
+    tails = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    return tails / 2.0 ** np.arange(max_exact + 1)[:, None]
+
+def wilcoxon_greater(d: np.ndarray, budget: int = 10_000_000) -> tuple[np.ndarray, np.ndarray]:
+    """Wilcoxon signed-rank test of each row of paired differences d being centered above 0. Zero differences are dropped.
+    Returns W+ (the sum of the ranks of the positive differences) and the p-value: exact for rows of up to max_exact pairs
+    without ties, otherwise by the normal approximation with tie and continuity corrections. Rows without nonzero differences get p=1."""
+    rows = d.shape[0]
+    a = np.abs(np.where(d == 0, np.nan, d))
+    W = np.zeros(rows)
+    ties = np.zeros(rows)
+    n = d.shape[1]
+    step = max(1, budget // max(1, n * n))
+    for s in range(0, rows, step):
+        As = a[s:s+step]
+        less = (As[:, None, :] < As[:, :, None]).sum(axis=2)
+        equal = (As[:, None, :] == As[:, :, None]).sum(axis=2) # including itself
+        ranks = less + (equal + 1) / 2
+        W[s:s+step] = np.where(d[s:s+step] > 0, ranks, 0).sum(axis=1)
+        ties[s:s+step] = np.where(equal > 0, equal**2 - 1, 0).sum(axis=1)
+    n = (~np.isnan(a)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = n * (n + 1) * (2 * n + 1) / 24 - ties / 48
+        z = (W - n * (n + 1) / 4 - 0.5) / np.sqrt(var)
+    p = np.where((n > 0) & (var > 0), normal_sf(np.nan_to_num(z)), 1.0)
+    exact = (n > 0) & (n <= max_exact) & (ties == 0)
+    p[exact] = signed_rank_tails()[n[exact], W[exact].astype(np.int64)]
+    return W, p
+
+def sign_greater(worse: np.ndarray, better: np.ndarray) -> np.ndarray:
+    """Exact one-sided sign test of the discordant pairs (e.g. of outcomes: only the candidate's failed, or only the baseline's)
+    being mostly `worse`: P(at least `worse` of them under a fair coin)"""
+    worse, better = np.asarray(worse, dtype=np.int64), np.asarray(better, dtype=np.int64)
+    n = worse + better
+    logfact = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max(int(n.max(initial=0)), 1) + 1)))])
+    k = worse[:, None] + np.arange(int(better.max(initial=0)) + 1)[None, :]
+    valid = k <= n[:, None]
+    k = np.where(valid, k, 0)
+    logpmf = logfact[n][:, None] - logfact[k] - logfact[np.clip(n[:, None] - k, 0, None)] - n[:, None] * math.log(2)
+    return np.where(n > 0, np.minimum(np.where(valid, np.exp(logpmf), 0).sum(axis=1), 1.0), 1.0)
+
+def benjamini_hochberg(p: np.ndarray) -> np.ndarray:
+    """q-values that control the false discovery rate when testing many elements at once"""
+    n = len(p)
+    if n == 0:
+        return p
+    order = np.argsort(p)
+    q = p[order] * n / np.arange(1, n + 1)
+    q = np.minimum.accumulate(q[::-1])[::-1]
+    out = np.empty(n)
+    out[order] = np.minimum(q, 1.0)
+    return out
@@ -0,0 +1,78 @@
+"""
+A persistent cache of solver results for captured SMT queries,
+so that replays don't need to re-solve queries that were already answered.
+"""
+
+import hashlib
+import logging as log
+import os
+import shutil
+import sqlite3
+import time
+
+DEFAULT_CACHE = os.path.join("darum", "solver_cache.sqlite")
+
+def queryHash(query: str) -> str:
+    """Hash of the query, insensitive to formatting changes"""
+    # The queries given by smt_replay.splitQueries have no seed or rlimit options already
+    normalized = " ".join(query.split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+solver_hashes: dict[tuple[str, float], str] = {}
+def solverHash(solver_path: str) -> str:
+    """Hash of the solver binary, so that different solver versions don't share results"""
+    path = shutil.which(solver_path) or solver_path
+    key = (os.path.realpath(path), os.path.getmtime(path))
+    if key not in solver_hashes:
+        with open(path, "rb") as f:
+            solver_hashes[key] = hashlib.file_digest(f, "sha256").hexdigest()
+    return solver_hashes[key]
+
+class SolverCache:
+    """Outcome and resource count per (query hash, solver hash, seed, resource limit), with LRU eviction beyond max_entries.
+    Results are committed every commit_every puts or commit_secs seconds, so an interrupted replay keeps most of them."""
+    def __init__(self, path: str, max_entries: int = 1_000_000, commit_every: int = 1000, commit_secs: float = 10) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS results (
+            query TEXT, solver TEXT, seed INTEGER, rlimit INTEGER,
+            outcome TEXT, rc INTEGER, last_used REAL,
+            PRIMARY KEY (query, solver, seed, rlimit))""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+        self.hits = 0
+        self.misses = 0
+        self.commit_every = commit_every
+        self.commit_secs = commit_secs
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+
+    def get(self, query_hash: str, solver_hash: str, seed: int, rlimit: int) -> tuple[str, int] | None:
+        key = (query_hash, solver_hash, seed, rlimit)
+        row = self.db.execute("SELECT outcome, rc FROM results WHERE query=? AND solver=? AND seed=? AND rlimit=?", key).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute("UPDATE results SET last_used=? WHERE query=? AND solver=? AND seed=? AND rlimit=?", (time.time(), *key))
+        return row[0], row[1]
+
+    def put(self, query_hash: str, solver_hash: str, seed: int, rlimit: int, outcome: str, rc: int) -> None:
+        self.db.execute("INSERT OR REPLACE INTO results VALUES (?,?,?,?,?,?,?)",
+                        (query_hash, solver_hash, seed, rlimit, outcome, rc, time.time()))
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every or time.monotonic() - self.last_commit >= self.commit_secs:
+            self.db.commit()
+            self.uncommitted = 0
+            self.last_commit = time.monotonic()
+
+    def close(self) -> None:
+        """Evicts the least recently used entries over the limit, and saves the cache"""
+        entries = self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if entries > self.max_entries:
+            self.db.execute("DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+                            (entries - self.max_entries,))
+            log.info(f"Evicted {entries - self.max_entries} entries from {self.path}")
+        self.db.commit()
+        self.db.close()
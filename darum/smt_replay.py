@@ -0,0 +1,281 @@
+#! python3
+"""
+Replay the SMT-LIB queries captured by `dafny_measure --capture-smt` directly on Z3, across many seeds,
+skipping the whole Dafny/Boogie pipeline. The results are stored as a log that the rest of darum can read.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import logging as log
+import os
+import random
+import re
+import subprocess as sp
+import sys
+from datetime import datetime as dt
+from quantiphy import Quantity
+from darum.log_readers import readDarumContext, readJSON, smag
+from darum.smt_cache import DEFAULT_CACHE, SolverCache, queryHash, solverHash
+
+# Boogie writes one prover log per procedure (/proverLog:DIR/@PROC@.smt2). Each log is an SMT-LIB script that
+# declares the procedure's context once and then checks each Assertion Batch inside its own (push)/(pop) scope.
+# To replay an AB alone, the script is cut into self-contained queries: one per (check-sat), containing every
+# command still in scope at that point.
+
+# Options that the replay sets itself, and commands that only make sense interactively
+dropped_commands = re.compile(r"\((get-|echo|exit|set-option\s+:(rlimit|timeout|smt\.random_seed|sat\.random_seed|random_seed)\b)")
+command_delimiters = re.compile(r'[()";|]')
+command_head = re.compile(r"\(\s*([^\s()]+)\s*(\d*)")
+
+def splitCommands(script: str) -> list[str]:
+    """The top-level commands of an SMT-LIB script, without comments"""
+    commands = []
+    depth = 0
+    start = 0
+    pos = 0
+    n = len(script)
+    while True:
+        m = command_delimiters.search(script, pos)
+        if m is None:
+            break
+        c = m.group()
+        i = m.start()
+        if c == '(':
+            if depth == 0:
+                start = i
+            depth += 1
+            pos = i + 1
+        elif c == ')':
+            depth -= 1
+            pos = i + 1
+            if depth == 0:
+                commands.append(script[start:pos])
+        elif c == ';':
+            # comments run until the end of the line. Inside commands they are kept, which is harmless
+            end = script.find("\n", i)
+            pos = n if end == -1 else end + 1
+        elif c == '"':
+            # strings escape quotes by doubling them
+            end = i + 1
+            while True:
+                end = script.find('"', end)
+                if end == -1 or script[end+1:end+2] != '"':
+                    break
+                end += 2
+            pos = n if end == -1 else end + 1
+        else: # '|' quoted symbol
+            end = script.find('|', i + 1)
+            pos = n if end == -1 else end + 1
+    return commands
+
+def splitQueries(script: str) -> list[tuple[str, str]]:
+    """The self-contained queries in the script, as (vc id, query), without duplicates.
+    The vc id is the last :boogie-vc-id set before the query, if any."""
+    frames: list[list[str]] = [[]]
+    queries: dict[str, str] = {} # query: vc id. Dicts keep the insertion order
+    vc_id = ""
+    for cmd in splitCommands(script):
+        m = command_head.match(cmd)
+        keyword = m.group(1) if m else ""
+        levels = int(m.group(2)) if m and m.group(2) else 1
+        if keyword == "push":
+            frames.extend([] for _ in range(levels))
+        elif keyword == "pop":
+            del frames[len(frames) - levels:]
+        elif keyword == "reset":
+            frames = [[]]
+        elif keyword in ["check-sat", "check-sat-assuming"]:
+            query = "\n".join(c for f in frames for c in f) + "\n" + cmd + "\n"
+            if query not in queries:
+                queries[query] = vc_id
+        elif keyword == "set-info" and ":boogie-vc-id" in cmd:
+            vc_id = cmd.split(":boogie-vc-id", 1)[1].strip(" )")
+        elif not dropped_commands.match(cmd):
+            frames[-1].append(cmd)
+    return [(v, q) for q, v in queries.items()]
+
+def memberName(proc: str) -> str:
+    """A readable name for a Boogie procedure, e.g. Impl$$_module.__default.foo -> foo"""
+    name = proc.split("$$", 1)[-1]
+    return name.replace("_module.__default.", "").replace("_module.", "")
+
+def readCapturedQueries(smt_dir: str) -> dict[str, list[tuple[str, str]]]:
+    """The queries of each procedure captured in the directory"""
+    queries = {}
+    for f in sorted(os.listdir(smt_dir)):
+        if not f.endswith(".smt2"):
+            continue
+        with open(os.path.join(smt_dir, f)) as smtfile:
+            queries[f[:-len(".smt2")]] = splitQueries(smtfile.read())
+    return queries
+
+def solve(z3_path: str, queryfile: str, seed: int, limitRC: int) -> tuple[str, int]:
+    """Runs Z3 on the query. Returns the outcome, in the log's vcResult terms, and the resource count"""
+    r = sp.run([z3_path, "-smt2", f"rlimit={limitRC}", f"smt.random_seed={seed}", f"sat.random_seed={seed}", queryfile],
+               capture_output=True, text=True)
+    lines = r.stdout.split("\n")
+    answer = lines[0].strip()
+    m = re.search(r":rlimit\s+(\d+)", r.stdout)
+    rc = int(m.group(1)) if m else 0
+    if answer == "unsat":
+        return "Valid", rc
+    if answer == "unknown" and (rc >= limitRC or "resource" in r.stdout or "canceled" in r.stdout):
+        return "OutOfResource", rc
+    if answer in ["sat", "unknown"]:
+        return "Invalid", rc
+    raise RuntimeError(f"Z3 failed on {queryfile}: {r.stdout} {r.stderr}")
+
+def verificationResult(member: str, seed: int, ABs: list[tuple[int, str, str, int, bool]], filename: str) -> dict:
+    """A vR in the format of Dafny's JSON logs, from the (AB, vc id, outcome, RC, cached) of a member's ABs for one seed.
+    Like in Dafny, ABs after a non-Valid one are not reported, since they'd be unreliable.
+    ABs whose result came from the cache are marked with darumCached."""
+    outcomes = {"Valid": "Correct", "OutOfResource": "OutOfResource", "Invalid": "Errors"}
+    vcRs = []
+    outcome = "Correct"
+    for AB, vc_id, vcr_outcome, rc, cached in sorted(ABs):
+        vcRs.append({
+            "vcNum": AB,
+            "outcome": vcr_outcome,
+            "resourceCount": rc,
+            "randomSeed": seed,
+            "assertions": [{"filename": filename, "line": AB, "col": 0, "description": vc_id or f"query {AB}"}],
+            "darumCached": cached,
+        })
+        if vcr_outcome != "Valid":
+            outcome = outcomes[vcr_outcome]
+            break
+    return {
+        "name": member,
+        "outcome": outcome,
+        "resourceCount": sum(v["resourceCount"] for v in vcRs),
+        "vcResults": vcRs,
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay captured SMT-LIB queries on Z3 across many seeds, and store the results as a log.")
+    parser.add_argument("source", help="A directory of captured queries, or a log created with `dafny_measure --capture-smt`")
+    parser.add_argument("-s", "--filter-symbol", default="", help="Only replay procedures containing this substring")
+    parser.add_argument("-a", "--AB", type=int, action="append", help="Only replay this AB number (can be repeated)")
+    parser.add_argument("-z", "--z3-path", help="Path to Z3. Default: the log's --solver-path, or z3")
+    parser.add_argument("-i", "--iter", type=int, default=10, help="Number of seeds. Default=%(default)s")
+    parser.add_argument("-r", "--rseed", type=int, default=int(dt.now().timestamp()), help="The random seed the seeds are generated from. Default: current time")
+    parser.add_argument("-l", "--limitRC", type=Quantity, default=None, help="The Resource Count limit. Accepts magnitudes (K,M,G...). Default: the log's, or 10M")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of Z3 processes to run concurrently. Default=%(default)s")
+    parser.add_argument("-o", "--output_dir", default="darum", help="Directory to store the results. Default=%(default)s")
+    parser.add_argument("-c", "--cache", default=DEFAULT_CACHE, help="Cache of solver results, to skip queries already answered. Default=%(default)s")
+    parser.add_argument("--cache-size", type=int, default=1_000_000, help="Max results kept in the cache; the least recently used are evicted. Default=%(default)s")
+    parser.add_argument("-n", "--no-cache", action="store_true", help="Always run the solver, and don't store its results")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    numeric_level = log.WARNING - args.verbose * 10
+    log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
+
+    z3_path = args.z3_path
+    limitRC = args.limitRC
+    if os.path.isdir(args.source):
+        smt_dir = args.source
+    else:
+        context = readDarumContext(args.source)
+        if "smt_dir" not in context:
+            sys.exit(f"{args.source} has no captured queries. Use `dafny_measure --capture-smt`.")
+        smt_dir = context["smt_dir"]
+        cmd = context.get("dafny_cmd", [])
+        if z3_path is None and "--solver-path" in cmd:
+            z3_path = cmd[cmd.index("--solver-path")+1]
+        if limitRC is None:
+            limitRC = context.get("darum_args", {}).get("limitRC")
+    z3_path = z3_path or "z3"
+    limitRC = int(limitRC or Quantity("10M"))
+
+    queries = {p: q for p, q in readCapturedQueries(smt_dir).items() if args.filter_symbol in p}
+    if not queries:
+        sys.exit(f"No captured queries in {smt_dir} match '{args.filter_symbol}'")
+
+    outname = f"{dt.now().strftime('%m%d-%H%M%S')}_replay_{os.path.basename(os.path.normpath(smt_dir))}_IT{args.iter}_L{smag(limitRC)}"
+    queries_dir = os.path.join(args.output_dir, outname + "_queries")
+    os.makedirs(queries_dir)
+    # Each query gets its own file, so that the workers only need its path
+    tasks = [] # (proc, AB, vc id, query hash, query file)
+    for proc, qs in queries.items():
+        for AB, (vc_id, query) in enumerate(qs, start=1):
+            if args.AB and AB not in args.AB:
+                continue
+            queryfile = os.path.join(queries_dir, f"{proc}_AB{AB}.smt2")
+            with open(queryfile, "w") as f:
+                f.write(query + "(get-info :rlimit)\n(get-info :reason-unknown)\n")
+            tasks.append((proc, AB, vc_id, queryHash(query), queryfile))
+
+    rng = random.Random(args.rseed)
+    seeds = [rng.randint(0, 2**31-1) for _ in range(args.iter)]
+    print(f"Replaying {len(tasks)} ABs from {len(queries)} procedures with {len(seeds)} seeds on {z3_path}")
+
+    cache = None if args.no_cache else SolverCache(args.cache, args.cache_size)
+    solver_hash = "" if cache is None else solverHash(z3_path)
+
+    t0 = dt.now()
+    replies: dict[tuple[str, int], list] = {} # (proc, seed): [(AB, vc id, outcome, RC, cached)]
+    errors = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = {}
+            for proc, AB, vc_id, qhash, queryfile in tasks:
+                for seed in seeds:
+                    cached = None if cache is None else cache.get(qhash, solver_hash, seed, limitRC)
+                    if cached is not None:
+                        replies.setdefault((proc, seed), []).append((AB, vc_id, *cached, True))
+                        continue
+                    futures[pool.submit(solve, z3_path, queryfile, seed, limitRC)] = (proc, AB, vc_id, qhash, seed)
+            for fut in as_completed(futures):
+                proc, AB, vc_id, qhash, seed = futures[fut]
+                try:
+                    outcome, rc = fut.result()
+                except Exception as e:
+                    # Keep replaying the rest; the query counts as failed, and isn't cached since it may work next time
+                    log.error(f"{proc} AB{AB} seed {seed}: {e}")
+                    errors += 1
+                    replies.setdefault((proc, seed), []).append((AB, vc_id, "Invalid", 0, False))
+                    continue
+                log.debug(f"{proc} AB{AB} seed {seed}: {outcome} {smag(rc)}")
+                replies.setdefault((proc, seed), []).append((AB, vc_id, outcome, rc, False))
+                if cache is not None:
+                    cache.put(qhash, solver_hash, seed, limitRC, outcome, rc)
+    finally:
+        if cache is not None:
+            print(f"{cache.hits} of {cache.hits + cache.misses} results came from the cache {args.cache}")
+            cache.close()
+    log.info(f"Replay took {(dt.now()-t0).total_seconds()} s")
+    if errors:
+        log.warning(f"{errors} queries failed to run, and are reported as failures")
+
+    logpath = os.path.join(args.output_dir, outname + ".json")
+    json_data = {
+        "verificationResults": [verificationResult(memberName(proc), seed, ABs, proc + ".smt2") for (proc, seed), ABs in replies.items()],
+        "darum": {
+            "files": {},
+            "output": [],
+            "dafny_cmd": [z3_path, "-smt2", f"rlimit={limitRC}"],
+            "darum_args": {
+                "IAmode": any(len(qs) > 1 for qs in queries.values()),
+                "limitRC": limitRC,
+            },
+            "smt_dir": smt_dir,
+        }
+    }
+    with open(logpath, "w") as jsonfile:
+        json.dump(json_data, jsonfile)
+
+    results = readJSON(logpath)
+    for k, d in sorted(results.items()):
+        line = f"{k:50} {len(d.RC):>3} OK"
+        if d.RC:
+            line += f" {smag(min(d.RC)):>8} - {smag(max(d.RC)):>8}"
+        line += f"  OoR {len(d.OoR)} fail {len(d.failures)}"
+        print(line)
+    print(f"Generated replay log at {logpath}")
+    return 0
+
+# for easier debugging
+if __name__ == "__main__":
+    main()
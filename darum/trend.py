@@ -0,0 +1,152 @@
+#! python3
+"""
+Trends across the history of runs: each element's results are aligned across the successive hashes of its source file,
+and the steps where its minRC or span jumped, or where it started failing, are flagged as regressions.
+"""
+
+import argparse
+import logging as log
+import os
+import sqlite3
+import sys
+import numpy as np
+from darum.history import ingestLog, openHistory
+from darum.history_query import DEFAULT_DB, inRuns, selectRuns
+from darum.report import formats, report
+
+sparks = np.array(list("▁▂▃▄▅▆▇█"))
+
+def versions(db: sqlite3.Connection, runs: list[int], members_only: bool, per_run: bool) -> dict[str, np.ndarray]:
+    """A row per (element, version), sorted by element and then by when the version was first seen.
+    A version is a hash of the element's source file, pooling the runs that measured it; or each run, if per_run
+    or if the log didn't record the hashes. A member's results in IA mode are the sum of its ABs, so they are a separate element."""
+    version = "'run ' || run" if per_run else "COALESCE(substr(file_hash, 1, 8), 'run ' || run)"
+    rows = db.execute(f"""SELECT element || CASE WHEN IAmode AND AB = 0 THEN ' (IA)' ELSE '' END AS series, {version} AS version, MIN(timestamp) AS first_seen,
+                          MIN(minRC), MAX(maxRC), SUM(success), SUM(OoR) + SUM(fail)
+                          FROM elements JOIN runs ON run=id WHERE run IN {inRuns(runs)} {"AND AB = 0" if members_only else ""}
+                          GROUP BY series, version ORDER BY series, first_seen""").fetchall()
+    columns = list(zip(*rows)) or [[]] * 7
+    v = {k: np.array(c, dtype=object) for k, c in zip(["element", "version", "first_seen"], columns[:3])}
+    v |= {k: np.array(c, dtype=np.float64) for k, c in zip(["minRC", "maxRC", "success", "bad"], columns[3:])}
+    # no successes: NULL min/max
+    with np.errstate(invalid='ignore', divide='ignore'):
+        v["span"] = (v["maxRC"] - v["minRC"]) / v["minRC"]
+    return v
+
+def shifts(v: dict[str, np.ndarray], min_jump: float, span_jump: float) -> dict[str, np.ndarray]:
+    """For each version, the shift from the element's previous version, all elements at once.
+    The severity is how many times over the thresholds the jump was; starting to fail or run out of resources is infinitely severe.
+    The first version of each element has no shift."""
+    n = len(v["element"])
+    previous = np.zeros(n, dtype=bool)
+    previous[1:] = v["element"][1:] == v["element"][:-1]
+    prev = lambda a: np.concatenate(([np.nan], a[:-1]))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        minRC_shift = np.where(previous, v["minRC"] / prev(v["minRC"]) - 1, np.nan)
+        span_shift = np.where(previous, v["span"] - prev(v["span"]), np.nan)
+        started_failing = previous & (v["bad"] > 0) & (prev(v["bad"]) == 0)
+        severity = np.fmax(minRC_shift / min_jump, span_shift / span_jump)
+    severity = np.where(started_failing, np.inf, np.nan_to_num(severity, nan=0))
+    return {"previous": previous, "minRC_shift": minRC_shift, "span_shift": span_shift, "started_failing": started_failing,
+            "severity": severity, "regression": severity > 1}
+
+def sparkline(values: np.ndarray, starts: np.ndarray, width: int = 16) -> list[str]:
+    """The last `width` values of each group (delimited by starts) as a sparkline, in log scale relative to the group"""
+    logs = np.log(np.where(values > 0, values, np.nan))
+    ends = np.append(starts[1:], len(values))
+    lo = np.fmin.reduceat(logs, starts) if len(values) else logs
+    hi = np.fmax.reduceat(logs, starts) if len(values) else logs
+    group = np.repeat(np.arange(len(starts)), ends - starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        level = np.nan_to_num((logs - lo[group]) / (hi - lo)[group], nan=0)
+    chars = np.where(np.isnan(logs), "·", sparks[np.round(level * (len(sparks) - 1)).astype(int)])
+    return ["".join(chars[max(s, e - width):e]) for s, e in zip(starts.tolist(), ends.tolist())]
+
+def describe(minRC_shift: float, span_shift: float, started_failing: bool, min_jump: float, span_jump: float) -> str:
+    what = []
+    if started_failing:
+        what.append("started failing/OoR")
+    if minRC_shift > min_jump:
+        what.append(f"minRC {minRC_shift:+.0%}")
+    if span_shift > span_jump:
+        what.append(f"span {span_shift*100:+.1f}pp")
+    return ", ".join(what)
+
+def trendTable(v: dict[str, np.ndarray], s: dict[str, np.ndarray], min_jump: float, span_jump: float, all_elements: bool):
+    """A row per element with more than one version: its latest values, the shift from its first version, a sparkline
+    of its minRC, and its worst regression, if any. Sorted by the severity of that regression."""
+    import pandas as pd
+    # the versions of each element are contiguous
+    starts = np.flatnonzero(~s["previous"])
+    nversions = np.diff(np.append(starts, len(v["element"])))
+    elements = v["element"][starts]
+    last = starts + nversions - 1
+    # the worst step of each element
+    group = np.repeat(np.arange(len(starts)), nversions)
+    worst = np.lexsort((-s["severity"], group))[starts]
+    df = pd.DataFrame({
+        "versions": nversions,
+        "minRC": v["minRC"][last],
+        "minRC_shift": v["minRC"][last] / v["minRC"][starts] - 1,
+        "span": v["span"][last],
+        "span_shift": v["span"][last] - v["span"][starts],
+        "trend": sparkline(v["minRC"], starts),
+        "severity": s["severity"][worst],
+        "regression": [describe(*a, min_jump, span_jump) if r else "" for r, *a in
+                       zip(s["regression"][worst], s["minRC_shift"][worst], s["span_shift"][worst], s["started_failing"][worst])],
+        "at": np.where(s["regression"][worst], v["version"][worst], ""),
+        "since": np.where(s["regression"][worst], v["first_seen"][worst], ""),
+    }, index=pd.Index(elements, name="Element"))
+    df = df[df.versions > 1]
+    if not all_elements:
+        df = df[df.severity > 1]
+    return df.sort_values(["severity", "minRC_shift"], ascending=False, kind="stable")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Align the elements across successive runs and flag where their minRC or span jumped.")
+    parser.add_argument("logs", nargs="*", help="Logs to compare, in the order of their timestamps, instead of the runs in the history database")
+    parser.add_argument("-d", "--db", default=DEFAULT_DB, help="The history database. Default=%(default)s")
+    parser.add_argument("-n", "--runs", type=int, default=0, help="Only the last RUNS runs (0: all). Default=%(default)s")
+    parser.add_argument("-s", "--since", help="Only runs since this ISO timestamp or date, e.g. 2024-09-01")
+    parser.add_argument("--dafny", help="Only runs with a Dafny version starting with this")
+    parser.add_argument("--z3", help="Only runs with a Z3 version starting with this")
+    parser.add_argument("-H", "--file-hash", help="Only runs of a source file with a hash starting with this")
+    parser.add_argument("-m", "--members", action="store_true", help="Only whole members, not their ABs")
+    parser.add_argument("-p", "--per-run", action="store_true", help="Compare each run with the previous one, instead of each version of the source with the previous one")
+    parser.add_argument("-j", "--min-jump", type=float, default=0.25, help="A minRC increase over this fraction is a regression. Default=%(default)s")
+    parser.add_argument("-g", "--span-jump", type=float, default=0.05, help="A span increase over this (0.05 = 5 percentage points) is a regression. Default=%(default)s")
+    parser.add_argument("-a", "--all", action="store_true", help="List all the elements, not only those that regressed")
+    parser.add_argument("-t", "--top", type=int, default=20, help="Rows in the text and Markdown tables. Default=%(default)s")
+    parser.add_argument("-f", "--format", choices=formats[1:], default="text")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    numeric_level = log.WARNING - args.verbose * 10
+    log.basicConfig(level=numeric_level,format='%(levelname)s:%(message)s')
+
+    if args.logs:
+        db = openHistory(":memory:")
+        for p in args.logs:
+            if ingestLog(db, p) is None:
+                log.warning(f"{p} is a duplicate of a previous log")
+    elif os.path.isfile(args.db):
+        db = openHistory(args.db)
+    else:
+        sys.exit(f"No history database at {args.db}. Add logs to it with `darum ingest`, or pass the logs to compare")
+    runs = selectRuns(db, args)
+    if len(runs) < 2:
+        sys.exit("Trends need at least 2 runs")
+    v = versions(db, runs, args.members, args.per_run)
+    db.close()
+    s = shifts(v, args.min_jump, args.span_jump)
+    df = trendTable(v, s, args.min_jump, args.span_jump, args.all)
+
+    regressed = int((df.severity > 1).sum())
+    comment_box = f"* {regressed} elements regressed across {len(runs)} runs: minRC up more than {args.min_jump:.0%}, span up more than {args.span_jump*100:.1f} percentage points, or started failing/OoR.\n"
+    print(report(args.format, f"Trends over {len(runs)} runs", {"Trends": df.drop(columns=["severity"])}, comment_box,
+                 {"runs": runs}, args.top))
+    return 0
+
+# for easier debugging
+if __name__ == "__main__":
+    main()